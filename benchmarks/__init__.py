@@ -0,0 +1,18 @@
+"""
+Benchmark suite of the fatigue, I/O and post-processing hot paths of wetb
+
+The benchmarks are written for airspeed velocity (asv), https://asv.readthedocs.io, which
+runs the benchmarks for a range of commits and tracks the results, e.g.
+
+>> pip install asv
+>> asv run master~10..master     # benchmark the last 10 commits
+>> asv continuous master HEAD    # compare the current commit with master, fails on regressions
+>> asv publish && asv preview    # html report of the tracked results
+
+The benchmarks can also be run in the current environment without asv:
+
+>> python -m benchmarks [name filter]
+
+The input files (HAWC2, gtsdf, FLEX and FAST result files) are synthetic and generated
+in a temporary folder (see benchmarks.synthetic_files)
+"""
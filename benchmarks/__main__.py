@@ -0,0 +1,62 @@
+"""
+Run the benchmarks in the current environment without asv, e.g.
+
+>> python -m benchmarks               # all benchmarks
+>> python -m benchmarks Rainflow      # benchmarks whose name contains 'Rainflow'
+"""
+import importlib
+import itertools
+import os
+import sys
+import timeit
+import warnings
+
+
+def iter_benchmarks(name_filter=""):
+    """Yield (name, class, method name, parameter combination)"""
+    folder = os.path.dirname(__file__)
+    for filename in sorted(os.listdir(folder)):
+        if not (filename.startswith("bench_") and filename.endswith(".py")):
+            continue
+        try:
+            module = importlib.import_module("benchmarks." + filename[:-3])
+        except Exception as e:
+            # e.g. a wetb module that does not support the installed numpy version
+            warnings.warn("Skipping benchmarks.%s: %s: %s" % (filename[:-3], e.__class__.__name__, e))
+            continue
+        for cls_name, cls in sorted(vars(module).items()):
+            if not isinstance(cls, type) or cls.__module__ != module.__name__:
+                continue
+            params = getattr(cls, 'params', [])
+            if params and not isinstance(params[0], list):
+                params = [params]
+            for method in sorted(m for m in dir(cls) if m.startswith('time_')):
+                name = "%s.%s.%s" % (filename[:-3], cls_name, method)
+                if name_filter in name:
+                    for p in itertools.product(*params):
+                        yield name, cls, method, p
+
+
+def main(name_filter="", repeat=3):
+    for name, cls, method, p in iter_benchmarks(name_filter):
+        bench = cls()
+        if hasattr(bench, 'setup'):
+            try:
+                bench.setup(*p)
+            except NotImplementedError:
+                # asv convention: benchmark not supported by this version of wetb
+                print("%-65s %-20s %s" % (name, ", ".join(map(str, p)), "skipped"))
+                continue
+        try:
+            t = "%10.4f s" % min(timeit.repeat(lambda: getattr(bench, method)(*p), number=1, repeat=repeat))
+        except Exception as e:
+            # report the failure and continue with the next benchmark (as asv)
+            t = "failed (%s: %s)" % (e.__class__.__name__, e)
+        if hasattr(bench, 'teardown'):
+            bench.teardown(*p)
+        print("%-65s %-20s %s" % (name, ", ".join(map(str, p)), t))
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2])
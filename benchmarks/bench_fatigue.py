@@ -0,0 +1,56 @@
+"""
+Benchmarks of the rainflow counting and equivalent load calculation
+"""
+from wetb.fatigue_tools.fatigue import rainflow_windap, rainflow_astm, cycle_matrix, eq_load
+try:
+    from wetb.fatigue_tools.fatigue import eq_load_channels
+except ImportError:  # not available in older versions of wetb
+    eq_load_channels = None
+
+from .synthetic_files import signals
+
+
+class Rainflow(object):
+    params = [10 ** 4, 10 ** 5, 10 ** 6]
+    param_names = ['no_samples']
+
+    def setup(self, no_samples):
+        self.signal = signals(no_samples)[1][:, 0]
+
+    def time_rainflow_windap(self, no_samples):
+        rainflow_windap(self.signal)
+
+    def time_rainflow_astm(self, no_samples):
+        rainflow_astm(self.signal)
+
+    def time_cycle_matrix(self, no_samples):
+        cycle_matrix(self.signal, 46, 1)
+
+    def time_eq_load(self, no_samples):
+        eq_load(self.signal, neq=600)
+
+
+class EqLoadLoop(object):
+    params = [[10, 100], [10 ** 4, 10 ** 5]]
+    param_names = ['no_channels', 'no_samples']
+    timeout = 300
+
+    def setup(self, no_channels, no_samples):
+        self.signals = signals(no_samples, no_channels)[1]
+
+    def time_eq_load_loop(self, no_channels, no_samples):
+        [eq_load(sig, neq=600) for sig in self.signals.T]
+
+
+class EqLoadChannels(object):
+    params = [[10, 100], [10 ** 4, 10 ** 5]]
+    param_names = ['no_channels', 'no_samples']
+    timeout = 300
+
+    def setup(self, no_channels, no_samples):
+        if eq_load_channels is None:
+            raise NotImplementedError("eq_load_channels")
+        self.signals = signals(no_samples, no_channels)[1]
+
+    def time_eq_load_channels(self, no_channels, no_samples):
+        eq_load_channels(self.signals, neq=600)
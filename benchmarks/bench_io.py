@@ -0,0 +1,121 @@
+"""
+Benchmarks of reading and writing result files
+"""
+import inspect
+import os
+
+import numpy as np
+from wetb import gtsdf
+from wetb.fast import fast_io
+from wetb.hawc2.Hawc2io import ReadHawc2
+try:
+    from wetb.flex import _io as flex_io
+except Exception:  # wetb.flex uses numpy aliases, e.g. np.float, that are removed in numpy>=1.24
+    flex_io = None
+
+from . import synthetic_files
+
+
+def _requires_argument(func, argument):
+    """Raise NotImplementedError (i.e. skip benchmark in asv) if func (of an older wetb version) has no argument"""
+    if argument not in inspect.signature(func).parameters:
+        raise NotImplementedError("%s(..., %s=...)" % (func.__name__, argument))
+
+
+class ReadHawc2Binary(object):
+    params = [[10 ** 4, 10 ** 5], [50, 300]]
+    param_names = ['no_samples', 'no_channels']
+
+    def setup(self, no_samples, no_channels):
+        self.filename = synthetic_files.hawc2_file(no_samples, no_channels, 'BINARY')
+
+    def time_read_all(self, no_samples, no_channels):
+        ReadHawc2(self.filename).ReadAll()
+
+    def time_read_channels(self, no_samples, no_channels):
+        ReadHawc2(self.filename)([0, 1, 2, 3])
+
+    def peakmem_read_all(self, no_samples, no_channels):
+        ReadHawc2(self.filename).ReadAll()
+
+
+class ReadHawc2BinaryMmap(object):
+    params = [[10 ** 4, 10 ** 5], [50, 300]]
+    param_names = ['no_samples', 'no_channels']
+
+    def setup(self, no_samples, no_channels):
+        _requires_argument(ReadHawc2.__init__, 'mmap')
+        self.filename = synthetic_files.hawc2_file(no_samples, no_channels, 'BINARY')
+
+    def time_read_channels_mmap(self, no_samples, no_channels):
+        ReadHawc2(self.filename, mmap=True)([0, 1, 2, 3])
+
+
+class ReadHawc2Ascii(object):
+    params = [10 ** 3, 10 ** 4]
+    param_names = ['no_samples']
+
+    def setup(self, no_samples):
+        self.filename = synthetic_files.hawc2_file(no_samples, 50, 'ASCII')
+
+    def time_read_all(self, no_samples):
+        ReadHawc2(self.filename).ReadAll()
+
+
+class Gtsdf(object):
+    params = [[10 ** 4, 10 ** 5], ['int16', 'float32']]
+    param_names = ['no_samples', 'dtype']
+
+    def setup(self, no_samples, dtype):
+        self.filename = synthetic_files.gtsdf_file(no_samples, 50, dtype)
+        self.time, self.data = synthetic_files.signals(no_samples, 50)
+        self.save_filename = os.path.join(synthetic_files.tmp_folder(), "gtsdf_save_%s_%d.hdf5" % (dtype, no_samples))
+
+    def teardown(self, no_samples, dtype):
+        if os.path.isfile(self.save_filename):
+            os.remove(self.save_filename)
+
+    def time_load(self, no_samples, dtype):
+        gtsdf.load(self.filename)
+
+    def time_save(self, no_samples, dtype):
+        gtsdf.save(self.save_filename, self.data, time=self.time, dtype=np.dtype(dtype))
+
+
+class GtsdfColumns(object):
+    params = [[10 ** 4, 10 ** 5], ['int16', 'float32']]
+    param_names = ['no_samples', 'dtype']
+
+    def setup(self, no_samples, dtype):
+        _requires_argument(gtsdf.load, 'columns')
+        self.filename = synthetic_files.gtsdf_file(no_samples, 50, dtype)
+
+    def time_load_columns(self, no_samples, dtype):
+        gtsdf.load(self.filename, columns=[0, 10, 20])
+
+
+class Flex(object):
+    params = [10 ** 4, 10 ** 5]
+    param_names = ['no_samples']
+
+    def setup(self, no_samples):
+        if flex_io is None:
+            raise NotImplementedError("wetb.flex")
+        self.filename = synthetic_files.flex_file(no_samples, 50)
+
+    def time_load(self, no_samples):
+        flex_io.load(self.filename, dtype=np.float64)
+
+
+class Fast(object):
+    params = [[10 ** 3, 10 ** 4], ['ascii', 'binary']]
+    param_names = ['no_samples', 'format']
+
+    def setup(self, no_samples, format):
+        if format == 'ascii':
+            self.filename = synthetic_files.fast_ascii_file(no_samples, 50)
+        else:
+            self.filename = synthetic_files.fast_binary_file(no_samples, 50)
+
+    def time_load_output(self, no_samples, format):
+        fast_io.load_output(self.filename)
@@ -0,0 +1,72 @@
+"""
+Benchmarks of post-processing: statistics, htc parsing and load envelopes
+"""
+import os
+
+from wetb.hawc2.htc_file import HTCFile
+try:
+    from wetb.hawc2.htc_file import clear_cache
+except ImportError:  # htc files are not cached in older versions of wetb
+    clear_cache = None
+from wetb.prepost import windIO
+from wetb.utils.envelope import compute_envelope
+
+from . import synthetic_files
+
+
+class StatsDel(object):
+    params = [[10 ** 4, 3 * 10 ** 4], [50, 300]]
+    param_names = ['no_samples', 'no_channels']
+    timeout = 300
+
+    def setup(self, no_samples, no_channels):
+        filename = synthetic_files.hawc2_file(no_samples, no_channels, 'BINARY')
+        self.res = windIO.LoadResults(os.path.dirname(filename), os.path.basename(filename))
+
+    def time_load_results(self, no_samples, no_channels):
+        filename = self.res.FileName
+        windIO.LoadResults(os.path.dirname(filename), os.path.basename(filename))
+
+    def time_statsdel_df(self, no_samples, no_channels):
+        self.res.statsdel_df()
+
+
+class HTCParsing(object):
+    """Parsing of htc files, i.e. the caches of read and parsed htc files are cleared before each load"""
+
+    def setup(self):
+        self.filename = synthetic_files.htc_file()
+
+    def time_htc_file(self):
+        if clear_cache is not None:
+            clear_cache()
+        HTCFile(self.filename)
+
+    def time_htc_str(self):
+        if clear_cache is not None:
+            clear_cache()
+        str(HTCFile(self.filename))
+
+
+class HTCCached(object):
+    """Loading of an already parsed (cached) htc file"""
+
+    def setup(self):
+        if clear_cache is None:
+            raise NotImplementedError("wetb.hawc2.htc_file.clear_cache")
+        self.filename = synthetic_files.htc_file()
+        HTCFile(self.filename)
+
+    def time_htc_file_cached(self):
+        HTCFile(self.filename)
+
+
+class Envelope(object):
+    params = [10 ** 4, 10 ** 5]
+    param_names = ['no_samples']
+
+    def setup(self, no_samples):
+        self.cloud = synthetic_files.signals(no_samples, 6)[1]
+
+    def time_compute_envelope(self, no_samples):
+        compute_envelope(self.cloud)
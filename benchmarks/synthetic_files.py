@@ -0,0 +1,137 @@
+"""
+Generation of synthetic signals and result files of parametrised size
+"""
+from datetime import datetime
+import os
+import struct
+import tempfile
+
+import numpy as np
+from wetb import gtsdf
+from wetb.hawc2 import sel_file
+
+tfp = os.path.join(os.path.dirname(__file__), '..', 'wetb', 'hawc2', 'tests', 'test_files') + "/"
+
+
+def tmp_folder():
+    """Folder of the generated files.
+
+    The folder is fixed, so the files are generated once and reused by the benchmark processes
+    of all commits. Each file is checked by the file written last"""
+    folder = os.environ.get('WETB_BENCHMARK_FOLDER', os.path.join(tempfile.gettempdir(), "wetb_benchmarks"))
+    if not os.path.isdir(folder):
+        os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def signals(no_samples, no_channels=1, seed=0):
+    """Reproducible load-like signals: random walk + harmonic + noise"""
+    rng = np.random.RandomState(seed)
+    t = np.arange(no_samples) / 50.
+    walk = np.cumsum(rng.randn(no_samples, no_channels), 0) * .05
+    harmonic = np.sin(2 * np.pi * 0.2 * t)[:, np.newaxis] * rng.uniform(1, 10, no_channels)
+    return t, walk + harmonic + rng.randn(no_samples, no_channels) * .1
+
+
+def hawc2_sensors(no_channels):
+    """(name, unit, description) of no_channels channels based on a real HAWC2 sel file"""
+    sel = sel_file.SelFile(tfp + "hawc2io/hawc2bin_chantest_3.sel")
+    sensors = [s[1:] for s in sel.sensors]
+    return [sensors[i % len(sensors)] for i in range(no_channels)]
+
+
+def hawc2_file(no_samples, no_channels, fmt='BINARY'):
+    """Write HAWC2 result file (.sel/.dat) and return the filename without extension"""
+    filename = os.path.join(tmp_folder(), "hawc2_%s_%d_%d" % (fmt.lower(), no_samples, no_channels))
+    if os.path.isfile(filename + ".sel"):
+        return filename
+    time, data = signals(no_samples, no_channels - 1)
+    data = np.c_[time, data]
+    sensors = hawc2_sensors(no_channels)
+    if fmt.upper() == 'BINARY':
+        scale_factors = np.abs(data).max(0) / 32000
+        scale_factors[scale_factors == 0] = 1
+        np.round(data / scale_factors).astype(np.int16).T.tofile(filename + ".dat")
+    else:
+        scale_factors = None
+        np.savetxt(filename + ".dat", data, fmt="%.8e")
+    sel_file.save(filename + ".sel", "wetb benchmark", datetime(2020, 1, 1), no_samples, no_channels,
+                  time[-1] + time[1], sensors, scale_factors)
+    return filename
+
+
+def gtsdf_file(no_samples, no_channels, dtype=np.int16):
+    filename = os.path.join(tmp_folder(), "gtsdf_%s_%d_%d.hdf5" % (np.dtype(dtype).name, no_samples, no_channels))
+    if not os.path.isfile(filename):
+        time, data = signals(no_samples, no_channels)
+        gtsdf.save(filename[:-5] + "_tmp.hdf5", data, time=time, dtype=dtype)
+        os.replace(filename[:-5] + "_tmp.hdf5", filename)
+    return filename
+
+
+def flex_file(no_samples, no_channels):
+    """Write FLEX int16 result file and sensor file. Returns filename"""
+    folder = os.path.join(tmp_folder(), "flex_%d_%d" % (no_samples, no_channels))
+    filename = os.path.join(folder, "result.int")
+    if os.path.isfile(os.path.join(folder, "sensor")):
+        return filename
+    os.makedirs(folder, exist_ok=True)
+    time, data = signals(no_samples, no_channels)
+    scale_factors = (np.abs(data).max(0) / 32000).astype(np.float32)
+    with open(filename, 'wb') as fid:
+        fid.write(struct.pack('ii', 0, 0))
+        fid.write(b"wetb benchmark".ljust(60))
+        fid.write(struct.pack('iii', 0, 0, no_channels))
+        fid.write(struct.pack('i' * no_channels, *range(2, no_channels + 2)))
+        fid.write(struct.pack('ii', 0, 0))
+        fid.write(struct.pack('ff', 0, time[1]))
+        fid.write(struct.pack('f' * no_channels, *scale_factors))
+        fid.write(np.round(data / scale_factors).astype(np.int16).tobytes())
+    with open(os.path.join(folder, "sensor"), 'w') as fid:
+        fid.write("Version 1\n  No   forst  offset  korr. c  Volt    Unit   Navn    Beskrivelse\n")
+        for i in range(no_channels):
+            fid.write("%4d 1.0 0.0 0.0 1.0 kNm Sensor%02d description of sensor %d\n" % (i + 2, i, i))
+    return filename
+
+
+def fast_ascii_file(no_samples, no_channels):
+    filename = os.path.join(tmp_folder(), "fast_%d_%d.out" % (no_samples, no_channels))
+    if not os.path.isfile(filename):
+        time, data = signals(no_samples, no_channels)
+        with open(filename + ".tmp", 'w') as fid:
+            fid.write("\nThese predictions were generated by wetb benchmarks\n\n\n")
+            fid.write("\t".join(["Time"] + ["Chan%d" % i for i in range(no_channels)]) + "\n")
+            fid.write("\t".join(["(s)"] + ["(kN)"] * no_channels) + "\n")
+            np.savetxt(fid, np.c_[time, data], fmt="%.6e", delimiter="\t")
+        os.replace(filename + ".tmp", filename)
+    return filename
+
+
+def fast_binary_file(no_samples, no_channels):
+    """Write FAST binary output file (FileFmtID_WithoutTime)"""
+    filename = os.path.join(tmp_folder(), "fast_%d_%d.outb" % (no_samples, no_channels))
+    if os.path.isfile(filename):
+        return filename
+    time, data = signals(no_samples, no_channels)
+    col_scl = (32000 / np.abs(data).max(0)).astype(np.float32)
+    col_off = np.zeros(no_channels, dtype=np.float32)
+    desc = b"Generated by wetb benchmarks"
+    with open(filename + ".tmp", 'wb') as fid:
+        fid.write(struct.pack('h', 2))
+        fid.write(struct.pack('ii', no_channels, no_samples))
+        fid.write(struct.pack('dd', time[0], time[1] - time[0]))
+        fid.write(col_scl.tobytes())
+        fid.write(col_off.tobytes())
+        fid.write(struct.pack('i', len(desc)))
+        fid.write(desc)
+        for name in ["Time"] + ["Chan%d" % i for i in range(no_channels)]:
+            fid.write(name.ljust(10).encode())
+        for unit in ["(s)"] + ["(kN)"] * no_channels:
+            fid.write(unit.ljust(10).encode())
+        fid.write(np.round(data * col_scl + col_off).astype(np.int16).tobytes())
+    os.replace(filename + ".tmp", filename)
+    return filename
+
+
+def htc_file():
+    return tfp + "htcfiles/DTU_10MW_RWT.htc"
@@ -39,6 +39,9 @@ def setup_package(build_ext_switch=True):
         extlist = [Extension('%s.%s' % (module, n),
                              [os.path.join(module.replace(".", "/"), n) + '.pyx'],
                              include_dirs=[np.get_include()]) for module, names in ex_info for n in names]
+        # compiled kernels, see wetb.utils.kernels
+        from Cython.Build import cythonize
+        extlist = cythonize(extlist, compiler_directives={'language_level': 3})
         from Cython.Distutils import build_ext
         build_requires = ['cython']
         cmd_class = {'build_ext': build_ext}
@@ -78,7 +81,7 @@ def setup_package(build_ext_switch=True):
           long_description=long_description,
           long_description_content_type="text/markdown",
           version=version,
-          packages=find_packages(),
+          packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
           )
 
 
@@ -86,6 +89,9 @@ if __name__ == "__main__":
     try:
         setup_package()
     except Exception:
+        if os.environ.get('WETB_REQUIRE_EXTENSIONS', '0') not in ('', '0'):
+            # e.g. when building wheels, that must contain the compiled kernels
+            raise
         setup_package(build_ext_switch=False)
         warnings.warn("WETB installed, but building extensions failed (i.e. it falls back on the slower pure python implementions)",
                       RuntimeWarning)
@@ -6,6 +6,9 @@ Created on 04/03/2013
 'eq_load' calculate equivalent loads using one of the two rain flow counting methods
 'cycle_matrix' calculates a matrix of cycles (binned on amplitude and mean value)
 'eq_load_and_cycles' is used to calculate eq_loads of multiple time series (e.g. life time equivalent load)
+'eq_load_channels' calculate equivalent loads of all channels (columns) of a 2D array in one call
+'eq_load_ampl_counts' calculate equivalent loads from half cycle amplitudes and counts (e.g. from RainflowWindapStream)
+'CycleMatrixAccumulator' accumulates a cycle matrix with fixed bins signal by signal (e.g. life time equivalent loads of many files)
 
 The methods uses the rainflow counting routines (See documentation in top of methods):
 - 'rainflow_windap': (Described in "Recommended Practices for Wind Turbine Testing - 3. Fatigue Loads",
@@ -19,6 +22,7 @@ from __future__ import print_function
 from __future__ import unicode_literals
 from __future__ import absolute_import
 from future import standard_library
+import multiprocessing
 import warnings
 standard_library.install_aliases()
 import numpy as np
@@ -26,6 +30,8 @@ from wetb.fatigue_tools.rainflowcounting import rainflowcount
 
 rainflow_windap = rainflowcount.rainflow_windap
 rainflow_astm = rainflowcount.rainflow_astm
+rainflow_windap_channels = rainflowcount.rainflow_windap_channels
+RainflowWindapStream = rainflowcount.RainflowWindapStream
 
 
 def eq_load(signals, no_bins=46, m=[3, 4, 6, 8, 10, 12], neq=1, rainflow_func=rainflow_windap):
@@ -110,6 +116,120 @@ def eq_load_and_cycles(signals, no_bins=46, m=[3, 4, 6, 8, 10, 12], neq=[10 ** 6
         eq_loads = [[((np.nansum(cycles * ampl_bin_mean ** _m) / _neq) ** (1. / _m)) for _m in np.atleast_1d(m)]  for _neq in np.atleast_1d(neq)]
     return eq_loads, cycles, ampl_bin_mean, ampl_bin_edges
 
+def eq_load_channels(signals, no_bins=46, m=[3, 4, 6, 8, 10, 12], neq=1, rainflow_func=rainflow_windap):
+    """Equivalent load calculation of multiple channels
+
+    Vectorized version of eq_load for a 2D array with one signal per column.
+    The binning and the equivalent load calculation of all channels are
+    performed in a few array operations instead of one call to eq_load per channel
+
+    Parameters
+    ----------
+    signals : array_like, shape (no_samples, no_channels)
+        The signals
+    no_bins : int, optional
+        Number of bins in rainflow count histogram
+    m : int, float or array-like, optional
+        Wohler exponent (default is [3, 4, 6, 8, 10, 12])
+    neq : int, float or array-like, optional
+        The equivalent number of load cycles (default is 1, but normally the time duration in seconds is used)
+    rainflow_func : {rainflow_windap, rainflow_astm}, optional
+        The rainflow counting function to use (default is rainflow_windap)
+
+    Returns
+    -------
+    eq_loads : ndarray, shape (no_neq, no_m, no_channels)
+        Equivalent loads for the corresponding equivalent number(s), Wohler exponents and channels.
+        Channels without variation gives nan (like eq_load)
+
+    Examples
+    --------
+    >>> signal = np.array([-2.0, 0.0, 1.0, 0.0, -3.0, 0.0, 5.0, 0.0, -1.0, 0.0, 3.0, 0.0, -4.0, 0.0, 4.0, 0.0, -2.0])
+    >>> eq_load_channels(np.array([signal, signal * 2]).T, no_bins=50, neq=[1, 17], m=[3, 4, 6])[:, :, 1]
+    array([[20.69682825, 19.27130683, 18.24479894], # neq = 1, m=[3,4,6]
+           [ 8.04922663,  9.49071508, 11.3779563 ]]) # neq = 17, m=[3,4,6]
+    """
+    signals = np.asarray(signals)
+    if signals.ndim == 1:
+        signals = signals[:, np.newaxis]
+    m, neq = np.atleast_1d(m).astype(np.float64), np.atleast_1d(neq).astype(np.float64)
+
+    if rainflow_func is rainflow_windap:
+        ampl_mean_lst = rainflow_windap_channels(signals)
+    else:
+        ampl_mean_lst = []
+        for i in range(signals.shape[1]):
+            try:
+                ampl_mean_lst.append(rainflow_func(signals[:, i]))
+            except TypeError:
+                ampl_mean_lst.append(None)
+    ampls_lst = [np.zeros(0) if am is None else np.asarray(am[0], dtype=np.float64) for am in ampl_mean_lst]
+    no_channels = len(ampls_lst)
+
+    # amplitude bins from 0 to max amplitude of each channel (see cycle_matrix)
+    ampl_max = np.array([ampls.max() if len(ampls) else 0 for ampls in ampls_lst])
+    valid = ampl_max > 0
+    ampl_max[~valid] = 1
+    ampls = np.concatenate(ampls_lst)
+    ch = np.repeat(np.arange(no_channels), [len(ampls) for ampls in ampls_lst])
+    ampl_edges = np.linspace(0, 1, no_bins + 1)[np.newaxis] * ampl_max[:, np.newaxis]
+
+    # bin index as computed by np.histogram for uniform bins
+    bin_index = np.minimum((ampls / ampl_max[ch] * no_bins).astype(np.int_), no_bins - 1)
+    bin_index[ampls < ampl_edges[ch, bin_index]] -= 1
+    bin_index[(ampls >= ampl_edges[ch, bin_index + 1]) & (bin_index != no_bins - 1)] += 1
+
+    flat_index = ch * no_bins + bin_index
+    counts = np.bincount(flat_index, minlength=no_channels * no_bins).reshape(no_channels, no_bins)
+    ampl_bin_sum = np.bincount(flat_index, ampls, minlength=no_channels * no_bins).reshape(no_channels, no_bins)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        ampl_bin_mean = ampl_bin_sum / np.where(counts, counts, np.nan)
+        cycles = counts / 2  # to get full cycles
+        damage = np.nansum(cycles[np.newaxis] * ampl_bin_mean[np.newaxis] ** m[:, np.newaxis, np.newaxis], 2)
+        eq_loads = (damage[np.newaxis] / neq[:, np.newaxis, np.newaxis]) ** (1. / m[np.newaxis, :, np.newaxis])
+    eq_loads[:, :, ~valid] = np.nan
+    return eq_loads
+
+
+def eq_load_ampl_counts(ampls, counts, no_bins=46, m=[3, 4, 6, 8, 10, 12], neq=1):
+    """Equivalent load calculation from rainflow counted half cycles
+
+    Same as eq_load, but based on the amplitudes and number of half cycles, e.g.
+    as returned by RainflowWindapStream.ampl_counts
+
+    Parameters
+    ----------
+    ampls : array_like
+        Peak to peak amplitudes of the half cycles
+    counts : array_like
+        Number of half cycles with the corresponding amplitude
+    no_bins : int, optional
+        Number of bins in rainflow count histogram
+    m : int, float or array-like, optional
+        Wohler exponent (default is [3, 4, 6, 8, 10, 12])
+    neq : int, float or array-like, optional
+        The equivalent number of load cycles (default is 1, but normally the time duration in seconds is used)
+
+    Returns
+    -------
+    eq_loads : array-like
+        List of lists of equivalent loads for the corresponding equivalent number(s) and Wohler exponents
+        (nan if there are no cycles)
+    """
+    ampls, counts = np.asarray(ampls, dtype=np.float64), np.asarray(counts, dtype=np.float64)
+    if len(ampls) == 0 or ampls[counts > 0].max() == 0:
+        return [[np.nan for _m in np.atleast_1d(m)] for _neq in np.atleast_1d(neq)]
+    # same binning as cycle_matrix
+    ampl_bins = np.linspace(0, 1, num=no_bins + 1) * ampls[counts > 0].max()
+    cycles = np.histogram(ampls, ampl_bins, weights=counts)[0]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        ampl_bin_mean = np.histogram(ampls, ampl_bins, weights=counts * ampls)[0] / np.where(cycles, cycles, np.nan)
+        cycles = cycles / 2  # to get full cycles
+        return [[((np.nansum(cycles * ampl_bin_mean ** _m) / _neq) ** (1. / _m)) for _m in np.atleast_1d(m)] for _neq in np.atleast_1d(neq)]
+
+
 
 def cycle_matrix(signals, ampl_bins=10, mean_bins=10, rainflow_func=rainflow_windap):
     """Markow load cycle matrix
@@ -152,7 +272,10 @@ def cycle_matrix(signals, ampl_bins=10, mean_bins=10, rainflow_func=rainflow_win
     """
 
     if isinstance(signals[0], tuple):
-        weights, ampls, means = np.array([(np.zeros_like(ampl)+weight,ampl,mean) for weight, signal in signals for ampl,mean in rainflow_func(signal[:]).T], dtype=np.float64).T
+        ampls_means = [np.asarray(rainflow_func(signal[:]), dtype=np.float64).reshape(2, -1) for _, signal in signals]
+        weights = np.concatenate([np.full(am.shape[1], weight, dtype=np.float64)
+                                  for (weight, _), am in zip(signals, ampls_means)])
+        ampls, means = np.concatenate(ampls_means, 1)
     else:
         ampls, means = rainflow_func(signals[:])
         weights = np.ones_like(ampls)
@@ -169,6 +292,183 @@ def cycle_matrix(signals, ampl_bins=10, mean_bins=10, rainflow_func=rainflow_win
     return cycles, ampl_bin_mean, ampl_edges, mean_bin_mean, mean_edges
 
 
+def _bin_cycles(signal, weight, ampl_edges, mean_edges, rainflow_func, read_func=None):
+    """Rainflow count signal and return the weighted half cycles and amplitude/mean sums of each bin
+
+    Used by CycleMatrixAccumulator (also in worker processes)
+    """
+    if read_func is not None:
+        signal = read_func(signal)
+    ampls, means = np.asarray(rainflow_func(np.asarray(signal)[:]), dtype=np.float64).reshape(2, -1)
+    return _bin_ampl_means(ampls, means, weight, ampl_edges, mean_edges)
+
+
+def _bin_ampl_means(ampls, means, weights, ampl_edges, mean_edges):
+    n_ampl, n_mean = len(ampl_edges) - 1, len(mean_edges) - 1
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), ampls.shape)
+    # bin index as np.histogram: all bins are half-open except the last, which includes the right edge
+    ia = np.searchsorted(ampl_edges, ampls, side='right') - 1
+    ia[ampls == ampl_edges[-1]] = n_ampl - 1
+    im = np.searchsorted(mean_edges, means, side='right') - 1
+    im[means == mean_edges[-1]] = n_mean - 1
+    inside = (ia >= 0) & (ia < n_ampl) & (im >= 0) & (im < n_mean)
+    index = (ia * n_mean + im)[inside]
+    w = weights[inside]
+    size = n_ampl * n_mean
+    cycles = np.bincount(index, w, minlength=size).reshape(n_ampl, n_mean)
+    ampl_sum = np.bincount(index, w * ampls[inside], minlength=size).reshape(n_ampl, n_mean)
+    mean_sum = np.bincount(index, w * means[inside], minlength=size).reshape(n_ampl, n_mean)
+    return cycles, ampl_sum, mean_sum, weights[~inside].sum()
+
+
+def _bin_cycles_args(args):
+    return _bin_cycles(*args)
+
+
+class CycleMatrixAccumulator(object):
+    """Weighted Markow load cycle matrix accumulated signal by signal
+
+    The signals (e.g. all result files of a design load basis) are rainflow counted one at a time,
+    and only the weighted number of half cycles and the sum of the cycle amplitudes and means of
+    each bin are stored, i.e. the memory usage does not depend on the number and length of the signals.
+    As the bins are fixed in advance, the equivalent loads can differ slightly from eq_load,
+    which bins from 0 to the maximum amplitude of the signals
+
+    Parameters
+    ----------
+    ampl_edges : array_like
+        Amplitude bin edges (note, the amplitudes of rainflow_windap and rainflow_astm
+        are peak-to-peak ranges), e.g. np.linspace(0, max_range, 47)
+    mean_edges : array_like, optional
+        Mean value bin edges. If None (default), a single bin containing all mean values is used
+    rainflow_func : {rainflow_windap, rainflow_astm}, optional
+        The rainflow counting function to use (default is rainflow_windap)
+
+    Attributes
+    ----------
+    outside : float
+        Weighted number of half cycles outside the bins (ignored)
+
+    Examples
+    --------
+    >>> acc = CycleMatrixAccumulator(np.linspace(0, 2e4, 47))
+    >>> for weight, fname in zip(hours, files):
+    >>>     acc.add(load(fname), weight)
+    >>> acc.eq_load(m=[3, 10], neq=1e7)
+    >>> # or in parallel, where read_func(filename) returns the signal
+    >>> acc.add_files(files, read_func, hours, nr_cpus=8)
+    """
+
+    def __init__(self, ampl_edges, mean_edges=None, rainflow_func=rainflow_windap):
+        self.ampl_edges = np.asarray(ampl_edges, dtype=np.float64)
+        if mean_edges is None:
+            mean_edges = [-np.inf, np.inf]
+        self.mean_edges = np.asarray(mean_edges, dtype=np.float64)
+        self.rainflow_func = rainflow_func
+        shape = (len(self.ampl_edges) - 1, len(self.mean_edges) - 1)
+        self.cycles = np.zeros(shape)  # weighted number of half cycles
+        self.ampl_sum = np.zeros(shape)  # weighted sum of half cycle amplitudes
+        self.mean_sum = np.zeros(shape)  # weighted sum of half cycle means
+        self.outside = 0.
+
+    def _add_binned(self, binned):
+        cycles, ampl_sum, mean_sum, outside = binned
+        self.cycles += cycles
+        self.ampl_sum += ampl_sum
+        self.mean_sum += mean_sum
+        self.outside += outside
+
+    def add(self, signal, weight=1):
+        """Rainflow count signal and add its half cycles multiplied by weight"""
+        self._add_binned(_bin_cycles(signal, weight, self.ampl_edges, self.mean_edges, self.rainflow_func))
+        return self
+
+    def add_cycles(self, ampls, means, weights=1):
+        """Add rainflow counted half cycles (amplitudes and means)"""
+        ampls, means = np.asarray(ampls, dtype=np.float64), np.asarray(means, dtype=np.float64)
+        self._add_binned(_bin_ampl_means(ampls, means, weights, self.ampl_edges, self.mean_edges))
+        return self
+
+    def add_files(self, files, read_func, weights=None, nr_cpus=1):
+        """Add the signals of multiple files
+
+        Parameters
+        ----------
+        files : list
+            Filenames (or other arguments of read_func)
+        read_func : function
+            Function that returns the signal (1D array) of a file, read_func(filename).
+            Must be defined at module level if nr_cpus > 1
+        weights : array_like, optional
+            Weight of each file, default is 1
+        nr_cpus : int, optional
+            Number of processes. If None, all cpus are used
+        """
+        if weights is None:
+            weights = np.ones(len(files))
+        args = [(f, w, self.ampl_edges, self.mean_edges, self.rainflow_func, read_func)
+                for f, w in zip(files, weights)]
+        if nr_cpus is None:
+            nr_cpus = multiprocessing.cpu_count()
+        if nr_cpus > 1 and len(args) > 1:
+            with multiprocessing.Pool(min(nr_cpus, len(args))) as pool:
+                for binned in pool.imap_unordered(_bin_cycles_args, args):
+                    self._add_binned(binned)
+        else:
+            for arg in args:
+                self._add_binned(_bin_cycles_args(arg))
+        return self
+
+    def merge(self, other):
+        """Add the cycles of another CycleMatrixAccumulator with the same bins"""
+        if not (np.array_equal(self.ampl_edges, other.ampl_edges) and
+                np.array_equal(self.mean_edges, other.mean_edges)):
+            raise ValueError("Only CycleMatrixAccumulators with the same bin edges can be merged")
+        self._add_binned((other.cycles, other.ampl_sum, other.mean_sum, other.outside))
+        return self
+
+    def cycle_matrix(self):
+        """Markow load cycle matrix, same output as cycle_matrix
+
+        Returns
+        -------
+        cycles : ndarray, shape(ampl_bins, mean_bins)
+            Weighted number of full cycles
+        ampl_bin_mean : ndarray, shape(ampl_bins,)
+            The average cycle amplitude of the bins
+        ampl_edges : ndarray, shape(ampl_bins+1,)
+            The amplitude bin edges
+        mean_bin_mean : ndarray, shape(ampl_bins,)
+            The average cycle mean of the bins
+        mean_edges : ndarray, shape(mean_bins+1,)
+            The mean bin edges
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            cycles = np.where(self.cycles, self.cycles, np.nan)
+            ampl_bin_mean = np.nanmean(self.ampl_sum / cycles, 1)
+            mean_bin_mean = np.nanmean(self.mean_sum / cycles, 1)
+        return self.cycles / 2, ampl_bin_mean, self.ampl_edges, mean_bin_mean, self.mean_edges
+
+    def eq_load(self, m=[3, 4, 6, 8, 10, 12], neq=1):
+        """Equivalent loads of the accumulated cycles (see eq_load)
+
+        Returns
+        -------
+        eq_loads : list
+            List of lists of equivalent loads for the corresponding equivalent number(s) and Wohler exponents
+        """
+        if self.outside > 0:
+            warnings.warn("%g half cycles are outside the amplitude/mean bins and are ignored" % self.outside)
+        cycles = self.cycles.sum(1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            ampl_bin_mean = self.ampl_sum.sum(1) / np.where(cycles, cycles, np.nan)
+            cycles = cycles / 2  # to get full cycles
+            return [[((np.nansum(cycles * ampl_bin_mean ** _m) / _neq) ** (1. / _m)) for _m in np.atleast_1d(m)]
+                    for _neq in np.atleast_1d(neq)]
+
+
 def cycle_matrix2(signal, nrb_amp, nrb_mean, rainflow_func=rainflow_windap):
     """
     Same as wetb.fatigue_tools.fatigue.cycle_matrix but bin from min_amp to
@@ -6,8 +6,7 @@ from builtins import str
 from future import standard_library
 standard_library.install_aliases()
 import numpy as np
-from wetb.fatigue_tools.rainflowcounting import peak_trough
-from wetb.fatigue_tools.rainflowcounting import pair_range
+from wetb.utils.kernels import get_kernel
 
 
 def check_signal(signal):
@@ -71,18 +70,18 @@ def rainflow_windap(signal, levels=255., thresshold=(255 / 50)):
     if np.nanmax(signal) > 0:
         gain = np.nanmax(signal) / levels
         signal = signal / gain
-        signal = np.round(signal).astype(np.int)
+        signal = np.round(signal).astype(np.int_)
 
 
         # If possible the module is compiled using cython otherwise the python implementation is used
 
 
         #Convert to list of local minima/maxima where difference > thresshold
-        sig_ext = peak_trough.peak_trough(signal, thresshold)
+        sig_ext = get_kernel('peak_trough', 'peak_trough')(signal, thresshold)
 
 
         #rainflow count
-        ampl_mean = pair_range.pair_range_amplitude_mean(sig_ext)
+        ampl_mean = get_kernel('pair_range', 'pair_range_amplitude_mean')(sig_ext)
 
         ampl_mean = np.array(ampl_mean)
         ampl_mean = np.round(ampl_mean / thresshold) * gain * thresshold
@@ -91,6 +90,195 @@ def rainflow_windap(signal, levels=255., thresshold=(255 / 50)):
 
 
 
+def rainflow_windap_channels(signals, levels=255., thresshold=(255 / 50)):
+    """Windap equivalent rainflow counting of multiple channels
+
+    Same as rainflow_windap, but for a 2D array with one signal per column.
+    The discretization of all channels is performed in one vectorized
+    operation, while the (compiled if available) peak-trough and pair-range
+    routines are called once per channel.
+
+    Parameters
+    ----------
+    signals : array-like, shape (no_samples, no_channels)
+        The raw signals
+    levels : int, optional
+        The signals are discretize into this number of levels.
+        255 is equivalent to the implementation in Windap
+    thresshold : int, optional
+        Cycles smaller than this thresshold are ignored
+        255/50 is equivalent to the implementation in Windap
+
+    Returns
+    -------
+    ampl_mean_lst : list
+        List of length no_channels with an array of shape (2, no_half_cycles)
+        containing the amplitudes and mean values of the half cycles
+        (as returned by rainflow_windap) or None if the channel contains no
+        variation or non-finite values
+
+    Examples
+    --------
+    >>> signal = np.array([-2.0, 0.0, 1.0, 0.0, -3.0, 0.0, 5.0, 0.0, -1.0, 0.0, 3.0, 0.0, -4.0, 0.0, 4.0, 0.0, -2.0])
+    >>> (ampl1, mean1), (ampl2, mean2) = rainflow_windap_channels(np.array([signal, signal * 2]).T)
+    """
+    signals = np.asarray(signals, dtype=np.double)
+    if signals.ndim == 1:
+        signals = signals[:, np.newaxis]
+    elif signals.ndim != 2:
+        raise TypeError('signals must be 1D or 2D, not: ' + str(signals.ndim))
+
+    with np.errstate(invalid='ignore'):
+        offset = signals.min(0)
+        # channels as rows makes each signal contiguous in memory
+        signals = (signals - offset).T
+        span = signals.max(1)
+        valid = np.isfinite(span) & (span > 0)
+    gain = np.where(valid, span, levels) / levels
+    signals[~valid] = 0
+    signals /= gain[:, np.newaxis]
+    signals = np.round(signals).astype(np.int_)
+
+    ampl_mean_lst = []
+    for sig, g, o, v in zip(signals, gain, offset, valid):
+        if not v:
+            ampl_mean_lst.append(None)
+            continue
+        #Convert to list of local minima/maxima where difference > thresshold
+        sig_ext = get_kernel('peak_trough', 'peak_trough')(sig, thresshold)
+
+        #rainflow count
+        ampl_mean = np.array(get_kernel('pair_range', 'pair_range_amplitude_mean')(sig_ext), dtype=np.double).reshape(-1, 2)
+        ampl_mean = np.round(ampl_mean / thresshold) * g * thresshold
+        ampl_mean[:, 1] += o
+        ampl_mean_lst.append(ampl_mean.T)
+    return ampl_mean_lst
+
+
+
+class RainflowWindapStream(object):
+    """Windap equivalent rainflow counting of a signal given block by block
+
+    The signal is discretized with a fixed offset and gain (normally the
+    minimum and (maximum - minimum) / levels of the complete signal, which
+    makes the result equal to rainflow_windap of the complete signal).
+    The state of the peak-trough filter and the rainflow residue are kept
+    between the blocks, and only the number of half cycles of each
+    discrete amplitude level is stored, i.e. the memory usage does not
+    depend on the length of the signal.
+
+    Parameters
+    ----------
+    offset : float
+        Offset of the discretization (minimum of the signal)
+    gain : float
+        Gain of the discretization ((maximum - minimum) / levels)
+    levels : int, optional
+        The signal is discretize into this number of levels.
+        255 is equivalent to the implementation in Windap
+    thresshold : int, optional
+        Cycles smaller than this thresshold are ignored
+        255/50 is equivalent to the implementation in Windap
+
+    Examples
+    --------
+    >>> rf = RainflowWindapStream(signal.min(), (signal.max() - signal.min()) / 255)
+    >>> for block in np.array_split(signal, 10):
+    >>>     rf.add(block)
+    >>> ampl, counts = rf.ampl_counts()
+    """
+
+    def __init__(self, offset, gain, levels=255., thresshold=(255 / 50)):
+        self.offset = offset
+        self.gain = gain
+        self.levels = levels
+        self.thresshold = thresshold
+        self.zone = None  # None: no data, 0: begin, 1: min zone, 2: max zone
+        self.peak = self.trough = None
+        self.residue = []
+        self.counts = np.zeros(int(levels) + 1, dtype=np.int64)
+
+    def add(self, signal):
+        """Add the next block of the signal"""
+        x = np.round((np.asarray(signal, dtype=np.double) - self.offset) / self.gain).astype(np.int_)
+        x = np.clip(x, 0, int(self.levels))
+        # Points between a local minimum and maximum does not affect the peak-trough filter
+        x = x[np.r_[True, np.diff(x) != 0]]
+        if len(x) > 2:
+            d = np.sign(np.diff(x))
+            x = x[np.r_[True, d[1:] != d[:-1], True]]
+        R = self.thresshold
+        for v in x.tolist():
+            if self.zone is None:
+                self.peak = self.trough = v
+                self.zone = 0
+            elif self.zone == 0:
+                if v > self.peak:
+                    self.peak = v
+                    if self.peak - self.trough >= R:
+                        self._pair_range(self.residue, self.counts, self.trough)
+                        self.zone = 2
+                elif v < self.trough:
+                    self.trough = v
+                    if self.peak - self.trough >= R:
+                        self._pair_range(self.residue, self.counts, self.peak)
+                        self.zone = 1
+            elif self.zone == 1:
+                if v < self.trough:
+                    self.trough = v
+                elif v - self.trough >= R:
+                    self._pair_range(self.residue, self.counts, self.trough)
+                    self.peak = v
+                    self.zone = 2
+            else:
+                if v > self.peak:
+                    self.peak = v
+                elif self.peak - v >= R:
+                    self._pair_range(self.residue, self.counts, self.peak)
+                    self.trough = v
+                    self.zone = 1
+
+    @staticmethod
+    def _pair_range(S, counts, v):
+        # phase 1 of the pair-range counting: extract closed cycles from the residue, S
+        S.append(v)
+        while len(S) >= 4:
+            s3, s2, s1, s0 = S[-4:]
+            if (s2 > s3 and s1 >= s3 and s0 >= s2) or (s2 < s3 and s1 <= s3 and s0 <= s2):
+                counts[abs(s2 - s1)] += 2
+                del S[-3:-1]
+            else:
+                break
+
+    def ampl_counts(self):
+        """Amplitudes and number of half cycles of the signal added so far
+
+        The half cycles of the residue are included (phase 2 of the pair-range counting)
+        but the state is not changed, i.e. more blocks can be added afterwards
+
+        Returns
+        -------
+        ampl : ndarray
+            Peak to peak amplitudes (as returned by rainflow_windap)
+        counts : ndarray
+            Number of half cycles with the corresponding amplitude
+        """
+        counts = self.counts.copy()
+        S = list(self.residue)
+        # the last peak or trough is an extreme if the signal ends here
+        if self.zone == 1:
+            self._pair_range(S, counts, self.trough)
+        elif self.zone == 2:
+            self._pair_range(S, counts, self.peak)
+        if len(S) > 1:
+            np.add.at(counts, np.abs(np.diff(S)), 1)
+        # amplitude levels are rounded to multiples of the thresshold as in rainflow_windap
+        ampl_levels = np.round(np.arange(len(counts)) / self.thresshold)
+        ampl_levels, index = np.unique(ampl_levels[counts > 0], return_inverse=True)
+        return ampl_levels * self.gain * self.thresshold, np.bincount(index, counts[counts > 0]).astype(np.int64)
+
+
+
 def rainflow_astm(signal):
     """Matlab equivalent rainflow counting
 
@@ -124,10 +312,9 @@ def rainflow_astm(signal):
     # type <double> is reuqired by <find_extreme> and <rainflow>
     signal = signal.astype(np.double)
 
-    # Import find extremes and rainflow.
-    # If possible the module is compiled using cython otherwise the python implementation is used
-    
-    from wetb.fatigue_tools.rainflowcounting.rainflowcount_astm import find_extremes, rainflowcount
+    # find extremes and rainflow from the compiled (cython) module if available, see wetb.utils.kernels
+    find_extremes = get_kernel('rainflowcount_astm', 'find_extremes')
+    rainflowcount = get_kernel('rainflowcount_astm', 'rainflowcount')
 
     # Remove points which is not local minimum/maximum
     sig_ext = find_extremes(signal)
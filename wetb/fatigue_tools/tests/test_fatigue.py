@@ -14,14 +14,20 @@ standard_library.install_aliases()
 import unittest
 
 import numpy as np
-from wetb.fatigue_tools.fatigue import (eq_load, rainflow_astm,
-                                        rainflow_windap, cycle_matrix)
+from wetb.fatigue_tools.fatigue import (eq_load, eq_load_and_cycles, rainflow_astm,
+                                        rainflow_windap, cycle_matrix,
+                                        eq_load_channels, eq_load_ampl_counts,
+                                        RainflowWindapStream, CycleMatrixAccumulator)
 from wetb.hawc2 import Hawc2io
 import os
 
 testfilepath = os.path.join(os.path.dirname(__file__), 'test_files/')  # test file path
 
 
+def read_channel(ch):
+    return Hawc2io.ReadHawc2(testfilepath + "test").ReadBinary([ch]).flatten()
+
+
 class TestFatigueTools(unittest.TestCase):
 
     def test_leq_1hz(self):
@@ -133,6 +139,72 @@ class TestFatigueTools(unittest.TestCase):
                                                                                                                              0., 0.],
                                                                                                                          [0., 1., 2., 0.]]), 0.001)
 
+    def test_eq_load_channels_windap(self):
+        data = Hawc2io.ReadHawc2(testfilepath + "test").ReadBinary([2, 3, 4])
+        data = np.c_[data, np.ones(len(data))]
+        eq = eq_load_channels(data, neq=[1, 61])
+        self.assertEqual(eq.shape, (2, 6, 4))
+        for i in range(3):
+            np.testing.assert_allclose(eq[:, :, i], eq_load(data[:, i], neq=[1, 61]))
+        self.assertTrue(np.all(np.isnan(eq[:, :, 3])))
+
+    def test_eq_load_channels_astm(self):
+        data = Hawc2io.ReadHawc2(testfilepath + "test").ReadBinary([2, 3, 4])
+        eq = eq_load_channels(data, no_bins=20, m=[3, 4], neq=61, rainflow_func=rainflow_astm)
+        self.assertEqual(eq.shape, (1, 2, 3))
+        for i in range(3):
+            np.testing.assert_allclose(eq[:, :, i], eq_load(data[:, i], no_bins=20, m=[3, 4], neq=61,
+                                                             rainflow_func=rainflow_astm))
+
+    def test_rainflow_windap_stream(self):
+        data = Hawc2io.ReadHawc2(testfilepath + "test").ReadBinary([2]).flatten()
+        rf = RainflowWindapStream(data.min(), (data.max() - data.min()) / 255)
+        for block in np.array_split(data, 7):
+            rf.add(block)
+        ampl, counts = rf.ampl_counts()
+        ref_ampl = rainflow_windap(data)[0]
+        np.testing.assert_array_equal(ampl, np.unique(ref_ampl))
+        np.testing.assert_array_equal(counts, [np.sum(ref_ampl == a) for a in ampl])
+        np.testing.assert_allclose(eq_load_ampl_counts(ampl, counts, neq=61), eq_load(data, neq=61))
+
+    def test_cycle_matrix_accumulator(self):
+        data = Hawc2io.ReadHawc2(testfilepath + "test").ReadBinary([2, 3])
+        signals = [(.4, data[:, 0]), (.6, data[:, 1]), (1, data[:, 0] * 1.1)]
+        cycles, ampl_bin_mean, ampl_edges, mean_bin_mean, mean_edges = cycle_matrix(signals, 20, 5)
+        acc = CycleMatrixAccumulator(ampl_edges, mean_edges)
+        for weight, signal in signals:
+            acc.add(signal, weight)
+        res = acc.cycle_matrix()
+        np.testing.assert_allclose(res[0], cycles)
+        for r, ref in zip(res[1:], [ampl_bin_mean, ampl_edges, mean_bin_mean, mean_edges]):
+            np.testing.assert_allclose(r, ref)
+        self.assertEqual(acc.outside, 0)
+
+        # equivalent loads, one mean bin
+        eq, _, _, ampl_edges = eq_load_and_cycles(signals, no_bins=46, m=[3, 10], neq=[61, 1e7])
+        acc = CycleMatrixAccumulator(ampl_edges)
+        for weight, signal in signals:
+            acc.add(signal, weight)
+        np.testing.assert_allclose(acc.eq_load(m=[3, 10], neq=[61, 1e7]), eq)
+
+        # merge and add_files in parallel
+        acc1 = CycleMatrixAccumulator(ampl_edges).add(data[:, 0], .4)
+        acc2 = CycleMatrixAccumulator(ampl_edges).add_files([3], read_channel, [.6], nr_cpus=1)
+        acc2.add_files([2], lambda ch: read_channel(ch) * 1.1)
+        np.testing.assert_allclose(acc1.merge(acc2).cycles, acc.cycles)
+        acc3 = CycleMatrixAccumulator(ampl_edges).add_files([2, 3], read_channel, [.4, .6], nr_cpus=2)
+        acc3.add_cycles(*rainflow_windap(data[:, 0] * 1.1))
+        np.testing.assert_allclose(acc3.cycles, acc.cycles)
+        self.assertRaises(ValueError, acc1.merge, CycleMatrixAccumulator(ampl_edges[:-1]))
+
+    def test_cycle_matrix_accumulator_outside(self):
+        data = Hawc2io.ReadHawc2(testfilepath + "test").ReadBinary([2]).flatten()
+        ampls = rainflow_windap(data)[0]
+        acc = CycleMatrixAccumulator(np.linspace(0, ampls.max() / 2, 10)).add(data)
+        self.assertEqual(acc.outside, np.sum(ampls > ampls.max() / 2))
+        self.assertEqual(acc.cycles.sum() + acc.outside, len(ampls))
+        self.assertWarns(UserWarning, acc.eq_load)
+
     def test_astm_matlab_example(self):
         # example from https://se.mathworks.com/help/signal/ref/rainflow.html
         fs = 512
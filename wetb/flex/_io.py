@@ -7,7 +7,7 @@ import struct
 import numpy as np
 import os
 
-def load(filename, name_stop=8, dtype=np.float):
+def load(filename, name_stop=8, dtype=float):
     """
     Parameters
     ----------
@@ -13,13 +13,15 @@ Features:
 -    Optional specification of name, unit and description of attributes
 -    NaN support
 
-This module contains three methods:
+This module contains four methods:
 
 - load_
+- iter_blocks_
 - save_
 - append_block_
 
 .. _load: gtsdf.html#gtsdf.load
+.. _iter_blocks: gtsdf.html#gtsdf.iter_blocks
 .. _save: gtsdf.html#gtsdf.save
 .. _append_block: gtsdf.html#gtsdf.append_block
 
@@ -36,6 +38,7 @@ d = dir()
 
 from .gtsdf import save
 from .gtsdf import load
+from .gtsdf import iter_blocks
 from .gtsdf import append_block
 from .gtsdf import load_pandas
 from .gtsdf import add_statistic
@@ -16,8 +16,19 @@ import numpy.ma as ma
 import pandas as pd
 block_name_fmt = "block%04d"
 
-
-def load(filename, dtype=None):
+# Predefined storage profiles, see save
+storage_profiles = {'contiguous': {'chunk_layout': None, 'compression': None, 'compression_opts': None,
+                                   'shuffle': False},
+                    'column': {'chunk_layout': 'column', 'compression': 'gzip', 'compression_opts': 4,
+                               'shuffle': True},
+                    'row': {'chunk_layout': 'row', 'compression': 'gzip', 'compression_opts': 4,
+                            'shuffle': True},
+                    'column_lzf': {'chunk_layout': 'column', 'compression': 'lzf', 'compression_opts': None,
+                                   'shuffle': True}}
+chunk_size = 2**16  # number of values in a chunk
+
+
+def load(filename, dtype=None, columns=None, time_range=None, rows=None):
     """Load a 'General Time Series Data Format'-hdf5 datafile
 
     Parameters
@@ -28,6 +39,17 @@ def load(filename, dtype=None):
     dtype: data type, optional
         type of returned data array, e.g. float16, float32 or float64.
         If None(default) the type of the returned data depends on the type of the file data
+    columns : array_like, optional
+        Attributes to load, specified by index (int) or attribute name (str).
+        If None(default) all attributes are loaded.
+        Only the selected columns are read from the file
+    time_range : (start, stop), optional
+        Only load observations where start <= time < stop. Both start and stop may be None.
+        Only the corresponding rows are read from the file
+    rows : slice or (start, stop), optional
+        Only load the observations with row index start <= index < stop (counted over all blocks).
+        Negative start and stop count from the end, like python slices.
+        A slice may have a positive step, e.g. slice(None, None, 10) loads every 10th observation
 
     Returns
     -------
@@ -36,7 +58,7 @@ def load(filename, dtype=None):
     data : ndarray(dtype=dtype), shape (no_observations, no_attributes)
         data
     info : dict
-        info containing:
+        info containing (attribute names, units and descriptions of the selected columns only):
             - type: "General Time Series Data Format"
             - name: name of dataset or filename if not present in file
             - no_attributes: Number of attributes
@@ -48,7 +70,7 @@ def load(filename, dtype=None):
 
     See Also
     --------
-    gtsdf, save
+    gtsdf, save, iter_blocks
 
 
     Examples
@@ -90,12 +112,19 @@ def load(filename, dtype=None):
      'no_blocks': 1,
      'type': 'General time series data format',
      'description': 'MyDatasetDescription'}
+    >>> time, data, info = gtsdf.load('test.hdf5', columns=['Att2'], time_range=(12, None))
+    >>> print time
+    [ 12.  18.]
+    >>> print data
+    [[ 3.]
+     [ 5.]]
     """
     f = _open_h5py_file(filename)
     try:
         info = _load_info(f)
-        time, data = _load_timedata(f, dtype)
-        return time, data, info
+        columns = _column_indexes(info, columns)
+        time, data = _load_timedata(f, dtype, columns, time_range, rows)
+        return time, data, _select_info(info, columns)
     finally:
         try:
             f.close()
@@ -140,52 +169,193 @@ def _load_info(f):
     return info
 
 
-def _load_timedata(f, dtype):
-    no_blocks = f.attrs['no_blocks']
+def iter_blocks(filename, dtype=None, columns=None, time_range=None, rows=None):
+    """Iterate over the data blocks of a 'General Time Series Data Format'-hdf5 datafile
+
+    Same as load, but the data is read and returned block by block, which
+    allows streaming of files that do not fit into memory
+
+    Parameters
+    ----------
+    filename : str or h5py.File
+        filename or open file object
+    dtype, columns, time_range, rows
+        See load
+
+    Yields
+    ------
+    time : ndarray(dtype=float64), shape (no_block_observations,)
+        time of block
+    data : ndarray(dtype=dtype), shape (no_block_observations, no_attributes)
+        data of block
+
+    See Also
+    --------
+    gtsdf, load
+
+    Examples
+    --------
+    >>> for time, data in gtsdf.iter_blocks('test.hdf5', columns=[0]):
+    >>>     print (time.shape, data.shape)
+    """
+    f = _open_h5py_file(filename)
+    try:
+        columns = _column_indexes(_load_info(f), columns)
+        dtype = _check_timedata(f, dtype)
+        for block, block_time, row_slice in _block_selections(f, time_range, rows):
+            yield block_time, _load_block_data(block, dtype, columns, row_slice)
+    finally:
+        if not isinstance(filename, h5py.File):
+            f.close()
+
+
+def _column_indexes(info, columns):
+    """Convert attribute names and indexes to a list of indexes (None means all)"""
+    if columns is None:
+        return None
+    if isinstance(columns, (str, int, np.integer)):
+        columns = [columns]
+    names = info.get('attribute_names', [])
+    no_attributes = info['no_attributes']
+    indexes = []
+    for c in columns:
+        if isinstance(c, str):
+            indexes.append(names.index(c))
+            continue
+        i = int(c)
+        if not -no_attributes <= i < no_attributes:
+            raise IndexError("Column index %d is out of range for %d attributes" % (i, no_attributes))
+        indexes.append(i + no_attributes if i < 0 else i)
+    return indexes
+
+
+def _select_info(info, columns):
+    if columns is None:
+        return info
+    info = dict(info)
+    info['no_attributes'] = len(columns)
+    for k in ['attribute_names', 'attribute_units', 'attribute_descriptions']:
+        if k in info:
+            info[k] = [info[k][i] for i in columns]
+    return info
+
+
+def _check_timedata(f, dtype):
+    """Check that the first block exists and return the data type of the loaded data"""
     if (block_name_fmt % 0) not in f:
         raise ValueError("HDF5 file must contain a group named '%s'" % (block_name_fmt % 0))
     block0 = f[block_name_fmt % 0]
     if 'data' not in block0:
         raise ValueError("group %s must contain a dataset called 'data'" % (block_name_fmt % 0))
-    _, no_attributes = block0['data'].shape
 
     if dtype is None:
-        file_dtype = f[block_name_fmt % 0]['data'].dtype
+        file_dtype = block0['data'].dtype
         if "float" in str(file_dtype):
             dtype = file_dtype
         elif file_dtype in [np.int8, np.uint8, np.int16, np.uint16]:
             dtype = np.float32
         else:
             dtype = np.float64
-    time = []
-    data = []
-    for i in range(no_blocks):
-
-        try:
-            block = f[block_name_fmt % i]
-        except Error:
+    return dtype
+
+
+def _block_selections(f, time_range=None, rows=None):
+    """Yield block, time and row slice of the selected observations of each block.
+
+    Only the time (and the shape of the data) is read"""
+    step = 1
+    if isinstance(rows, slice):
+        step = 1 if rows.step is None else rows.step
+        if step < 1:
+            raise ValueError("Step of rows must be a positive integer")
+        rows = (rows.start, rows.stop)
+    row_start, row_stop = rows or (None, None)
+    if (row_start is not None and row_start < 0) or (row_stop is not None and row_stop < 0):
+        # resolve negative indexes against the total number of observations
+        no_rows = sum([f[block_name_fmt % i]['data'].shape[0] for i in range(f.attrs['no_blocks'])
+                       if (block_name_fmt % i) in f])
+        row_start, row_stop, _ = slice(row_start, row_stop).indices(no_rows)
+    t_start, t_stop = time_range or (None, None)
+    row_offset = 0
+    for i in range(f.attrs['no_blocks']):
+        if (block_name_fmt % i) not in f:
             continue
-        no_observations, no_attributes = block['data'].shape
-        block_time = (block.get('time', np.arange(no_observations))[:]).astype(np.float64)
+        block = f[block_name_fmt % i]
+        no_observations = block['data'].shape[0]
+        r0, r1 = 0, no_observations
+        if row_start is not None or step > 1:
+            # first row of the block that is start + n * step
+            start = row_start or 0
+            first = start if start >= row_offset else start + -((start - row_offset) // step) * step
+            r0 = min(first - row_offset, no_observations)
+        if row_stop is not None:
+            r1 = min(max(row_stop - row_offset, 0), no_observations)
+        row_offset += no_observations
+        if r1 <= r0:
+            continue
+
+        if 'time' in block:
+            block_time = block['time'][r0:r1:step].astype(np.float64)
+        else:
+            block_time = np.arange(r0, r1, step, dtype=np.float64)
         if 'time_step' in block.attrs:
             block_time *= block.attrs['time_step']
         if 'time_start' in block.attrs:
             block_time += block.attrs['time_start']
-        time.extend(block_time)
-
-        block_data = block['data'][:].astype(dtype)
-        if "int" in str(block['data'].dtype):
-            block_data[block_data == np.iinfo(block['data'].dtype).max] = np.nan
 
-        if 'gains' in block:
-            block_data *= block['gains'][:]
-        if 'offsets' in block:
-            block_data += block['offsets'][:]
-        data.append(block_data)
-
-    if no_blocks > 0:
-        data = np.vstack(data)
-    return np.array(time).astype(np.float64), np.array(data).astype(dtype)
+        if time_range is not None:
+            # time is increasing within a block
+            i0 = 0 if t_start is None else np.searchsorted(block_time, t_start, 'left')
+            i1 = len(block_time) if t_stop is None else np.searchsorted(block_time, t_stop, 'left')
+            if i1 <= i0:
+                continue
+            block_time = block_time[i0:i1]
+            r0, r1 = r0 + i0 * step, r0 + i1 * step
+        yield block, block_time, slice(r0, r1, step)
+
+
+def _load_block_data(block, dtype, columns=None, row_slice=slice(None), out=None):
+    """Read, decompress and (if out is given) insert the selected part of the data of a block"""
+    ds = block['data']
+    if columns is None:
+        columns = slice(None)
+        raw = ds[row_slice]
+    else:
+        # h5py requires increasing, unique indexes
+        read_columns, index = np.unique(columns, return_inverse=True)
+        raw = ds[row_slice, read_columns.tolist()][:, index]
+    if out is None:
+        out = np.empty(raw.shape, dtype=dtype)
+    out[:] = raw
+    if "int" in str(ds.dtype):
+        out[raw == np.iinfo(ds.dtype).max] = np.nan
+
+    if 'gains' in block:
+        out *= block['gains'][:][columns]
+    if 'offsets' in block:
+        out += block['offsets'][:][columns]
+    return out
+
+
+def _load_timedata(f, dtype, columns=None, time_range=None, rows=None):
+    dtype = _check_timedata(f, dtype)
+    no_blocks = f.attrs['no_blocks']
+    if no_blocks == 0:
+        return np.array([]).astype(np.float64), np.array([]).astype(dtype)
+
+    # read time and find the selected observations first so the output can be allocated once
+    selections = list(_block_selections(f, time_range, rows))
+    no_attributes = f[block_name_fmt % 0]['data'].shape[1] if columns is None else len(columns)
+    no_observations = sum([len(block_time) for _, block_time, _ in selections])
+    time = np.empty(no_observations, dtype=np.float64)
+    data = np.empty((no_observations, no_attributes), dtype=dtype)
+    i = 0
+    for block, block_time, row_slice in selections:
+        n = len(block_time)
+        time[i:i + n] = block_time
+        _load_block_data(block, dtype, columns, row_slice, out=data[i:i + n])
+        i += n
+    return time, data
 
 
 def save(filename, data, **kwargs):
@@ -219,6 +389,24 @@ def save(filename, data, **kwargs):
 
         - uint16: Data is compressed into 2 byte integers using a gain and offset factor for each attribute
         - float64: Data is stored with high precision using 8 byte floats
+    storage : str or dict, optional
+        HDF5 storage layout of the data blocks, default is 'contiguous' (no chunking and no compression).
+        Either the name of a profile in storage_profiles:
+
+        - 'contiguous': No chunking and no compression
+        - 'column': Chunks of one attribute (fast reading of few attributes), gzip level 4 and shuffle
+        - 'row': Chunks of all attributes (fast reading of time windows), gzip level 4 and shuffle
+        - 'column_lzf': As 'column' but with the faster lzf compression
+
+        or a dict with the keys:
+
+        - chunk_layout: 'column', 'row', None (contiguous) or chunk shape tuple
+        - compression: 'gzip', 'lzf' or None
+        - compression_opts: gzip level (0-9)
+        - shuffle: True or False
+
+        The storage profile is saved in the file attributes and used by append_block.
+        Files are loaded in the same way independent of the storage profile
 
     Notes
     -----
@@ -285,6 +473,9 @@ def _save_info(filename, data_shape, **kwargs):
                 assert(len(kwargs['attribute_descriptions']) == no_attributes)
             f.create_dataset("attribute_descriptions", data=np.array(
                 [v.encode('utf-8') for v in kwargs['attribute_descriptions']]))
+        for k, v in _storage_profile(kwargs.get('storage')).items():
+            if v is not None and v is not False:
+                f.attrs['storage_' + k] = v
         f.attrs['no_blocks'] = 0
     except Exception:
         raise
@@ -311,6 +502,9 @@ def append_block(filename, data, **kwargs):
 
         - uint16: Data is compressed into 2 byte integers using a gain and offset factor for each attribute
         - float64: Data is stored with high precision using 8 byte floats
+    storage : str or dict, optional
+        HDF5 storage layout of the data block, see save.
+        Default is the storage profile saved in the file attributes
 
     Notes
     -----
@@ -400,7 +594,11 @@ def append_block(filename, data, **kwargs):
             block.create_dataset('gains', data=gains)
             block.create_dataset('offsets', data=offsets)
 
-        block.create_dataset("data", data=data.astype(dtype))
+        if 'storage' in kwargs:
+            storage = _storage_profile(kwargs['storage'])
+        else:
+            storage = {k: f.attrs.get('storage_' + k) for k in storage_profiles['contiguous']}
+        block.create_dataset("data", data=data.astype(dtype), **_dataset_storage_kwargs(storage, data.shape))
         f.attrs['no_blocks'] = blocknr + 1
         f.close()
 
@@ -419,6 +617,56 @@ def append_block(filename, data, **kwargs):
         raise
 
 
+def _storage_profile(storage):
+    """Return storage profile dict from profile name, dict or None"""
+    if storage is None:
+        storage = 'contiguous'
+    if isinstance(storage, str):
+        if storage not in storage_profiles:
+            raise ValueError("Unknown storage profile, '%s'. Valid profiles are: %s" %
+                             (storage, ", ".join(sorted(storage_profiles))))
+        return dict(storage_profiles[storage])
+    profile = dict(storage_profiles['contiguous'])
+    for k, v in storage.items():
+        if k not in profile:
+            raise ValueError("Unknown storage option, '%s'. Valid options are: %s" % (k, ", ".join(sorted(profile))))
+        profile[k] = v
+    if profile['compression'] not in ['gzip', 'lzf', None]:
+        raise ValueError("Compression must be 'gzip', 'lzf' or None, not '%s'" % profile['compression'])
+    return profile
+
+
+def _dataset_storage_kwargs(storage, shape):
+    """Convert storage profile to h5py.create_dataset keyword arguments"""
+    no_observations, no_attributes = shape
+    if no_observations * no_attributes == 0:
+        return {}
+    chunk_layout = decode(storage.get('chunk_layout'))
+    if chunk_layout is None:
+        chunks = None
+    elif isinstance(chunk_layout, str):
+        if chunk_layout == 'column':
+            chunks = (min(no_observations, chunk_size), 1)
+        elif chunk_layout == 'row':
+            chunks = (min(no_observations, max(1, chunk_size // no_attributes)), no_attributes)
+        else:
+            raise ValueError("chunk_layout must be 'column', 'row', None or a chunk shape, not '%s'" % chunk_layout)
+    else:
+        chunks = tuple([min(int(c), n) for c, n in zip(chunk_layout, shape)])
+    kwargs = {}
+    compression = decode(storage.get('compression'))
+    if compression is not None:
+        kwargs['compression'] = compression
+        if compression == 'gzip' and storage.get('compression_opts') is not None:
+            kwargs['compression_opts'] = int(storage['compression_opts'])
+    if storage.get('shuffle'):
+        kwargs['shuffle'] = True
+    if kwargs or chunks is not None:
+        # filters require chunking, let h5py guess the chunk shape if not specified
+        kwargs['chunks'] = chunks or True
+    return kwargs
+
+
 def load_pandas(filename, dtype=None):
     import pandas as pd
     time, data, info = load(filename, dtype)
@@ -453,13 +701,83 @@ def _add_statistic_data(file, stat_data, statistics=['min', 'mean', 'max', 'std'
     f = h5py.File(file, "a")
     stat_grp = f.create_group("Statistic")
     stat_grp.create_dataset("statistic_names", data=np.array([v.encode('utf-8') for v in statistics]))
-    stat_grp.create_dataset("statistic_data", data=stat_data.astype(np.float))
+    stat_grp.create_dataset("statistic_data", data=stat_data.astype(np.float64))
     f.close()
 
 
+def _get_statistic_stream(filename, statistics=['min', 'mean', 'max', 'std', 'eq3', 'eq4', 'eq6', 'eq8', 'eq10', 'eq12']):
+    """Calculate statistics block by block, i.e. without loading the complete file into memory
+
+    min, max, mean, std and var are updated for each block (Welford/Chan).
+    Equivalent loads requires a second pass, where the signals are rainflow counted
+    by RainflowWindapStream, that keeps the residue between the blocks, i.e.
+    the result is the same as eq_load of the complete signal.
+    Other statistics are not supported (returns None)
+    """
+    eq_stats = [stat for stat in statistics if stat.startswith("eq") and stat[2:].isdigit()]
+    eq_m = [float(stat[2:]) for stat in eq_stats]
+    if any([stat not in ['min', 'mean', 'max', 'std', 'var'] and not (stat.startswith("eq") and stat[2:].isdigit())
+            for stat in statistics]):
+        return None
+
+    n, t0, t1, t_last = 0, None, None, None
+    for time, data in iter_blocks(filename):
+        n_b = data.shape[0]
+        min_b, max_b = np.min(data, 0), np.max(data, 0)
+        mean_b = np.mean(data, 0, dtype=np.float64)
+        M2_b = np.sum((data - mean_b) ** 2, 0, dtype=np.float64)
+        if n == 0:
+            mins, maxs, mean, M2 = min_b, max_b, mean_b, M2_b
+            t0 = time[0]
+        else:
+            mins, maxs = np.minimum(mins, min_b), np.maximum(maxs, max_b)
+            delta = mean_b - mean
+            mean = mean + delta * n_b / (n + n_b)
+            M2 = M2 + M2_b + delta ** 2 * n * n_b / (n + n_b)
+        if t1 is None and n + n_b > 1:
+            t1 = time[1 - n]
+        n += n_b
+        t_last = time[-1]
+    if n == 0:
+        raise ValueError("%s contains no data" % filename)
+
+    stat_dict = {'min': mins, 'max': maxs, 'mean': mean, 'var': M2 / n, 'std': np.sqrt(M2 / n)}
+    if eq_m:
+        from wetb.fatigue_tools.fatigue import RainflowWindapStream, eq_load_ampl_counts
+        neq = t_last - t0 + (t1 if t1 is not None else t0) - t0
+        levels = 255
+        with np.errstate(invalid='ignore'):
+            valid = np.where(np.isfinite(mins) & np.isfinite(maxs) & (maxs > mins))[0]
+        rf_lst = [RainflowWindapStream(mins[i], (np.float64(maxs[i]) - mins[i]) / levels, levels) for i in valid]
+        for _, data in iter_blocks(filename):
+            for i, rf in zip(valid, rf_lst):
+                rf.add(data[:, i])
+        eq = np.full((len(mins), len(eq_m)), np.nan)
+        for i, rf in zip(valid, rf_lst):
+            eq[i] = eq_load_ampl_counts(*rf.ampl_counts(), no_bins=46, m=eq_m, neq=neq)[0]
+        stat_dict.update({stat: eq[:, j] for j, stat in enumerate(eq_stats)})
+    return np.array([stat_dict[stat] for stat in statistics]).T
+
+
 def add_statistic(file, statistics=['min', 'mean', 'max', 'std', 'eq3', 'eq4', 'eq6', 'eq8', 'eq10', 'eq12']):
-    time, data, info = load(file)
-    stat_data = _get_statistic(time, data, statistics)
+    """Calculate statistics of a 'General Time Series Data Format'-hdf5 datafile and add them to the file
+
+    The statistics are calculated block by block (see iter_blocks), so files that do not fit into
+    memory are supported, if statistics only contains min, mean, max, std, var and eq<m>.
+    Other statistics (numpy functions) requires the complete file to be loaded.
+
+    Parameters
+    ----------
+    file : str
+        filename
+    statistics : list of str, optional
+        Names of statistics, e.g. 'min', 'mean', 'max', 'std' or 'eq<m>' (equivalent load
+        with Wohler exponent, m, and neq equal to the time duration)
+    """
+    stat_data = _get_statistic_stream(file, statistics)
+    if stat_data is None:
+        time, data, info = load(file)
+        stat_data = _get_statistic(time, data, statistics)
     _add_statistic_data(file, stat_data, statistics)
 
 
@@ -472,7 +790,14 @@ def load_statistic(filename):
 
 
 def compress2statistics(filename, statistics=['min', 'mean', 'max', 'std', 'eq3', 'eq4', 'eq6', 'eq8', 'eq10', 'eq12']):
-    time, data, info = load(filename)
-    stat_data = _get_statistic(time, data, statistics)
-    _save_info(filename, data.shape, **info)
+    stat_data = _get_statistic_stream(filename, statistics)
+    if stat_data is None:
+        time, data, info = load(filename)
+        stat_data = _get_statistic(time, data, statistics)
+    f = _open_h5py_file(filename)
+    try:
+        info = _load_info(f)
+    finally:
+        f.close()
+    _save_info(filename, (0, info['no_attributes']), **info)
     _add_statistic_data(filename, stat_data, statistics)
@@ -236,6 +236,111 @@ class Test_gsdf(unittest.TestCase):
         self.assertEqual(data[1, 1], 11.986652374267578)
         self.assertEqual(info['attribute_names'][1], "WSP gl. coo.,Vy")
 
+    def test_load_columns(self):
+        time, data, info = gtsdf.load(tfp + 'test.hdf5')
+        names = info['attribute_names']
+        time_sel, data_sel, info_sel = gtsdf.load(tfp + 'test.hdf5', columns=[5, names[3], 1])
+        np.testing.assert_array_equal(time_sel, time)
+        np.testing.assert_array_equal(data_sel, data[:, [5, 3, 1]])
+        self.assertEqual(info_sel['attribute_names'], [names[5], names[3], names[1]])
+        self.assertEqual(info_sel['no_attributes'], 3)
+
+    def test_load_time_range_rows(self):
+        fn = tmp_path + 'time_range.hdf5'
+        d = np.arange(48, dtype=np.float32).reshape(24, 2)
+        gtsdf.save(fn, d, time_step=.5, dtype=np.float32)
+        gtsdf.append_block(fn, d + 48, time_start=12, time_step=.5)
+        time, data, _ = gtsdf.load(fn)
+        time_sel, data_sel, _ = gtsdf.load(fn, time_range=(10, 13))
+        np.testing.assert_array_equal(time_sel, np.arange(10, 13, .5))
+        np.testing.assert_array_equal(data_sel, data[(time >= 10) & (time < 13)])
+        time_sel, data_sel, _ = gtsdf.load(fn, columns=[1], rows=slice(20, 30))
+        np.testing.assert_array_equal(time_sel, time[20:30])
+        np.testing.assert_array_equal(data_sel, data[20:30, 1:])
+
+    def test_load_columns_out_of_range(self):
+        fn = tmp_path + 'columns.hdf5'
+        d = np.arange(48, dtype=np.float32).reshape(8, 6)
+        gtsdf.save(fn, d, dtype=np.float32)
+        np.testing.assert_array_equal(gtsdf.load(fn, columns=[-1, 0])[1], d[:, [5, 0]])
+        self.assertRaises(IndexError, gtsdf.load, fn, columns=[6])
+        self.assertRaises(IndexError, gtsdf.load, fn, columns=[7])
+        self.assertRaises(IndexError, gtsdf.load, fn, columns=[-7])
+
+    def test_load_rows_step(self):
+        fn = tmp_path + 'rows_step.hdf5'
+        d = np.arange(50, dtype=np.float32).reshape(25, 2)
+        gtsdf.save(fn, d, time_step=.5, dtype=np.float32)
+        gtsdf.append_block(fn, d + 50, time_start=12.5, time_step=.5)
+        time, data, _ = gtsdf.load(fn)
+        for rows in [slice(None, None, 3), slice(2, 45, 4), slice(23, 30, 2), slice(1, None, 7)]:
+            time_sel, data_sel, _ = gtsdf.load(fn, rows=rows)
+            np.testing.assert_array_equal(time_sel, time[rows])
+            np.testing.assert_array_equal(data_sel, data[rows])
+        time_sel, data_sel, _ = gtsdf.load(fn, time_range=(10, 15), rows=slice(None, None, 3))
+        m = (time[::3] >= 10) & (time[::3] < 15)
+        np.testing.assert_array_equal(time_sel, time[::3][m])
+        np.testing.assert_array_equal(data_sel, data[::3][m])
+        self.assertRaises(ValueError, gtsdf.load, fn, rows=slice(None, None, -1))
+
+    def test_load_rows_negative(self):
+        fn = tmp_path + 'rows_negative.hdf5'
+        d = np.arange(100, dtype=np.float32).reshape(50, 2)
+        gtsdf.save(fn, d, time_step=.5, dtype=np.float32)
+        gtsdf.append_block(fn, d + 100, time_start=25, time_step=.5)
+        time, data, _ = gtsdf.load(fn)
+        for rows in [slice(-10, None), slice(None, -5), slice(-60, -45), slice(-75, 90, 4), slice(-200, 10)]:
+            time_sel, data_sel, _ = gtsdf.load(fn, rows=rows)
+            np.testing.assert_array_equal(time_sel, time[rows])
+            np.testing.assert_array_equal(data_sel, data[rows])
+        time_sel, data_sel, _ = gtsdf.load(fn, rows=(-10, None))
+        np.testing.assert_array_equal(data_sel, data[-10:])
+        blocks = list(gtsdf.iter_blocks(fn, rows=slice(-55, -5)))
+        np.testing.assert_array_equal(np.concatenate([d for _, d in blocks]), data[-55:-5])
+
+    def test_iter_blocks(self):
+        fn = tmp_path + 'iter_blocks.hdf5'
+        d = np.arange(48, dtype=np.float32).reshape(24, 2)
+        gtsdf.save(fn, d)
+        gtsdf.append_block(fn, d + 48)
+        time, data, _ = gtsdf.load(fn)
+        blocks = list(gtsdf.iter_blocks(fn, columns=[1]))
+        self.assertEqual(len(blocks), 2)
+        np.testing.assert_array_equal(np.concatenate([t for t, _ in blocks]), time)
+        np.testing.assert_array_equal(np.concatenate([d for _, d in blocks]), data[:, 1:])
+
+    def test_storage_profile(self):
+        fn = tmp_path + 'storage.hdf5'
+        d = np.arange(48, dtype=np.float32).reshape(24, 2)
+        for storage in ['column', 'row', 'column_lzf']:
+            gtsdf.save(fn, d, storage=storage)
+            gtsdf.append_block(fn, d + 48)
+            f = h5py.File(fn, 'r')
+            self.assertEqual(f.attrs['storage_chunk_layout'], storage.split("_")[0])
+            for block in ['block0000', 'block0001']:
+                self.assertEqual(f[block]['data'].compression, gtsdf.gtsdf.storage_profiles[storage]['compression'])
+                self.assertTrue(f[block]['data'].shuffle)
+            f.close()
+            _, data, _ = gtsdf.load(fn)
+            np.testing.assert_array_almost_equal(data, np.append(d, d + 48, 0), 3)
+        f = h5py.File(fn, 'r')
+        self.assertEqual(f['block0000']['data'].chunks, (24, 1))
+        f.close()
+
+    def test_storage_dict(self):
+        fn = tmp_path + 'storage.hdf5'
+        d = np.arange(48, dtype=np.float32).reshape(24, 2)
+        gtsdf.save(fn, d, dtype=np.float32, storage={'chunk_layout': (8, 2), 'compression': 'gzip',
+                                                     'compression_opts': 9})
+        f = h5py.File(fn, 'r')
+        self.assertEqual(f['block0000']['data'].chunks, (8, 2))
+        self.assertEqual(f['block0000']['data'].compression_opts, 9)
+        self.assertFalse(f['block0000']['data'].shuffle)
+        f.close()
+        np.testing.assert_array_equal(gtsdf.load(fn)[1], d)
+        self.assertRaises(ValueError, gtsdf.save, fn, d, storage='unknown')
+        self.assertRaises(ValueError, gtsdf.save, fn, d, storage={'compression': 'zip'})
+
     def test_gtsdf_dataset(self):
         ds = gtsdf.Dataset(tfp + 'test.hdf5')
         self.assertEqual(ds.data.shape, (2440, 49))
@@ -15,6 +15,7 @@ standard_library.install_aliases()
 import h5py
 import numpy as np
 from wetb import gtsdf
+from wetb.gtsdf.gtsdf import _get_statistic
 
 import unittest
 import os
@@ -52,6 +53,28 @@ class Test_gsdf(unittest.TestCase):
         gtsdf.compress2statistics(fn)
         self.assertLess(os.path.getsize(fn) * 50, os.path.getsize(tfp + 'test.hdf5'))
 
+    def test_gtsdf_stat_blocks(self):
+        time, data, info = gtsdf.load(tfp + 'test.hdf5')
+        fn = tmp_path + "test_stat_blocks.hdf5"
+        gtsdf.save(fn, data[:1000], time=time[:1000], **info)
+        gtsdf.append_block(fn, data[1000:1700], time=time[1000:1700])
+        gtsdf.append_block(fn, data[1700:], time=time[1700:])
+        gtsdf.add_statistic(fn)
+        stat_data, _ = gtsdf.load_statistic(fn)
+        ref = _get_statistic(time, data)
+        np.testing.assert_array_almost_equal(stat_data.values, ref, 5)
+        np.testing.assert_array_equal(np.isnan(stat_data.values), np.isnan(ref))
+
+    def test_gtsdf_stat_median(self):
+        # statistics that cannot be calculated block by block
+        time, data, info = gtsdf.load(tfp + 'test.hdf5')
+        fn = tmp_path + "test_stat_median.hdf5"
+        gtsdf.save(fn, data, time=time, **info)
+        gtsdf.add_statistic(fn, ['median', 'eq4'])
+        stat_data, _ = gtsdf.load_statistic(fn)
+        np.testing.assert_array_almost_equal(stat_data['median'], np.median(data, 0))
+
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
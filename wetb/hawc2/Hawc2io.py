@@ -20,8 +20,15 @@ call ex.:
     file()  => all channels as 1,2,3,...
     file.t => time vector
 
+    # binary files can be memory-mapped, so only the requested channels are
+    # read from disk and scaled (optionally to float32)
+    file = ReadHawc2("HAWC2ex/test", mmap=True, dtype=np.float32)
+    file.ReadBinaryRaw()  => memory-mapped (NrSc, NrCh) int16 view, unscaled
+    file.ReadChannel(2)  => scaled channel 3, cached (read-only) for reuse
+
 1. version: 19/4-2011
 2. version: 5/11-2015 fixed columns to get description right, fixed time vector (mmpe@dtu.dk)
+3. version: memory-mapped reading of binary files
 
 Need to be done:
     * add error handling for allmost every thing
@@ -162,11 +169,15 @@ class ReadHawc2(object):
 ################################################################################
 # init function, load channel and other general result file info
 
-    def __init__(self, FileName, ReadOnly=0):
+    def __init__(self, FileName, ReadOnly=0, mmap=False, dtype=np.float64):
         self.FileName = FileName
         self.ReadOnly = ReadOnly
+        self.mmap = mmap  # memory-map binary files instead of reading them
+        self.dtype = dtype  # data type of the scaled binary channels
         self.Iknown = []  # to keep track of what has been read all ready
         self.Data = np.zeros(0)
+        self._raw = None  # memory-mapped int16 data (binary files only)
+        self._channels = {}  # scaled channels read via the memory-map
         if FileName.lower().endswith('.sel') or os.path.isfile(FileName + ".sel"):
             self._ReadSelFile()
         elif FileName.lower().endswith('.int') or os.path.isfile(self.FileName + ".int"):
@@ -183,14 +194,47 @@ class ReadHawc2(object):
     def ReadBinary(self, ChVec=[]):
         if not ChVec:
             ChVec = range(0, self.NrCh)
+        data = np.empty((self.NrSc, len(ChVec)), dtype=self.dtype)
+        if self.mmap:
+            raw = self.ReadBinaryRaw()
+            for j, i in enumerate(ChVec):
+                np.multiply(raw[:, i], self.ScaleFactor[i], out=data[:, j])
+            return data
         with open(self.FileName + '.dat', 'rb') as fid:
-            data = np.zeros((self.NrSc, len(ChVec)))
             j = 0
             for i in ChVec:
                 fid.seek(i * self.NrSc * 2, 0)
                 data[:, j] = np.fromfile(fid, 'int16', self.NrSc) * self.ScaleFactor[i]
                 j += 1
         return data
+
+    def ReadBinaryRaw(self):
+        """Memory-mapped, read-only view of the unscaled int16 binary data
+
+        The channels are stored one after the other in the binary file, so
+        each column of the returned (NrSc, NrCh) view is contiguous on disk.
+        Nothing is read before the view is indexed.
+        """
+        if self._raw is None:
+            self._raw = np.memmap(self.FileName + '.dat', dtype='int16', mode='r',
+                                  shape=(self.NrCh, self.NrSc)).T
+        return self._raw
+
+    def ReadChannel(self, i):
+        """Scaled binary channel i as a 1D array of type self.dtype
+
+        Only channel i is read (via the memory-map) and, unless ReadOnly,
+        the result is cached, so repeated calls do not copy any data.
+        The cached channels are read-only, i.e. in-place modifications of
+        the returned array (which would change later reads) raise an error.
+        """
+        if i in self._channels:
+            return self._channels[i]
+        channel = np.multiply(self.ReadBinaryRaw()[:, i], self.ScaleFactor[i], dtype=self.dtype)
+        if not self.ReadOnly:
+            channel.flags.writeable = False
+            self._channels[i] = channel
+        return channel
 ################################################################################
 # Read results in ASCII format
 
@@ -253,6 +297,9 @@ class ReadHawc2(object):
         elif max(ChVec) >= self.NrCh:
             print("to high channel number")
             return
+        # memory-mapped binary file: stack the (cached) requested channels
+        if self.mmap and self.FileFormat == 'HAWC2_BINARY':
+            return np.column_stack([self.ReadChannel(i) for i in ChVec])
         # if ReadOnly, read data but no storeing in memory
         if self.ReadOnly:
             return self.ReadAll(ChVec)
@@ -1,4 +1,7 @@
 import itertools
+import multiprocessing
+import re
+import time
 import jinja2
 import pandas as pd
 import click
@@ -7,6 +10,19 @@ from pathlib import Path
 from pandas.core.base import PandasObject
 from wetb.hawc2.htc_file import HTCFile
 
+_writer = None  # HAWC2InputWriter used by the worker processes of write_all
+
+
+def _init_worker(writer):
+    global _writer
+    _writer = writer
+
+
+def _write_row(args):
+    out_fn, kwargs = args
+    _writer.write(out_fn, **kwargs)
+    return out_fn
+
 
 class HAWC2InputWriter(object):
     """
@@ -17,12 +33,50 @@ class HAWC2InputWriter(object):
     def __init__(self, base_htc_file, **kwargs):
         self.base_htc_file = base_htc_file
         self.contents = None
+        self._base_htc = None
         for k, v in kwargs.items():
             setattr(self, k, v)
 
     def __call__(self, out_fn, **kwargs):
         return self.write(out_fn, **kwargs)
 
+    def __getstate__(self):
+        # the contents and the parsed base htc file are not needed in the worker processes of write_all
+        state = self.__dict__.copy()
+        state['contents'] = None
+        state['_base_htc'] = None
+        return state
+
+    def get_htc(self, **kwargs):
+        """
+        Returns a new HTCFile object of the base htc file.
+
+        If the base htc file (and its include files) does not contain jinja tags, it is parsed only once
+        and copies of the parsed file are returned. Otherwise the file is rendered with kwargs as
+        jinja tags and parsed.
+
+        Args:
+            kwargs: The input contents (used as jinja tags)
+
+        Returns:
+            htc (HTCFile): htc file object
+        """
+        if getattr(self, '_base_htc', None) is None or self._base_htc[0] != self.base_htc_file:
+            def is_template(fn):
+                with open(fn, encoding='cp1252') as fid:
+                    return re.search(r"{{|{%|{#", fid.read()) is not None
+            htc = None
+            if not is_template(self.base_htc_file):
+                htc = HTCFile(self.base_htc_file)
+                htc.contents  # load
+                if any([is_template(htc.unix_path(fn)) for fn in htc.htc_inputfiles]):
+                    htc = None
+            self._base_htc = (self.base_htc_file, htc)
+        htc = self._base_htc[1]
+        if htc is None:
+            return HTCFile(self.base_htc_file, jinja_tags=kwargs)
+        return htc.copy()
+
     def from_pandas(self, dataFrame):
         """
         Loads a DataFrame of contents from a PandasObject
@@ -104,7 +158,7 @@ class HAWC2InputWriter(object):
         # if isinstance(params, PandasObject):
         #     params = params.to_dict()
 
-        htc = HTCFile(self.base_htc_file, jinja_tags=kwargs)
+        htc = self.get_htc(**kwargs)
         for k, v in kwargs.items():
             k = k.replace('/', '.')
             if '.' in k:
@@ -115,29 +169,59 @@ class HAWC2InputWriter(object):
                 if hasattr(self, 'set_%s' % k):
                     getattr(self, 'set_%s' % k)(htc, **kwargs)
 
-            htc.save(out_fn)
+        htc.save(out_fn)
 
-    def write_all(self, out_dir):
+    def write_all(self, out_dir, nr_cpus=1, chunksize=100):
         '''
         Renders all htc files for the set of contents.
         args:
             out_dir (str or pathlib.Path): The directory where the htc files are generated.
+            nr_cpus (int, optional): Number of processes used to write the htc files.
+                If None, all cpus are used. Default is 1, i.e. no multiprocessing.
+                The writer object must be picklable (i.e. subclasses must be defined at module level)
+            chunksize (int, optional): Number of htc files sent to a worker process at a time
+        returns:
+            filenames (list of pathlib.Path): The generated htc files in the order of the contents
         '''
         out_dir = Path(out_dir)
         out_dir.mkdir(parents=True, exist_ok=True)
 
         N = len(self.contents)
+        if nr_cpus is None:
+            nr_cpus = multiprocessing.cpu_count()
+        nr_cpus = max(1, min(nr_cpus, N))
 
         print(f'Generating {N} htc files in directory: {out_dir}')
+        t0 = time.time()
 
-        with click.progressbar(self.contents.iterrows(), length=N) as bar:
-            for _, row in bar:
-                if 'Folder' in row and row.Folder:
-                    path = out_dir / row.Folder
-                else:
-                    path = out_dir
-
-                self.write(path / (row.Name + '.htc'), **row.to_dict())
+        tasks = []
+        for row in self.contents.to_dict('records'):
+            if 'Folder' in row and row['Folder']:
+                path = out_dir / row['Folder']
+            else:
+                path = out_dir
+            tasks.append((path / (row['Name'] + '.htc'), row))
+
+        # create the folders in advance to avoid race conditions in the worker processes
+        for folder in sorted(set([fn.parent for fn, _ in tasks])):
+            folder.mkdir(parents=True, exist_ok=True)
+
+        if nr_cpus == 1:
+            _init_worker(self)
+            try:
+                with click.progressbar(tasks, length=N) as bar:
+                    filenames = [_write_row(task) for task in bar]
+            finally:
+                _init_worker(None)
+        else:
+            with multiprocessing.Pool(nr_cpus, initializer=_init_worker, initargs=(self,)) as pool:
+                # imap returns the results in the order of the tasks
+                with click.progressbar(pool.imap(_write_row, tasks, chunksize=chunksize), length=N) as bar:
+                    filenames = list(bar)
+
+        t = time.time() - t0
+        print(f'{N} htc files generated in {t:.1f}s ({N / max(t, 1e-6):.0f} files/s) using {nr_cpus} process(es)')
+        return filenames
 
 
 class JinjaWriter(HAWC2InputWriter):
@@ -28,11 +28,12 @@ class OrderedDict(collections.OrderedDict):
 
 
 def parse_next_line(lines):
-    _3to2list = list(lines.pop(0).split(";"))
+    """Pop next line and the following comment lines from lines (a collections.deque)"""
+    _3to2list = list(lines.popleft().split(";"))
     line, comments, = _3to2list[:1] + [_3to2list[1:]]
     comments = ";".join(comments).rstrip()
     while lines and lines[0].lstrip().startswith(";"):
-        comments += "\n%s" % lines.pop(0).rstrip()
+        comments += "\n%s" % lines.popleft().rstrip()
     return line.strip(), comments
 
 
@@ -83,7 +84,8 @@ class HTCContents(object):
     def __setattr__(self, *args, **kwargs):
         _3to2list1 = list(args)
         k, v, = _3to2list1[:1] + _3to2list1[1:]
-        if k in dir(self):  # in ['section', 'filename', 'lines']:
+        # same as "k in dir(self)", but much faster
+        if k in self.__dict__ or hasattr(type(self), k):  # in ['section', 'filename', 'lines']:
             if isinstance(self, HTCLine) and k == 'values':
                 args = k, list(v)
             return object.__setattr__(self, *args, **kwargs)
@@ -296,9 +298,14 @@ class HTCSection(HTCContents):
             raise ValueError("Multiple contents with '%s=%s' not found" % (key, value))
 
     def copy(self):
-        copy = HTCSection(name=self.name_, begin_comments=self.begin_comments, end_comments=self.end_comments)
+        # the attributes are copied directly (bypassing __init__ and __setattr__) for speed
+        copy = object.__new__(self.__class__)
+        copy.__dict__.update(self.__dict__)
+        contents = OrderedDict()
         for k, v in self.contents.items():
-            copy.contents[k] = v.copy()
+            contents[k] = v.copy()
+            contents[k].__dict__['parent'] = copy
+        copy.__dict__['contents'] = contents
         return copy
 
 
@@ -360,7 +367,10 @@ class HTCLine(HTCContents):
         return s
 
     def copy(self):
-        return HTCLine(name=self.name_, values=self.values, comments=self.comments)
+        copy = object.__new__(self.__class__)
+        copy.__dict__.update(self.__dict__)
+        copy.__dict__['values'] = list(self.values)
+        return copy
 
 
 class HTCOutputSection(HTCSection):
@@ -381,7 +391,7 @@ class HTCOutputSection(HTCSection):
 
     def line_from_line(self, lines):
         while len(lines) and lines[0].strip() == "":
-            lines.pop(0)
+            lines.popleft()
         name = lines[0].split()[0].strip()
         if name in ['filename', 'data_format', 'buffer', 'time']:
             return HTCLine.from_lines(lines)
@@ -394,6 +404,13 @@ class HTCOutputSection(HTCSection):
         else:
             return HTCSection._add_contents(self, contents)
 
+    def copy(self):
+        copy = HTCSection.copy(self)
+        copy.__dict__['sensors'] = [s.copy() for s in self.sensors]
+        for s in copy.sensors:
+            s.__dict__['parent'] = copy
+        return copy
+
     def __str__(self, level=0):
         s = "%sbegin %s;%s\n" % ("  " * level, self.name_, ("", "\t" + self.begin_comments)
                                  [len(self.begin_comments.strip()) > 0])
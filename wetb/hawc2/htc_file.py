@@ -17,11 +17,28 @@ from wetb.hawc2.hawc2_pbs_file import HAWC2PBSFile
 import jinja2
 from wetb.utils.cluster_tools.os_path import fixcase, abspath, pjoin
 standard_library.install_aliases()
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from wetb.hawc2.htc_contents import HTCContents, HTCSection, HTCLine
 from wetb.hawc2.htc_extensions import HTCDefaults, HTCExtensions
+from wetb.utils.caching import _LRUCache
 import os
 
+# Cache of rendered htc/include files, key: (filename, mtime, size, jinja_tags)
+_file_cache = _LRUCache(256)
+# Cache of parsed htc files (parse tree), key: (class, filename, modelpath, jinja_tags)
+_parse_cache = _LRUCache(32)
+
+
+def clear_cache():
+    """Clear the caches of read and parsed htc files"""
+    _file_cache.clear()
+    _parse_cache.clear()
+
+
+def _file_signature(filename):
+    st = os.stat(filename)
+    return st.st_mtime_ns, st.st_size
+
 
 def fmt_path(path):
     return path.lower().replace("\\", "/")
@@ -137,8 +154,39 @@ class HTCFile(HTCContents, HTCDefaults, HTCExtensions):
             raise ValueError(
                 "Modelpath cannot be autodetected for '%s'.\nInput files not found near htc file" % self.filename)
 
+    def _cache_enabled(self):
+        # only local files are cached
+        return type(self).open is HTCFile.open
+
+    def _parse_cache_key(self):
+        return (self.__class__, self.filename, self.modelpath, repr(sorted(self.jinja_tags.items())))
+
     def _load(self):
         self.reset()
+        use_cache = self.filename is not None and self._cache_enabled()
+        if use_cache:
+            # reuse the parse tree if neither the htc file nor the included files have changed
+            found, cached = _parse_cache.get(self._parse_cache_key())
+            if found:
+                signatures, htcfile = cached
+                try:
+                    if all([_file_signature(f) == sig for f, sig in signatures]):
+                        self._copy_contents(htcfile, self)
+                        return
+                except OSError:
+                    pass
+        self._parse()
+        if use_cache:
+            try:
+                signatures = [(f, _file_signature(f))
+                              for f in [self.unix_path(f) for f in [self.filename] + self.htc_inputfiles]]
+            except OSError:
+                return
+            htcfile = HTCFile.__new__(HTCFile)
+            self._copy_contents(self, htcfile)
+            _parse_cache.put(self._parse_cache_key(), (signatures, htcfile))
+
+    def _parse(self):
         self.initial_comments = []
         self.htc_inputfiles = []
         self.contents = OrderedDict()
@@ -147,12 +195,12 @@ class HTCFile(HTCContents, HTCDefaults, HTCExtensions):
         else:
             lines = self.readlines(self.filename)
 
-        lines = [l.strip() for l in lines]
+        # deque for linear time parsing (lines are consumed from the left)
+        lines = deque([l.strip() for l in lines])
 
-        #lines = copy(self.lines)
         while lines:
             if lines[0].startswith(";"):
-                self.initial_comments.append(lines.pop(0).strip() + "\n")
+                self.initial_comments.append(lines.popleft().strip() + "\n")
             elif lines[0].lower().startswith("begin"):
                 self._add_contents(HTCSection.from_lines(lines))
             else:
@@ -164,6 +212,36 @@ class HTCFile(HTCContents, HTCDefaults, HTCExtensions):
     def reset(self):
         self._contents = None
 
+    @staticmethod
+    def _copy_contents(source, target):
+        object.__setattr__(target, 'initial_comments', list(source.initial_comments))
+        object.__setattr__(target, 'htc_inputfiles', list(source.htc_inputfiles))
+        contents = OrderedDict()
+        for k, v in source._contents.items():
+            contents[k] = v.copy()
+            contents[k].__dict__['parent'] = target
+        object.__setattr__(target, '_contents', contents)
+
+    def copy(self):
+        """Return a copy of the htc file
+
+        The copy is independent of the original, i.e. changes to one do not affect the other, and it
+        is much faster than reading and parsing the file again, e.g.
+
+        >>> master = HTCFile('htc/master.htc')
+        >>> for wsp in [4, 6, 8]:
+        >>>     htc = master.copy()
+        >>>     htc.wind.wsp = wsp
+        >>>     htc.set_name("wsp%d" % wsp)
+        >>>     htc.save()
+        """
+        copy = self.__class__.__new__(self.__class__)
+        copy.__dict__.update(self.__dict__)
+        object.__setattr__(copy, 'jinja_tags', dict(self.jinja_tags))
+        if self._contents is not None:
+            self._copy_contents(self, copy)
+        return copy
+
     @property
     def contents(self):
         if self._contents is None:
@@ -175,14 +253,23 @@ class HTCFile(HTCContents, HTCDefaults, HTCExtensions):
         self._contents = value
 
     def readfilelines(self, filename):
-        with self.open(self.unix_path(filename), encoding='cp1252') as fid:
+        filename = self.unix_path(filename)
+        if self._cache_enabled():
+            key = (filename,) + _file_signature(filename) + (repr(sorted(self.jinja_tags.items())),)
+            found, lines = _file_cache.get(key)
+            if found:
+                return list(lines)
+        with self.open(filename, encoding='cp1252') as fid:
             txt = fid.read()
         if txt[:10].encode().startswith(b'\xc3\xaf\xc2\xbb\xc2\xbf'):
             txt = txt[3:]
         if self.jinja_tags:
             template = jinja2.Template(txt)
             txt = template.render(**self.jinja_tags)
-        return txt.replace("\r", "").split("\n")
+        lines = txt.replace("\r", "").split("\n")
+        if self._cache_enabled():
+            _file_cache.put(key, tuple(lines))
+        return lines
 
     def readlines(self, filename):
         if filename != self.filename:  # self.filename may be changed by set_name/save. Added it when needed instead
@@ -25,6 +25,27 @@ DONE = "Simulation succeded"
 
 
 class LogInterpreter(object):
+    """Incremental interpreter of the HAWC2 log file
+
+    The log text is parsed chunk by chunk (see update_status) and only the
+    structured state (status, current time, errors etc.) is kept together with
+    the last tail_size characters of the log (txt). The cost of an update is
+    therefore proportional to the size of the new text and not the size of the
+    log file, which is important when many simulations are monitored at the
+    same time.
+
+    Attributes
+    ----------
+    txt : str
+        The last tail_size characters of the log
+    errors : list
+        The first max_errors error messages (including repetitions)
+    error_counts : OrderedDict
+        Number of occurrences of each error message
+    """
+    tail_size = 10000
+    max_errors = 1000
+
     def __init__(self, time_stop):
         self.time_stop = time_stop
         self.hawc2version = "Unknown"
@@ -38,10 +59,12 @@ class LogInterpreter(object):
         self.status = UNKNOWN
         self.pct = 0
         self.errors = []
+        self.error_counts = OrderedDict()
         self.info = []
         self.start_time = None
         self.current_time = 0
         self.remaining_time = None
+        self._partial_line = ""
 
     def __str__(self):
         return self.txt
@@ -70,56 +93,74 @@ class LogInterpreter(object):
         else:
             if self.status == UNKNOWN or self.status == MISSING:
                 self.status = PENDING
-            txt = new_lines
-            self.txt += txt
+            self.txt = (self.txt + new_lines)[-self.tail_size:]
             if self.status == PENDING and self.position > 0:
                 self.status = INITIALIZATION
 
-            if len(txt) > 0:
-                if len(txt.strip()):
-                    self.lastline = (txt.strip()[max(0, txt.strip().rfind("\n")):]).strip()
-                if self.status == INITIALIZATION:
-                    _3to2list = list(txt.split("Starting simulation"))
-                    init_txt, rest, = _3to2list[:1] + [_3to2list[1:]]
-                    if self.hawc2version == "Unknown" and "Version ID" in init_txt:
-                        self.hawc2version = txt.split("Version ID : ")[1].split("\n", 1)[0].strip()
-                    if "*** ERROR ***" in init_txt:
-                        self.errors.extend([l.strip() for l in init_txt.strip().split("\n") if "error" in l.lower()])
-                    if rest:
-                        txt = rest[0]
-                        self.status = SIMULATING
-
-                if self.status == SIMULATING:
-                    if self.start_time is None and not 'Elapsed time' in self.lastline:
-                        i1 = txt.rfind("Global time")
-                        if i1 > -1:
-                            self.start_time = (self.extract_time(txt[i1:]), time.time())
-
-                    _3to2list1 = list(txt.split('Elapsed time'))
-                    simulation_txt, rest, = _3to2list1[:1] + [_3to2list1[1:]]
-                    if "*** ERROR ***" in simulation_txt:
-                        self.errors.extend([l.strip()
-                                            for l in simulation_txt.strip().split("\n") if "error" in l.lower()])
-                    i1 = simulation_txt.rfind("Global time")
-                    if i1 > -1:
-                        self.current_time = self.extract_time(simulation_txt[i1:])
-                    if self.current_time is not None and self.time_stop > 0:
-                        self.pct = int(100 * self.current_time // self.time_stop)
-                    try:
-                        self.remaining_time = (
-                            time.time() - self.start_time[1]) / (self.current_time - self.start_time[0]) * (self.time_stop - self.current_time)
-                    except:
-                        pass
-                    if rest:
-                        self.status = DONE
-                        self.pct = 100
-                        self.elapsed_time = float(rest[0].replace(":", "").strip())
+            if len(new_lines) > 0:
+                txt = self.txt.rstrip()
+                if txt:
+                    self.lastline = txt[txt.rfind("\n") + 1:].strip()
+
+                # Only complete lines are interpreted. The last incomplete line is kept until the rest of it arrives
+                txt = self._partial_line + new_lines
+                i = txt.rfind("\n") + 1
+                txt, self._partial_line = txt[:i], txt[i:]
+                if txt:
+                    self._interpret(txt)
+                if self.status == SIMULATING and 'Elapsed time' in self._partial_line:
+                    # HAWC2 does not terminate the last line
+                    self._interpret(self._partial_line)
+
+    def _add_errors(self, txt):
+        for l in txt.strip().split("\n"):
+            if "error" in l.lower():
+                l = l.strip()
+                self.error_counts[l] = self.error_counts.get(l, 0) + 1
+                if len(self.errors) < self.max_errors:
+                    self.errors.append(l)
+
+    def _interpret(self, txt):
+        """Interpret a chunk of complete lines"""
+        if self.status == INITIALIZATION:
+            init_txt, started, txt = txt.partition("Starting simulation")
+            if self.hawc2version == "Unknown" and "Version ID : " in init_txt:
+                self.hawc2version = init_txt.split("Version ID : ")[1].split("\n", 1)[0].strip()
+            if "*** ERROR ***" in init_txt:
+                self._add_errors(init_txt)
+            if started:
+                self.status = SIMULATING
+
+        if self.status == SIMULATING:
+            simulation_txt, done, rest = txt.partition('Elapsed time')
+            if "*** ERROR ***" in simulation_txt:
+                self._add_errors(simulation_txt)
+            i1 = simulation_txt.rfind("Global time")
+            if i1 > -1:
+                self.current_time = self.extract_time(simulation_txt[i1:])
+                if self.start_time is None and not done:
+                    self.start_time = (self.current_time, time.time())
+            if self.current_time is not None and self.time_stop > 0:
+                self.pct = int(100 * self.current_time // self.time_stop)
+            try:
+                self.remaining_time = (
+                    time.time() - self.start_time[1]) / (self.current_time - self.start_time[0]) * (self.time_stop - self.current_time)
+            except:
+                pass
+            if done:
+                self.status = DONE
+                self.pct = 100
+                txt = done + rest
+
+        if self.status == DONE and 'Elapsed time' in txt:
+            try:
+                self.elapsed_time = float(txt.split('Elapsed time', 1)[1].split("\n", 1)[0].replace(":", "").strip())
+            except ValueError:
+                # the elapsed time is not written yet
+                pass
 
     def error_str(self):
-        error_dict = OrderedDict()
-        for error in self.errors:
-            error_dict[error] = error_dict.get(error, 0) + 1
-        return "\n".join([("%d x %s" % (v, k), k)[v == 1] for k, v in error_dict.items()])
+        return "\n".join([("%d x %s" % (v, k), k)[v == 1] for k, v in self.error_counts.items()])
 
     def remaining_time_str(self):
         if self.remaining_time:
@@ -135,6 +176,7 @@ class LogInterpreter(object):
 
 
 class LogFile(LogInterpreter):
+    block_size = 2**20
 
     def __init__(self, log_filename, time_stop):
         self.filename = log_filename
@@ -167,14 +209,15 @@ class LogFile(LogInterpreter):
         else:
             if self.status == UNKNOWN or self.status == MISSING:
                 self.status = PENDING
-            s = self.status
             with open(self.filename, 'rb') as fid:
                 fid.seek(self.position)
-                txt = fid.read()
-            self.position += len(txt)
-            txt = txt.decode(encoding='cp1252', errors='strict')
-            if txt != "":
-                LogInterpreter.update_status(self, txt)
+                while True:
+                    # read in blocks to limit the memory usage of large new logs
+                    txt = fid.read(self.block_size)
+                    if not txt:
+                        break
+                    self.position += len(txt)
+                    LogInterpreter.update_status(self, txt.decode(encoding='cp1252', errors='strict'))
 
 
 class LogInfo(LogFile):
@@ -187,6 +230,7 @@ class LogInfo(LogFile):
             self.remaining_time = None
         self.lastline = lastline
         self.errors = []
+        self.error_counts = OrderedDict()
 
     def update_status(self):
         pass
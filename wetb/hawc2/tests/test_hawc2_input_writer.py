@@ -77,3 +77,34 @@ def test_CVF2pandas(h2writer):
     h2writer.from_CVF(constants, variables, functions)
     assert len(h2writer.contents) == 9
     assert set(list(h2writer.contents)) == set(['simulation.time_stop', 'wind.wsp', 'wind.tint', 'Name'])
+
+
+def test_write_all_parallel(h2writer):
+    wsp_lst = [4, 6, 8, 10, 12]
+    names = ['c%d' % wsp for wsp in wsp_lst]
+    df = pd.DataFrame({'wind.wsp': wsp_lst, 'Name': names, 'Folder': ['tmp', 'tmp', 'tmp/sub', 'tmp/sub', 'tmp']})
+    h2writer.from_pandas(df)
+    filenames = h2writer.write_all(path, nr_cpus=2, chunksize=2)
+    assert [fn.stem for fn in filenames] == names
+    for fn, wsp in zip(filenames, wsp_lst):
+        assert HTCFile(str(fn)).wind.wsp[0] == wsp
+
+
+def test_write_all_parse_once(h2writer):
+    df = pd.DataFrame({'wind.wsp': [4, 6], 'Name': ['c1', 'c2'], 'Folder': ['tmp', 'tmp']})
+    h2writer.from_pandas(df)
+    h2writer.write_all(path)
+    base_htc = h2writer._base_htc[1]
+    assert base_htc is not None
+    # the parsed base htc file is not modified
+    assert base_htc.wind.wsp[0] != 6
+
+
+def test_write_all_jinja():
+    writer = HAWC2InputWriter(path + 'DTU_10MW_RWT.htc.j2')
+    writer.from_pandas(pd.DataFrame({'wsp': [4, 6], 'tint': [.1, .2], 'time_stop': [100, 100],
+                                     'Name': ['j1', 'j2'], 'Folder': ['tmp', 'tmp']}))
+    writer.write_all(path)
+    assert writer._base_htc[1] is None
+    for i, wsp in enumerate([4, 6], 1):
+        assert HTCFile(path + "tmp/j%d.htc" % i).wind.wsp[0] == wsp
@@ -48,6 +48,29 @@ class TestHAWC2IO(unittest.TestCase):
         self.assertEqual(file()[799, 0], 20)
         self.assertAlmostEqual(file()[1, 0], .05)
 
+    def test_read_binary_mmap(self):
+        ref = ReadHawc2(testfilepath + "Hawc2bin", ReadOnly=1)
+        file = ReadHawc2(testfilepath + "Hawc2bin", mmap=True)
+        self.assertEqual(file.ReadBinaryRaw().shape, (800, 28))
+        self.assertEqual(file.ReadBinaryRaw().dtype, np.int16)
+        np.testing.assert_array_equal(file([0, 2, 1, 1]), ref([0, 2, 1, 1]))
+        np.testing.assert_array_equal(file(), ref())
+        np.testing.assert_array_equal(file.ReadAll([3, 4]), ref.ReadAll([3, 4]))
+        # channels are cached and not copied
+        self.assertTrue(file.ReadChannel(2) is file.ReadChannel(2))
+        # and cannot be modified by the caller
+        with self.assertRaises(ValueError):
+            file.ReadChannel(2)[0] = 1
+        self.assertTrue(file([2]).flags.writeable)
+
+    def test_read_binary_mmap_float32(self):
+        ref = ReadHawc2(testfilepath + "Hawc2bin", ReadOnly=1)
+        file = ReadHawc2(testfilepath + "Hawc2bin", ReadOnly=1, mmap=True, dtype=np.float32)
+        self.assertEqual(file([1, 5]).dtype, np.float32)
+        np.testing.assert_allclose(file([1, 5]), ref([1, 5]), rtol=1e-6)
+        self.assertEqual(file._channels, {})
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
@@ -413,6 +413,44 @@ end turb_export;"""
                       jinja_tags={'wsp': 12, 'log': None, 'begin_step': 100})
         print(htc)
 
+    def test_copy(self):
+        htc = HTCFile(self.testfilepath + "test.htc")
+        htc2 = htc.copy()
+        self.assertEqual(str(htc), str(htc2))
+        time_stop = htc.simulation.time_stop[0]
+        htc2.simulation.time_stop = time_stop + 100
+        htc2.output.sensors[0].values = [1]
+        self.assertEqual(htc.simulation.time_stop[0], time_stop)
+        self.assertEqual(htc2.simulation.time_stop[0], time_stop + 100)
+        htc2.new_htc_structure.main_body.name[0] = "test"
+        self.assertNotEqual(htc.new_htc_structure.main_body.name[0], "test")
+        self.assertNotEqual(htc.output.sensors[0].values, [1])
+        self.assertIs(htc2.output.sensors[0].parent, htc2.output)
+        self.assertIs(htc2.simulation.parent, htc2)
+        self.assertEqual(len(htc.output.sensors), len(htc2.output.sensors))
+
+    def test_parse_cache(self):
+        from wetb.hawc2 import htc_file
+        htc_file.clear_cache()
+        fn = self.testfilepath + "tmp_cache.htc"
+        try:
+            with open(fn, 'w') as fid:
+                fid.write("begin simulation;\n  time_stop 100;\nend simulation;\nexit;")
+            htc = HTCFile(fn)
+            htc.simulation.time_stop = 200  # must not modify the cached version
+            self.assertEqual(HTCFile(fn).simulation.time_stop[0], 100)
+            with open(fn, 'w') as fid:
+                fid.write("begin simulation;\n  time_stop 300;\nend simulation;\nexit;")
+            os.utime(fn, ns=(os.stat(fn).st_mtime_ns + 10**9,) * 2)
+            self.assertEqual(HTCFile(fn).simulation.time_stop[0], 300)
+        finally:
+            os.remove(fn)
+
+    def test_jinja_tags_cache(self):
+        htc = HTCFile(self.testfilepath + "jinja.htc", jinja_tags={'wsp': 12, 'log': None, 'begin_step': 100})
+        htc2 = HTCFile(self.testfilepath + "jinja.htc", jinja_tags={'wsp': 10, 'log': None, 'begin_step': 100})
+        self.assertNotEqual(str(htc), str(htc2))
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
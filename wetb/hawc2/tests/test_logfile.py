@@ -11,7 +11,7 @@ from io import open
 from future import standard_library
 standard_library.install_aliases()
 import unittest
-from wetb.hawc2.log_file import LogFile, \
+from wetb.hawc2.log_file import LogFile, LogInterpreter, \
     INITIALIZATION, SIMULATING, DONE, PENDING, UNKNOWN
 import time
 from wetb.hawc2 import log_file
@@ -126,6 +126,32 @@ class TestLogFile(unittest.TestCase):
 
 
 
+    def test_incremental(self):
+        # feed the log in small chunks that split lines and messages
+        for f, time_stop in [('finish.log', 200), ('simulation_error2.log', 2), ('init_error.log', 2)]:
+            ref = LogFile(self.tfp + 'logfiles/' + f, time_stop)
+            with open(self.tfp + 'logfiles/' + f, 'rb') as fid:
+                txt = fid.read().decode('cp1252')
+            logfile = LogInterpreter(time_stop)
+            for i in range(0, len(txt), 37):
+                logfile.position = i + 37
+                logfile.update_status(txt[i:i + 37])
+            for attr in ['status', 'pct', 'errors', 'elapsed_time', 'hawc2version', 'lastline']:
+                self.assertEqual(getattr(logfile, attr), getattr(ref, attr), (f, attr))
+            self.assertEqual(logfile.error_str(), ref.error_str())
+
+    def test_bounded_memory(self):
+        f = self.tfp + 'logfiles/simulation_error2.log'
+        logfile = LogFile(f, 2)
+        logfile.tail_size, logfile.max_errors = 100, 10
+        logfile.reset()
+        logfile.block_size = 1000
+        logfile.update_status()
+        self.assertEqual(logfile.status, DONE)
+        self.assertEqual(len(logfile.txt), 100)
+        self.assertEqual(len(logfile.errors), 10)
+        self.assertEqual(logfile.error_str(), '30 x *** ERROR *** Out of limits in user defined shear field - limit value used')
+
     def check(self, logfilename, phases, end_status, end_errors=[]):
         logfile = LogFile(logfilename + "_", 2)
         logfile.clear()
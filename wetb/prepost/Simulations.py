@@ -32,6 +32,9 @@ import datetime
 import math
 import pickle
 import re
+import glob
+import multiprocessing
+import multiprocessing.pool
 # what is actually the difference between warnings and logging.warn?
 # for which context is which better?
 import warnings
@@ -559,6 +562,153 @@ def run_local(cases, silent=False, check_log=True):
 
     return cases
 
+def _run_local_case(args):
+    """Run a single HAWC2 case in its run_dir (without changing the working
+    directory of the process) and check its log file. Used by
+    run_local_parallel.
+    """
+    case, tags, check_log, stdout_dir = args
+    run_dir = tags['[run_dir]']
+    # for backward compatibility assume default HAWC2 executable
+    hawc2_exe = tags.get('[hawc2_exe]', 'hawc2-latest')
+    cmd  = 'WINEDEBUG=-all WINEARCH=win32 WINEPREFIX=~/.wine32 wine'
+    cmd += " %s %s%s" % (hawc2_exe, tags['[htc_dir]'], case)
+    # remove any escaping in tags and case for security reasons
+    cmd = cmd.replace('\\','')
+    # create the required directories, relative to run_dir
+    dirkeys = ['[data_dir]', '[htc_dir]', '[res_dir]', '[log_dir]',
+               '[eigenfreq_dir]', '[animation_dir]', '[turb_dir]',
+               '[micro_dir]', '[meander_dir]', '[opt_dir]', '[control_dir]',
+               '[mooring_dir]', '[hydro_dir]', '[externalforce]']
+    for dirkey in dirkeys:
+        if tags.get(dirkey):
+            os.makedirs(os.path.join(run_dir, tags[dirkey]), exist_ok=True)
+
+    # stream STDOUT to a file instead of keeping it in memory
+    if stdout_dir is None:
+        stdout_dir = tags.get('[pbs_out_dir]', tags['[log_dir]'])
+    stdout_dir = os.path.join(run_dir, stdout_dir)
+    os.makedirs(stdout_dir, exist_ok=True)
+    case_base = case[:-4] if case.endswith('.htc') else case
+    stdout_file = os.path.join(stdout_dir, case_base + '.out')
+
+    start = time()
+    with open(stdout_file, 'w') as fid:
+        p = sproc.Popen(cmd, stdout=fid, stderr=sproc.STDOUT, shell=True,
+                        cwd=run_dir)
+        p.wait()
+    exec_time = time() - start
+
+    # where there any errors in the output?
+    sim_ok = True
+    with open(stdout_file, 'r', errors='replace') as fid:
+        for line in fid:
+            if line[:14] in [' *** ERROR ***', 'forrtl: severe']:
+                sim_ok = False
+
+    msglistlog, msglistlog2 = [], {}
+    log_file = os.path.join(run_dir, tags['[log_dir]'], case_base + '.log')
+    if check_log and not os.path.isfile(log_file):
+        logging.warn('HAWC2 did not write a log file: %s' % log_file)
+        sim_ok = False
+    elif check_log:
+        errorlogs = logcheck_case(ErrorLogs(silent=True), {case:tags}, case,
+                                  silent=True)
+        msglistlog, msglistlog2 = errorlogs.MsgListLog, errorlogs.MsgListLog2
+        errors, exitok = msglistlog2[log_file][:2]
+        sim_ok = not errors and exitok
+    return case, stdout_file, sim_ok, exec_time, msglistlog, msglistlog2
+
+
+def run_local_parallel(cases, nr_cpus=None, silent=False, check_log=True,
+                       stdout_dir=None):
+    """
+    Run all HAWC2 simulations locally and in parallel from cases
+    ============================================================
+
+    Same as run_local, but nr_cpus simulations are running at the same time.
+    Each simulation is launched in its own [run_dir] (the working directory
+    of the python process is not changed), the STDOUT of HAWC2 is written
+    to a file, and the log file is checked as soon as a simulation has
+    finished.
+
+    Parameters
+    ----------
+
+    cases : dict{ case : dict{tag : value} }
+        Dictionary where each case is a key and its value a dictionary holding
+        all the tags/value pairs as used for that case
+
+    nr_cpus : int, default=None
+        Number of concurrent simulations. If None, the number of CPUs of the
+        machine is used.
+
+    silent : boolean, default=False
+        When False, the progress and execution time of each simulation is
+        printed.
+
+    check_log : boolean, default=True
+        Check the log file of each case after execution. The log analysis is
+        saved in [run_dir]/[log_dir]/[sim_id]_ErrorLog.csv
+
+    stdout_dir : str, default=None
+        Directory (relative to [run_dir]) of the STDOUT files (case.out).
+        If None, [pbs_out_dir] is used.
+
+    Returns
+    -------
+
+    cases : dict{ case : dict{tag : value} }
+        Updated cases with the STDOUT file name (sim_STDOUT_file) and
+        [hawc2_sim_ok] of the respective HAWC2 simulation
+    """
+    if nr_cpus is None:
+        nr_cpus = multiprocessing.cpu_count()
+    nr = len(cases)
+    if not silent:
+        print('')
+        print('='*79)
+        print('Be advised, launching %i HAWC2 simulation(s) on %i CPUs' % (nr, nr_cpus))
+        print('run dir: %s' % cases[list(cases.keys())[0]]['[run_dir]'])
+        print('')
+
+    if check_log:
+        errorlogs = ErrorLogs(silent=silent)
+
+    args = [(case, tags, check_log, stdout_dir) for case, tags in cases.items()]
+    # the workers are only waiting for HAWC2, so threads are sufficient
+    pool = multiprocessing.pool.ThreadPool(nr_cpus)
+    try:
+        for ii, res in enumerate(pool.imap_unordered(_run_local_case, args)):
+            case, stdout_file, sim_ok, exec_time, msglistlog, msglistlog2 = res
+            cases[case]['sim_STDOUT_file'] = stdout_file
+            cases[case]['[hawc2_sim_ok]'] = sim_ok
+            if check_log:
+                errorlogs.MsgListLog += msglistlog
+                errorlogs.MsgListLog2.update(msglistlog2)
+            if not silent:
+                print('%4i/%i : %s%s, %8.2f sec, ok: %s' % (ii+1, nr,
+                      cases[case]['[htc_dir]'], case, exec_time, sim_ok))
+    finally:
+        pool.close()
+        pool.join()
+
+    if check_log:
+        # take the last case to determine sim_id, run_dir and log_dir
+        sim_id = cases[case]['[sim_id]']
+        run_dir = cases[case]['[run_dir]']
+        log_dir = cases[case]['[log_dir]']
+        errorlogs.ResultFile = sim_id + '_ErrorLog.csv'
+        errorlogs.PathToLogs = os.path.join(run_dir, log_dir)
+        errorlogs.save()
+
+    if not silent:
+        print('\nHAWC2 has done all of its parallel magic!')
+        print('='*79)
+        print('')
+
+    return cases
+
 def prepare_launch(iter_dict, opt_tags, master, variable_tag_func,
                 write_htc=True, runmethod='none', verbose=False,
                 copyback_turb=True, msg='', silent=False, check_log=True,
@@ -615,9 +765,10 @@ def prepare_launch(iter_dict, opt_tags, master, variable_tag_func,
     verbose : boolean, default=False
 
     runmethod : {'none' (default),'pbs','linux-script','local',
-                 'local-ram', 'windows-script'}
+                 'local-parallel', 'local-ram', 'windows-script'}
         Specify how/what to run where. For local, each case in cases is
-        run locally via python directly. If set to 'linux-script' a shell
+        run locally via python directly. For local-parallel, nr_cpus cases
+        are run locally at the same time. If set to 'linux-script' a shell
         script is written to run all cases locally sequential. If set to
         'pbs', PBS scripts are written for a cluster (e.g. Gorm/jess).
         A Windows batch script is written in case of windows-script, and is
@@ -822,7 +973,8 @@ def launch(cases, runmethod='none', verbose=False, copyback_turb=True,
            maxcpu=1, pyenv='py36-wetb', m=[3,4,6,8,9,10,12], prelude='',
            postpro_node_zipchunks=True, postpro_node=False, exesingle=None,
            exechunks=None, wine_arch='win32', wine_prefix='~/.wine32',
-           pyenv_cmd='source /home/python/miniconda3/bin/activate'):
+           pyenv_cmd='source /home/python/miniconda3/bin/activate',
+           nr_cpus=None):
     """
     The actual launching of all cases in the Cases dictionary. Note that here
     only the PBS files are written and not the actuall htc files.
@@ -838,9 +990,10 @@ def launch(cases, runmethod='none', verbose=False, copyback_turb=True,
     verbose : boolean, default=False
 
     runmethod : {'none' (default),'pbs','linux-script','local',
-                 'local-ram', 'windows-script'}
+                 'local-parallel', 'local-ram', 'windows-script'}
         Specify how/what to run where. For local, each case in cases is
-        run locally via python directly. If set to 'linux-script' a shell
+        run locally via python directly. For local-parallel, nr_cpus cases
+        are run locally at the same time. If set to 'linux-script' a shell
         script is written to run all cases locally sequential. If set to
         'pbs', PBS scripts are written for a cluster (e.g. Gorm/jess).
         A Windows batch script is written in case of windows-script, and is
@@ -849,6 +1002,10 @@ def launch(cases, runmethod='none', verbose=False, copyback_turb=True,
     windows_nr_cpus : int, default=2
         All cases to be run are distributed over 'windows_nr_cpus' number of
         Windows batch files so the user can utilize 'windows_nr_cpus' CPUs.
+
+    nr_cpus : int, default=None
+        Number of concurrent simulations for runmethod='local-parallel'.
+        If None, the number of CPUs of the machine is used.
     """
 
     random_case = list(cases.keys())[0]
@@ -877,15 +1034,18 @@ def launch(cases, runmethod='none', verbose=False, copyback_turb=True,
         cases = run_local(cases, silent=silent, check_log=check_log)
     elif runmethod =='local-ram':
         cases = run_local_ram(cases, check_log=check_log)
+    elif runmethod == 'local-parallel':
+        cases = run_local_parallel(cases, nr_cpus=nr_cpus, silent=silent,
+                                   check_log=check_log)
     elif runmethod == 'none':
         pass
     else:
-        msg = 'unsupported runmethod, valid options: local, linux-script, ' \
-              'windows-script, local-ram, none, pbs'
+        msg = 'unsupported runmethod, valid options: local, local-parallel, ' \
+              'linux-script, windows-script, local-ram, none, pbs'
         raise ValueError(msg)
 
 def post_launch(cases, save_iter=False, silent=False, suffix=None,
-                path_errorlog=None):
+                path_errorlog=None, nr_cpus=1):
     """
     Do some basics checks: do all launched cases have a result and LOG file
     and are there any errors in the LOG files?
@@ -907,6 +1067,10 @@ def post_launch(cases, save_iter=False, silent=False, suffix=None,
     suffix : str, default=None
         If not None, the suffix will be appended to file name of the error
         log analysis file as follows: "ErrorLog_suffix.csv".
+
+    nr_cpus : int, default=1
+        Number of processes used to analyse the log files. If None, the
+        number of CPUs of the machine is used.
     """
 
     # TODO: finish support for default location of the cases and file name
@@ -957,33 +1121,56 @@ def post_launch(cases, save_iter=False, silent=False, suffix=None,
         print('checking logs, path (from a random item in cases):')
         print(os.path.join(run_dir, log_dir))
 
+    f_logs = {}
     for k in sorted(cases.keys()):
         # a case could not have a result, but a log file might still exist
         if k.endswith('.htc'):
             kk = k[:-4] + '.log'
         else:
             kk = k + '.log'
-        # note that if errorlogs.PathToLogs is a file, it will only check that
-        # file. If it is a directory, it will check all that is in the dir
         run_dir = cases[k]['[run_dir]']
         log_dir = cases[k]['[log_dir]']
-        errorlogs.PathToLogs = os.path.join(run_dir, log_dir, kk)
-        try:
-            errorlogs.check(save_iter=save_iter)
-            if not silent:
-                print('checking logfile progress: % 6i/% 6i' % (nr, nr_tot))
-        except IOError:
+        f_logs[k] = os.path.join(run_dir, log_dir, kk)
+
+    if nr_cpus is None or nr_cpus > 1:
+        # analyse all existing log files in parallel
+        for k, f_log in f_logs.items():
+            if not os.path.isfile(f_log) and not silent:
+                print('           no logfile for:  %s' % f_log)
+        ks = [k for k, f_log in f_logs.items() if os.path.isfile(f_log)]
+        failed = errorlogs.readlogs([f_logs[k] for k in ks],
+                                    [cases[k] for k in ks],
+                                    save_iter=save_iter, nr_cpus=nr_cpus,
+                                    ignore_errors=True)
+        # same as the serial analysis: report and skip failing log files
+        for f_log, e in failed:
             if not silent:
-                print('           no logfile for:  %s' % (errorlogs.PathToLogs))
-        except Exception as e:
-            if not silent:
-                print('  log analysis failed for: %s' % kk)
+                print('  log analysis failed for: %s' % os.path.basename(f_log))
                 print(e)
-        nr += 1
+    else:
+        for k, f_log in f_logs.items():
+            # note that if errorlogs.PathToLogs is a file, it will only check
+            # that file. If it is a directory, it will check all that is in
+            # the dir
+            errorlogs.PathToLogs = f_log
+            try:
+                errorlogs.check(save_iter=save_iter)
+                if not silent:
+                    print('checking logfile progress: % 6i/% 6i' % (nr, nr_tot))
+            except IOError:
+                if not silent:
+                    print('           no logfile for:  %s' % (errorlogs.PathToLogs))
+            except Exception as e:
+                if not silent:
+                    print('  log analysis failed for: %s' % os.path.basename(f_log))
+                    print(e)
+            nr += 1
 
+    for k, f_log in f_logs.items():
         # if simulation did not ended correctly, put it on the fail list
+        # MsgListLog2 uses the full path of the log file as key
         try:
-            if not errorlogs.MsgListLog2[kk][1]:
+            if not errorlogs.MsgListLog2[f_log][1]:
                 cases_fail[k] = cases[k]
         except KeyError:
             pass
@@ -1065,6 +1252,8 @@ def logcheck_case(errorlogs, cases, case, silent=False):
     errorlogs.check()
 
     # in case we find an error, abort or not?
+    # MsgListLog2 uses the full path of the log file as key
+    caselog = os.path.join(errorlogs.PathToLogs, caselog)
     errors = errorlogs.MsgListLog2[caselog][0]
     exitcorrect = errorlogs.MsgListLog2[caselog][1]
     if errors:
@@ -2736,14 +2925,18 @@ class ErrorLogs(windIO.LogFile):
 
     # TODO: save this not a csv text string but a df_dict, and save as excel
     # and DataFrame!
-    def check(self, appendlog=False, save_iter=False):
+    def check(self, appendlog=False, save_iter=False, nr_cpus=1):
         """Check all log files that are to be found in the directory
         ErrorLogs.PathToLogs, or check the specific log file if
         ErrorLogs.PathToLogs points to a specific log file.
+
+        The log files in a directory are analysed by nr_cpus processes,
+        see LogFile.readlogs.
         """
 
         # MsgListLog = []
         FileList = []
+        single_file = False
         # if a directory, load all files first
         if os.path.isdir(self.PathToLogs):
 
@@ -2757,24 +2950,20 @@ class ErrorLogs(windIO.LogFile):
             FileList.append([ [],[],[os.path.basename(self.PathToLogs)] ])
             self.PathToLogs = os.path.dirname(self.PathToLogs)
             single_file = True
-        i=1
+
+        if NrFiles > 1 and not self.silent:
+            print('checking %i log files' % NrFiles)
 
         # walk trough the files present in the folder path
+        f_logs, cases = [], []
         for fname in FileList[0][2]:
-            # progress indicator
-            if NrFiles > 1:
-                if not self.silent:
-                    print('progress: ' + str(i) + '/' + str(NrFiles))
-
-            # open the current log file
-            f_log = os.path.join(self.PathToLogs, fname)
-
+            f_logs.append(os.path.join(self.PathToLogs, fname))
             if self.cases is not None:
-                case = self.cases[fname.replace('.log', '.htc')]
+                cases.append(self.cases[fname.replace('.log', '.htc')])
             else:
-                case = None
-            self.readlog(f_log, case=case, save_iter=save_iter)
-            i += 1
+                cases.append(None)
+        self.readlogs(f_logs, cases=cases, save_iter=save_iter,
+                      nr_cpus=nr_cpus)
 
 #            # if no messages are found for the current file, than say so:
 #            if len(MsgList2) == len(self.MsgList):
@@ -3323,6 +3512,16 @@ class Cases(object):
 
         rem_failed : boolean, default=True
 
+        store_format : str, default='h5'
+            Format used to save the statistics, Leq and AEP tables: PyTables
+            HDF5 (h5) or a Parquet dataset (parquet, requires pyarrow).
+            Loading detects the format of the saved files.
+
+        partition_cols : list, default=['[DLC]']
+            Columns used to partition the Parquet statistics dataset. When
+            loading with a filter on these columns, only the matching
+            partitions are read.
+
         """
 
         resdir = kwargs.get('resdir', False)
@@ -3330,6 +3529,8 @@ class Cases(object):
         self.rem_failed = kwargs.get('rem_failed', True)
         self.config = kwargs.get('config', {})
         self.complib = kwargs.get('complib', 'blosc')
+        self.store_format = kwargs.get('store_format', 'h5')
+        self.partition_cols = kwargs.get('partition_cols', ['[DLC]'])
         # determine the input argument scenario
         if len(args) == 1:
             if type(args[0]).__name__ == 'dict':
@@ -3848,6 +4049,15 @@ class Cases(object):
         leq : bool, default=False
 
         columns : list, default=None
+            Only load the given columns of the statistics
+
+        filters : list, default=None
+            Only load the rows of the statistics that match the filters, see
+            misc.filter_df. Example: the max of the tower base moments for
+            DLC13: [('[DLC]', '==', 'dlc13_iec61400-1ed3'),
+            ('channel', 'in', ['tower-tower-node-001-momentvec-x',
+            'tower-tower-node-001-momentvec-y'])]. For Parquet statistics
+            only the matching partitions and row groups are read from disc.
 
         Returns
         -------
@@ -3863,10 +4073,11 @@ class Cases(object):
         fpath = os.path.join(post_dir, sim_id)
         Leq_df = kwargs.get('leq', False)
         columns = kwargs.get('columns', None)
+        filters = kwargs.get('filters', None)
 
         try:
-            stats_df = pd.read_hdf(fpath + '_statistics.h5', 'table',
-                                   columns=columns)
+            stats_df = misc.load_df(fpath + '_statistics', columns=columns,
+                                    filters=filters)
 #            FILE = open(post_dir + sim_id + '_statistics.pkl', 'rb')
 #            stats_dict = pickle.load(FILE)
 #            FILE.close()
@@ -3875,14 +4086,14 @@ class Cases(object):
             print('NO STATS FOUND FOR', sim_id)
 
         try:
-            AEP_df = pd.read_hdf(fpath + '_AEP.h5', 'table')
+            AEP_df = misc.load_df(fpath + '_AEP')
         except IOError:
             AEP_df = None
             print('NO AEP FOUND FOR', sim_id)
 
         if Leq_df:
             try:
-                Leq_df = pd.read_hdf(fpath + '_Leq.h5', 'table')
+                Leq_df = misc.load_df(fpath + '_Leq')
             except IOError:
                 Leq_df = None
                 print('NO Leq FOUND FOR', sim_id)
@@ -3896,7 +4107,7 @@ class Cases(object):
                    chs_resultant=[], i0=0, i1=None, saveinterval=1000,
                    csv=True, suffix=None, A=None, add_sigs={},
                    ch_wind=None, save_new_sigs=False, xlsx=False,
-                   bearing_damage_lst=()):
+                   bearing_damage_lst=(), nr_cpus=1, resume=False):
         """
         Calculate statistics and save them in a pandas dataframe. Save also
         every 500 cases the statistics file.
@@ -3955,6 +4166,17 @@ class Cases(object):
             In addition to a h5 file, save the statistics also in MS Excel xlsx
             format.
 
+        nr_cpus : int, default=1
+            Number of worker processes that load the result files and
+            calculate the statistics in parallel. The results are collected
+            in the order of the cases and saved by the calling process.
+
+        resume : boolean, default=False
+            Skip the cases of which the [case_id] is already present in the
+            statistics file(s) and append the statistics of the remaining
+            cases (implies update=True). Use this to continue after a crash
+            or an interrupted run.
+
         Returns
         -------
 
@@ -3966,16 +4188,6 @@ class Cases(object):
 
         """
 
-        def add_df_row(df_dict, **kwargs):
-            """
-            add a new channel to the df_dict format of ch_df
-            """
-            for col, value in kwargs.items():
-                df_dict[col].append(value)
-            for col in (self.res.cols - set(kwargs.keys())):
-                df_dict[col].append('')
-            return df_dict
-
         # in case the output changes, remember the original ch_sel
         if ch_sel is not None:
             ch_sel_init = ch_sel.copy()
@@ -4019,390 +4231,478 @@ class Cases(object):
             print('='*79)
             print('statistics for %s, nr cases: %i' % (sim_id, nrcases))
 
+        if resume:
+            done = self._statistics_done_cases(post_dir, sim_id, suffix)
+            cases = [(cname, case) for cname, case in self.cases.items()
+                     if case['[case_id]'] not in done]
+            # append to the existing statistics instead of overwriting them
+            update = True
+            if not silent:
+                rpl = (len(self.cases) - len(cases), len(cases))
+                print('resume: skipping %i cases, %i remaining' % rpl)
+        else:
+            cases = list(self.cases.items())
+            done = set()
+        nrcases = len(cases)
+
+        kwargs = dict(tags=tags, tag_chan=tag_chan, ch_sel=ch_sel_init,
+                      ch_fatigue=ch_fatigue_init, calc_mech_power=calc_mech_power,
+                      m=m, neq=neq, no_bins=no_bins, add_sensor=add_sensor,
+                      chs_resultant=chs_resultant, i0=i0, i1=i1, A=A,
+                      add_sigs=add_sigs, ch_wind=ch_wind,
+                      save_new_sigs=save_new_sigs,
+                      bearing_damage_lst=bearing_damage_lst)
+        if nr_cpus > 1:
+            # the workers load the result files and calculate the statistics,
+            # the rows are collected (in the order of the cases) and saved here
+            pool = multiprocessing.Pool(nr_cpus)
+            # the constructor options used by the serial path
+            options = dict(config=self.config, rem_failed=self.rem_failed,
+                           complib=self.complib, store_format=self.store_format,
+                           partition_cols=self.partition_cols)
+            tasks = ((cname, case, options, kwargs) for cname, case in cases)
+            results = pool.imap(_statistics_case_worker, tasks)
+        else:
+            pool = None
+            results = (self._statistics_case(cname, case, **kwargs)
+                       for cname, case in cases)
+
+        dfs = None
         df_dict = None
-        add_stats = True
-        # for finding [] tags
-        regex = re.compile('(\\[.*?\\])')
+        try:
+            for ii, ((cname, case), rows) in enumerate(zip(cases, results)):
 
-        for ii, (cname, case) in enumerate(self.cases.items()):
+                if not silent:
+                    pc = '%6.2f' % (float(ii)*100.0/float(nrcases))
+                    pc += ' %'
+                    print('stats progress: %4i/%i %s | %s' % (ii, nrcases, pc, cname))
 
-            # build the basic df_dict if not defined
-            if df_dict is None:
                 # the dictionary that will be used to create a pandas dataframe
-                df_dict = { tag:[] for tag in tags }
-                df_dict[tag_chan] = []
-                # add more columns that will help with IDing the channel
-                df_dict['channel_name'] = []
-                df_dict['channel_units'] = []
-                df_dict['channel_nr'] = []
-                df_dict['channel_desc'] = []
-                add_stats = True
+                if df_dict is None:
+                    df_dict = {}
+                for col, values in rows.items():
+                    df_dict.setdefault(col, []).extend(values)
+
+                # when dealing with a lot of cases, save the stats data at
+                # intermediate points to avoid memory issues
+                if math.fmod(ii+1, saveinterval) == 0.0:
+                    df_dict2 = self._df_dict_check_datatypes(df_dict)
+                    # convert, save/update
+                    if isinstance(suffix, str):
+                        ext = suffix
+                    elif suffix is True:
+                        ext = '_%06i' % (ii+1+len(done))
+                    else:
+                        ext = ''
+    #                dfs = self._df_dict_save(df_dict2, post_dir, sim_id, save=save,
+    #                                         update=update, csv=csv, suffix=ext)
+                    # TODO: test this first
+                    fname = os.path.join(post_dir, sim_id + '_statistics' + ext)
+                    dfs = misc.dict2df(df_dict2, fname, save=save, update=update,
+                                       csv=csv, xlsx=xlsx, check_datatypes=False,
+                                       complib=self.complib,
+                                       store_format=self.store_format,
+                                       partition_cols=self.partition_cols)
+
+                    df_dict2 = None
+                    df_dict = None
+        finally:
+            if pool is not None:
+                # also stop the workers when a case or saving the statistics
+                # failed
+                pool.terminate()
+                pool.join()
 
-            if not silent:
-                pc = '%6.2f' % (float(ii)*100.0/float(nrcases))
-                pc += ' %'
-                print('stats progress: %4i/%i %s | %s' % (ii, nrcases, pc, cname))
+        # only save again when there is actual data in df_dict
+        if df_dict is not None:
+            # make consistent data types
+            df_dict2 = self._df_dict_check_datatypes(df_dict)
+            # convert, save/update
+            if isinstance(suffix, str):
+                ext = suffix
+            elif suffix is True:
+                ext = '_%06i' % (ii+len(done))
+            else:
+                ext = ''
+#            dfs = self._df_dict_save(df_dict2, post_dir, sim_id, save=save,
+#                                     update=update, csv=csv, suffix=ext)
+            # TODO: test this first
+            fname = os.path.join(post_dir, sim_id + '_statistics' + ext)
+            dfs = misc.dict2df(df_dict2, fname, save=save, update=update,
+                               csv=csv, xlsx=xlsx, check_datatypes=False,
+                               complib=self.complib,
+                               store_format=self.store_format,
+                               partition_cols=self.partition_cols)
 
-            # make sure the selected tags exist
-            if len(tags) != len(set(case) and tags):
-                raise KeyError('    not all selected tags exist in cases')
+        return dfs
 
-            self.load_result_file(case)
-            ch_dict_new = {}
-            # this is really messy, now we are also in parallal using the
-            # channel DataFrame structure
-            ch_df_new = {col:[] for col in self.res.cols}
-            ch_df_new['ch_name'] = []
-            # calculate the statistics values
-#            stats = self.res.calc_stats(self.sig, i0=i0, i1=i1)
-            i_new_chans = self.sig.shape[1] # self.Nch
-            sig_size = self.res.N  # len(self.sig[i0:i1,0])
-            new_sigs = np.ndarray((sig_size, 0))
-
-            for name, expr in add_sigs.items():
-                channel_tags = regex.findall(expr)
-                # replace all sensor names with expressions
-                template = "self.sig[:,self.res.ch_dict['{}']['chi']]"
-                for chan in channel_tags:
-                    # first remove the [] from the tag
-                    # FIXME: fails when the same channel occurs more than once
-                    expr = expr.replace(chan, chan[1:-1])
-                    expr = expr.replace(chan[1:-1], template.format(chan[1:-1]))
-
-                sig_add = np.ndarray((len(self.sig[:,0]), 1))
-                sig_add[:,0] = eval(expr)
+    def _statistics_case(self, cname, case, tags, tag_chan, ch_sel=None,
+                         ch_fatigue=None, calc_mech_power=False,
+                         m=[3, 4, 6, 8, 10, 12], neq=None, no_bins=46,
+                         add_sensor=None, chs_resultant=[], i0=0, i1=None,
+                         A=None, add_sigs={}, ch_wind=None,
+                         save_new_sigs=False, bearing_damage_lst=()):
+        """
+        Load the result file of one case and calculate the statistics and
+        fatigue loads of the selected channels. See statistics for a
+        description of the parameters.
 
-                ch_dict_new[name] = {}
-                ch_dict_new[name]['chi'] = i_new_chans
-                ch_df_new = add_df_row(ch_df_new, **{'chi':i_new_chans,
-                                                   'ch_name':name})
-                i_new_chans += 1
-                new_sigs = np.append(new_sigs, sig_add, axis=1)
-
-            if add_sensor is not None:
-                chi1 = self.res.ch_dict[add_sensor['ch1_name']]['chi']
-                chi2 = self.res.ch_dict[add_sensor['ch2_name']]['chi']
-                name = add_sensor['ch_name_add']
-                factor = add_sensor['factor']
-                operator = add_sensor['operator']
-
-                p1 = self.sig[:,chi1]
-                p2 = self.sig[:,chi2]
-                sig_add = np.ndarray((len(p1), 1))
-                if operator == '*':
-                    sig_add[:,0] = p1*p2*factor
-                elif operator == '/':
-                    sig_add[:,0] = factor*p1/p2
+        Returns
+        -------
+
+        rows : dict
+            Column name and list of values key/value pairs, one item per
+            selected channel, in the same format as the df_dict used in
+            statistics.
+        """
+
+        def add_df_row(df_dict, **kwargs):
+            """
+            add a new channel to the df_dict format of ch_df
+            """
+            for col, value in kwargs.items():
+                df_dict[col].append(value)
+            for col in (self.res.cols - set(kwargs.keys())):
+                df_dict[col].append('')
+            return df_dict
+
+        # in case the output changes, remember the original ch_sel
+        ch_sel_init = ch_sel
+        ch_fatigue_init = ch_fatigue
+        # for finding [] tags
+        regex = re.compile('(\\[.*?\\])')
+
+        # make sure the selected tags exist
+        if len(tags) != len(set(case) and tags):
+            raise KeyError('    not all selected tags exist in cases')
+
+
+        self.load_result_file(case)
+        ch_dict_new = {}
+        # this is really messy, now we are also in parallal using the
+        # channel DataFrame structure
+        ch_df_new = {col:[] for col in self.res.cols}
+        ch_df_new['ch_name'] = []
+        # calculate the statistics values
+#        stats = self.res.calc_stats(self.sig, i0=i0, i1=i1)
+        i_new_chans = self.sig.shape[1] # self.Nch
+        sig_size = self.res.N  # len(self.sig[i0:i1,0])
+        new_sigs = np.ndarray((sig_size, 0))
+
+        for name, expr in add_sigs.items():
+            channel_tags = regex.findall(expr)
+            # replace all sensor names with expressions
+            template = "self.sig[:,self.res.ch_dict['{}']['chi']]"
+            for chan in channel_tags:
+                # first remove the [] from the tag
+                # FIXME: fails when the same channel occurs more than once
+                expr = expr.replace(chan, chan[1:-1])
+                expr = expr.replace(chan[1:-1], template.format(chan[1:-1]))
+
+            sig_add = np.ndarray((len(self.sig[:,0]), 1))
+            sig_add[:,0] = eval(expr)
+
+            ch_dict_new[name] = {}
+            ch_dict_new[name]['chi'] = i_new_chans
+            ch_df_new = add_df_row(ch_df_new, **{'chi':i_new_chans,
+                                               'ch_name':name})
+            i_new_chans += 1
+            new_sigs = np.append(new_sigs, sig_add, axis=1)
+
+        if add_sensor is not None:
+            chi1 = self.res.ch_dict[add_sensor['ch1_name']]['chi']
+            chi2 = self.res.ch_dict[add_sensor['ch2_name']]['chi']
+            name = add_sensor['ch_name_add']
+            factor = add_sensor['factor']
+            operator = add_sensor['operator']
+
+            p1 = self.sig[:,chi1]
+            p2 = self.sig[:,chi2]
+            sig_add = np.ndarray((len(p1), 1))
+            if operator == '*':
+                sig_add[:,0] = p1*p2*factor
+            elif operator == '/':
+                sig_add[:,0] = factor*p1/p2
+            else:
+                raise ValueError('Operator needs to be either * or /')
+#            add_stats = self.res.calc_stats(sig_add)
+#            add_stats_i = stats['max'].shape[0]
+            # add a new channel description for the mechanical power
+            ch_dict_new[name] = {}
+            ch_dict_new[name]['chi'] = i_new_chans
+            ch_df_new = add_df_row(ch_df_new, **{'chi':i_new_chans,
+                                               'ch_name':name})
+            i_new_chans += 1
+            new_sigs = np.append(new_sigs, sig_add, axis=1)
+#            # and append to all the statistics types
+#            for key, stats_arr in stats.iteritems():
+#                stats[key] = np.append(stats_arr, add_stats[key])
+
+        # calculate the resultants
+        sig_resultants = np.ndarray((sig_size, len(chs_resultant)))
+        inc = []
+        for j, chs in enumerate(chs_resultant):
+            sig_res = np.ndarray((sig_size, len(chs)))
+            lab = ''
+            no_channel = False
+            for i, ch in enumerate(chs):
+                # if the channel does not exist, zet to zero
+                try:
+                    chi = self.res.ch_dict[ch]['chi']
+                    sig_res[:,i] = self.sig[:,chi]
+                    no_channel = False
+                except KeyError:
+                    no_channel = True
+                lab += ch.split('-')[-1]
+            name = '-'.join(ch.split('-')[:-1] + [lab])
+            # when on of the components do no exist, we can not calculate
+            # the resultant!
+            if no_channel:
+                rpl = (name, cname)
+                print('    missing channel, no resultant for: %s, %s' % rpl)
+                continue
+            inc.append(j)
+            sig_resultants[:,j] = np.sqrt(sig_res*sig_res).sum(axis=1)
+#            resultant = np.sqrt(sig_resultants[:,j].reshape(self.res.N, 1))
+#            add_stats = self.res.calc_stats(resultant)
+#            add_stats_i = stats['max'].shape[0]
+            # add a new channel description for this resultant
+            ch_dict_new[name] = {}
+            ch_dict_new[name]['chi'] = i_new_chans
+            ch_df_new = add_df_row(ch_df_new, **{'chi':i_new_chans,
+                                               'ch_name':name})
+            i_new_chans += 1
+            # and append to all the statistics types
+#            for key, stats_arr in stats.iteritems():
+#                stats[key] = np.append(stats_arr, add_stats[key])
+        if len(chs_resultant) > 0:
+            # but only take the channels that where not missing
+            new_sigs = np.append(new_sigs, sig_resultants[:,inc], axis=1)
+
+        # calculate mechanical power first before deriving statistics
+        # from it
+        if calc_mech_power:
+            name = 'stats-shaft-power'
+            sig_pmech = np.ndarray((sig_size, 1))
+            sig_pmech[:,0] = self.shaft_power()
+#            P_mech_stats = self.res.calc_stats(sig_pmech)
+#            mech_stats_i = stats['max'].shape[0]
+            # add a new channel description for the mechanical power
+            ch_dict_new[name] = {}
+            ch_dict_new[name]['chi'] = i_new_chans
+            ch_df_new = add_df_row(ch_df_new, **{'chi':i_new_chans,
+                                               'ch_name':name})
+            i_new_chans += 1
+            new_sigs = np.append(new_sigs, sig_pmech, axis=1)
+
+            # and C_p_mech
+            if A is not None:
+                name = 'stats-cp-mech'
+                if ch_wind is None:
+                    chiwind = self.res.ch_dict[self.find_windchan_hub()]['chi']
                 else:
-                    raise ValueError('Operator needs to be either * or /')
-#                add_stats = self.res.calc_stats(sig_add)
-#                add_stats_i = stats['max'].shape[0]
+                    chiwind = self.res.ch_dict[ch_wind]['chi']
+                wind = self.res.sig[:,chiwind]
+                cp = np.ndarray((sig_size, 1))
+                cp[:,0] = self.cp(-sig_pmech[:,0], wind, A)
                 # add a new channel description for the mechanical power
                 ch_dict_new[name] = {}
                 ch_dict_new[name]['chi'] = i_new_chans
                 ch_df_new = add_df_row(ch_df_new, **{'chi':i_new_chans,
                                                    'ch_name':name})
                 i_new_chans += 1
-                new_sigs = np.append(new_sigs, sig_add, axis=1)
-#                # and append to all the statistics types
-#                for key, stats_arr in stats.iteritems():
-#                    stats[key] = np.append(stats_arr, add_stats[key])
-
-            # calculate the resultants
-            sig_resultants = np.ndarray((sig_size, len(chs_resultant)))
-            inc = []
-            for j, chs in enumerate(chs_resultant):
-                sig_res = np.ndarray((sig_size, len(chs)))
-                lab = ''
-                no_channel = False
-                for i, ch in enumerate(chs):
-                    # if the channel does not exist, zet to zero
-                    try:
-                        chi = self.res.ch_dict[ch]['chi']
-                        sig_res[:,i] = self.sig[:,chi]
-                        no_channel = False
-                    except KeyError:
-                        no_channel = True
-                    lab += ch.split('-')[-1]
-                name = '-'.join(ch.split('-')[:-1] + [lab])
-                # when on of the components do no exist, we can not calculate
-                # the resultant!
-                if no_channel:
-                    rpl = (name, cname)
-                    print('    missing channel, no resultant for: %s, %s' % rpl)
-                    continue
-                inc.append(j)
-                sig_resultants[:,j] = np.sqrt(sig_res*sig_res).sum(axis=1)
-#                resultant = np.sqrt(sig_resultants[:,j].reshape(self.res.N, 1))
-#                add_stats = self.res.calc_stats(resultant)
-#                add_stats_i = stats['max'].shape[0]
-                # add a new channel description for this resultant
-                ch_dict_new[name] = {}
-                ch_dict_new[name]['chi'] = i_new_chans
-                ch_df_new = add_df_row(ch_df_new, **{'chi':i_new_chans,
-                                                   'ch_name':name})
-                i_new_chans += 1
-                # and append to all the statistics types
-#                for key, stats_arr in stats.iteritems():
-#                    stats[key] = np.append(stats_arr, add_stats[key])
-            if len(chs_resultant) > 0:
-                # but only take the channels that where not missing
-                new_sigs = np.append(new_sigs, sig_resultants[:,inc], axis=1)
-
-            # calculate mechanical power first before deriving statistics
-            # from it
-            if calc_mech_power:
-                name = 'stats-shaft-power'
-                sig_pmech = np.ndarray((sig_size, 1))
-                sig_pmech[:,0] = self.shaft_power()
-#                P_mech_stats = self.res.calc_stats(sig_pmech)
-#                mech_stats_i = stats['max'].shape[0]
-                # add a new channel description for the mechanical power
-                ch_dict_new[name] = {}
-                ch_dict_new[name]['chi'] = i_new_chans
-                ch_df_new = add_df_row(ch_df_new, **{'chi':i_new_chans,
-                                                   'ch_name':name})
-                i_new_chans += 1
-                new_sigs = np.append(new_sigs, sig_pmech, axis=1)
+                new_sigs = np.append(new_sigs, cp, axis=1)
 
-                # and C_p_mech
-                if A is not None:
-                    name = 'stats-cp-mech'
-                    if ch_wind is None:
-                        chiwind = self.res.ch_dict[self.find_windchan_hub()]['chi']
-                    else:
-                        chiwind = self.res.ch_dict[ch_wind]['chi']
-                    wind = self.res.sig[:,chiwind]
-                    cp = np.ndarray((sig_size, 1))
-                    cp[:,0] = self.cp(-sig_pmech[:,0], wind, A)
-                    # add a new channel description for the mechanical power
+                try:
+                    try:
+                        nn_shaft = self.config['nn_shaft']
+                    except:
+                        nn_shaft = 4
+
+                    chan_t = 'shaft_nonrotate-shaft-node-%3.3i-forcevec-z'%nn_shaft
+                    i = self.res.ch_dict[chan_t]['chi']
+                    thrust = self.res.sig[:,i]
+                    name = 'stats-ct'
+                    ct = np.ndarray((sig_size, 1))
+                    ct[:,0] = self.ct(thrust, wind, A)
                     ch_dict_new[name] = {}
                     ch_dict_new[name]['chi'] = i_new_chans
                     ch_df_new = add_df_row(ch_df_new, **{'chi':i_new_chans,
                                                        'ch_name':name})
                     i_new_chans += 1
-                    new_sigs = np.append(new_sigs, cp, axis=1)
+                    new_sigs = np.append(new_sigs, ct, axis=1)
+                except KeyError:
+                    print('    can not calculate CT')
+
+            # and append to all the statistics types
+#            for key, stats_arr in stats.iteritems():
+#                stats[key] = np.append(stats_arr, P_mech_stats[key])
+
+        if save_new_sigs and new_sigs.shape[1] > 0:
+            chis, keys = [], []
+            for key, value in ch_dict_new.items():
+                chis.append(value['chi'])
+                keys.append(key)
+            # sort on channel number, so it agrees with the new_sigs array
+            isort = np.array(chis).argsort()
+            keys = np.array(keys)[isort].tolist()
+            df_new_sigs = pd.DataFrame(new_sigs, columns=keys)
+            respath = os.path.join(case['[run_dir]'], case['[res_dir]'])
+            resfile = case['[case_id]']
+            fname = os.path.join(respath, resfile + '_postres.csv')
+            print('    saving post-processed res: %s...' % fname, end='')
+            df_new_sigs.to_csv(fname, sep='\t')
+            print('done!')
+            del df_new_sigs
+
+        ch_dict = self.res.ch_dict.copy()
+        ch_dict.update(ch_dict_new)
+
+#        ch_df = pd.concat([self.res.ch_df, pd.DataFrame(ch_df_new)])
+
+        # put all the extra channels into the results if we want to also
+        # be able to calculate the fatigue loads on them.
+        self.sig = np.append(self.sig, new_sigs, axis=1)
+
+        # calculate the statistics values
+        stats = self.res.calc_stats(self.sig, i0=i0, i1=i1)
+
+        # calculate any bearing damage
+        for name, angle_moment_lst in bearing_damage_lst:
+            angle_moment_timeseries_lst = []
+            for aa, mm in angle_moment_lst:
+                angle = self.sig[:,self.res.ch_dict[aa]['chi']]
+                moment = self.sig[:,self.res.ch_dict[mm]['chi']]
+                angle_moment_timeseries_lst.append((angle, moment))
+            stats[name] = bearing_damage(angle_moment_timeseries_lst)
+
+        # Because each channel is a new row, it doesn't matter how many
+        # data channels each case has, and this approach does not brake
+        # when different cases have a different number of output channels
+        # By default, just take all channels in the result file.
+        if ch_sel_init is None:
+            ch_sel = list(ch_dict.keys())
+#            ch_sel = ch_df.unique_ch_name.tolist()
+#            ch_sel = [str(k) for k in ch_sel]
+            print('    selecting all channels for statistics')
+
+        # calculate the fatigue properties from selected channels
+        fatigue, tags_fatigue = {}, []
+        if ch_fatigue_init is None:
+            ch_fatigue = ch_sel
+            print('    selecting all channels for fatigue')
+        else:
+            ch_fatigue = ch_fatigue_init
 
-                    try:
-                        try:
-                            nn_shaft = self.config['nn_shaft']
-                        except:
-                            nn_shaft = 4
-
-                        chan_t = 'shaft_nonrotate-shaft-node-%3.3i-forcevec-z'%nn_shaft
-                        i = self.res.ch_dict[chan_t]['chi']
-                        thrust = self.res.sig[:,i]
-                        name = 'stats-ct'
-                        ct = np.ndarray((sig_size, 1))
-                        ct[:,0] = self.ct(thrust, wind, A)
-                        ch_dict_new[name] = {}
-                        ch_dict_new[name]['chi'] = i_new_chans
-                        ch_df_new = add_df_row(ch_df_new, **{'chi':i_new_chans,
-                                                           'ch_name':name})
-                        i_new_chans += 1
-                        new_sigs = np.append(new_sigs, ct, axis=1)
-                    except KeyError:
-                        print('    can not calculate CT')
-
-                # and append to all the statistics types
-#                for key, stats_arr in stats.iteritems():
-#                    stats[key] = np.append(stats_arr, P_mech_stats[key])
-
-            if save_new_sigs and new_sigs.shape[1] > 0:
-                chis, keys = [], []
-                for key, value in ch_dict_new.items():
-                    chis.append(value['chi'])
-                    keys.append(key)
-                # sort on channel number, so it agrees with the new_sigs array
-                isort = np.array(chis).argsort()
-                keys = np.array(keys)[isort].tolist()
-                df_new_sigs = pd.DataFrame(new_sigs, columns=keys)
-                respath = os.path.join(case['[run_dir]'], case['[res_dir]'])
-                resfile = case['[case_id]']
-                fname = os.path.join(respath, resfile + '_postres.csv')
-                print('    saving post-processed res: %s...' % fname, end='')
-                df_new_sigs.to_csv(fname, sep='\t')
-                print('done!')
-                del df_new_sigs
-
-            ch_dict = self.res.ch_dict.copy()
-            ch_dict.update(ch_dict_new)
-
-#            ch_df = pd.concat([self.res.ch_df, pd.DataFrame(ch_df_new)])
-
-            # put all the extra channels into the results if we want to also
-            # be able to calculate the fatigue loads on them.
-            self.sig = np.append(self.sig, new_sigs, axis=1)
-
-            # calculate the statistics values
-            stats = self.res.calc_stats(self.sig, i0=i0, i1=i1)
-
-            # calculate any bearing damage
-            for name, angle_moment_lst in bearing_damage_lst:
-                angle_moment_timeseries_lst = []
-                for aa, mm in angle_moment_lst:
-                    angle = self.sig[:,self.res.ch_dict[aa]['chi']]
-                    moment = self.sig[:,self.res.ch_dict[mm]['chi']]
-                    angle_moment_timeseries_lst.append((angle, moment))
-                stats[name] = bearing_damage(angle_moment_timeseries_lst)
-
-            # Because each channel is a new row, it doesn't matter how many
-            # data channels each case has, and this approach does not brake
-            # when different cases have a different number of output channels
-            # By default, just take all channels in the result file.
-            if ch_sel_init is None:
-                ch_sel = list(ch_dict.keys())
-#                ch_sel = ch_df.unique_ch_name.tolist()
-#                ch_sel = [str(k) for k in ch_sel]
-                print('    selecting all channels for statistics')
-
-            # calculate the fatigue properties from selected channels
-            fatigue, tags_fatigue = {}, []
-            if ch_fatigue_init is None:
-                ch_fatigue = ch_sel
-                print('    selecting all channels for fatigue')
+        for ch_id in ch_fatigue:
+            chi = ch_dict[ch_id]['chi']
+            signal = self.sig[:,chi]
+            if neq is None:
+                neq_ = float(case['[duration]'])
+            else:
+                neq_ = neq
+            eq = self.res.calc_fatigue(signal, no_bins=no_bins, neq=neq_,
+                                       m=m)
+
+            # save in the fatigue results
+            fatigue[ch_id] = {}
+            fatigue[ch_id]['neq'] = neq_
+            # when calc_fatigue succeeds, we should have as many items
+            # as in m
+            if len(eq) == len(m):
+                for eq_, m_ in zip(eq, m):
+                    fatigue[ch_id]['m=%2.01f' % m_] = eq_
+            # when it fails, we get an empty list back
             else:
-                ch_fatigue = ch_fatigue_init
+                for m_ in m:
+                    fatigue[ch_id]['m=%2.01f' % m_] = np.nan
 
-            for ch_id in ch_fatigue:
-                chi = ch_dict[ch_id]['chi']
-                signal = self.sig[:,chi]
-                if neq is None:
-                    neq_ = float(case['[duration]'])
-                else:
-                    neq_ = neq
-                eq = self.res.calc_fatigue(signal, no_bins=no_bins, neq=neq_,
-                                           m=m)
-
-                # save in the fatigue results
-                fatigue[ch_id] = {}
-                fatigue[ch_id]['neq'] = neq_
-                # when calc_fatigue succeeds, we should have as many items
-                # as in m
-                if len(eq) == len(m):
-                    for eq_, m_ in zip(eq, m):
-                        fatigue[ch_id]['m=%2.01f' % m_] = eq_
-                # when it fails, we get an empty list back
-                else:
-                    for m_ in m:
-                        fatigue[ch_id]['m=%2.01f' % m_] = np.nan
+        # build the fatigue tags
+        for m_ in m:
+            tag = 'm=%2.01f' % m_
+            tags_fatigue.append(tag)
+        tags_fatigue.append('neq')
 
-            # build the fatigue tags
-            for m_ in m:
-                tag = 'm=%2.01f' % m_
-                tags_fatigue.append(tag)
-            tags_fatigue.append('neq')
 
-            # -----------------------------------------------------------------
-            # define the pandas data frame dict on first run
-            # -----------------------------------------------------------------
-            # Only build the ch_sel collection once. By definition, the
-            # statistics, fatigue and htc tags will not change
-            if add_stats:
-                # statistical parameters
-                for statparam in list(stats.keys()):
-                    df_dict[statparam] = []
-#                # additional tags
-#                for tag in tags:
-#                    df_dict[tag] = []
-                # fatigue data
+        # ---------------------------------------------------------------------
+        # the rows for this case, same column order as the df_dict
+        # ---------------------------------------------------------------------
+        rows = {tag:[] for tag in tags}
+        rows[tag_chan] = []
+        # add more columns that will help with IDing the channel
+        rows['channel_name'] = []
+        rows['channel_units'] = []
+        rows['channel_nr'] = []
+        rows['channel_desc'] = []
+        # statistical parameters
+        for statparam in list(stats.keys()):
+            rows[statparam] = []
+        # fatigue data
+        for tag in tags_fatigue:
+            rows[tag] = []
+
+        for ch_id in ch_sel:
+
+            chi = ch_dict[ch_id]['chi']
+
+            # the auxiliry columns
+            try:
+                name = self.res.ch_details[chi,0]
+                unit = self.res.ch_details[chi,1]
+                desc = self.res.ch_details[chi,2]
+            # the new channels from new_sigs are not in here
+            except (IndexError, AttributeError) as e:
+                name = ch_id
+                desc = ''
+                unit = ''
+            rows['channel_name'].append(name)
+            rows['channel_units'].append(unit)
+            rows['channel_desc'].append(desc)
+            rows['channel_nr'].append(chi)
+
+            # each df line is a channel of case that needs to be id-eed
+            rows[tag_chan].append(ch_id)
+
+            # for all the statistics keys, save the values for the
+            # current channel
+            for statparam in list(stats.keys()):
+                rows[statparam].append(stats[statparam][chi])
+            # and save the tags from the input htc file in order to
+            # label each different case properly
+            for tag in tags:
+                rows[tag].append(case[tag])
+            # append any fatigue channels if applicable, otherwise nan
+            if ch_id in fatigue:
+                for m_fatigue, eq_ in fatigue[ch_id].items():
+                    rows[m_fatigue].append(eq_)
+            else:
                 for tag in tags_fatigue:
-                    df_dict[tag] = []
-                add_stats = False
-
-            for ch_id in ch_sel:
-
-                chi = ch_dict[ch_id]['chi']
-                # ch_name is not unique anymore, this doesn't work obviously!
-                # use the channel index instead, that is unique
-#                chi = ch_df[ch_df.unique_ch_name==ch_id].chi.values[0]
-
-                # sig_stat = [(0=value,1=index),statistic parameter, channel]
-                # stat params = 0 max, 1 min, 2 mean, 3 std, 4 range, 5 abs max
-                # note that min, mean, std, and range are not relevant for index
-                # values. Set to zero there.
-
-                # -------------------------------------------------------------
-                # Fill in all the values for the current data entry
-                # -------------------------------------------------------------
-
-                # the auxiliry columns
-                try:
-                    name = self.res.ch_details[chi,0]
-                    unit = self.res.ch_details[chi,1]
-                    desc = self.res.ch_details[chi,2]
-                # the new channels from new_sigs are not in here
-                except (IndexError, AttributeError) as e:
-                    name = ch_id
-                    desc = ''
-                    unit = ''
-                df_dict['channel_name'].append(name)
-                df_dict['channel_units'].append(unit)
-                df_dict['channel_desc'].append(desc)
-                df_dict['channel_nr'].append(chi)
-
-                # each df line is a channel of case that needs to be id-eed
-                df_dict[tag_chan].append(ch_id)
-
-                # for all the statistics keys, save the values for the
-                # current channel
-                for statparam in list(stats.keys()):
-                    df_dict[statparam].append(stats[statparam][chi])
-                # and save the tags from the input htc file in order to
-                # label each different case properly
-                for tag in tags:
-                    df_dict[tag].append(case[tag])
-                # append any fatigue channels if applicable, otherwise nan
-                if ch_id in fatigue:
-                    for m_fatigue, eq_ in fatigue[ch_id].items():
-                        df_dict[m_fatigue].append(eq_)
-                else:
-                    for tag in tags_fatigue:
-                        # TODO: or should this be NaN?
-                        df_dict[tag].append(np.nan)
-            # when dealing with a lot of cases, save the stats data at
-            # intermediate points to avoid memory issues
-            if math.fmod(ii+1, saveinterval) == 0.0:
-                df_dict2 = self._df_dict_check_datatypes(df_dict)
-                # convert, save/update
-                if isinstance(suffix, str):
-                    ext = suffix
-                elif suffix is True:
-                    ext = '_%06i' % (ii+1)
-                else:
-                    ext = ''
-#                dfs = self._df_dict_save(df_dict2, post_dir, sim_id, save=save,
-#                                         update=update, csv=csv, suffix=ext)
-                # TODO: test this first
-                fname = os.path.join(post_dir, sim_id + '_statistics' + ext)
-                dfs = misc.dict2df(df_dict2, fname, save=save, update=update,
-                                   csv=csv, xlsx=xlsx, check_datatypes=False,
-                                   complib=self.complib)
-
-                df_dict2 = None
-                df_dict = None
-                add_stats = True
+                    rows[tag].append(np.nan)
 
-        # only save again when there is actual data in df_dict
-        if df_dict is not None:
-            # make consistent data types
-            df_dict2 = self._df_dict_check_datatypes(df_dict)
-            # convert, save/update
-            if isinstance(suffix, str):
-                ext = suffix
-            elif suffix is True:
-                ext = '_%06i' % ii
-            else:
-                ext = ''
-#            dfs = self._df_dict_save(df_dict2, post_dir, sim_id, save=save,
-#                                     update=update, csv=csv, suffix=ext)
-            # TODO: test this first
-            fname = os.path.join(post_dir, sim_id + '_statistics' + ext)
-            dfs = misc.dict2df(df_dict2, fname, save=save, update=update,
-                               csv=csv, xlsx=xlsx, check_datatypes=False,
-                               complib=self.complib)
+        return rows
 
-        return dfs
+    def _statistics_done_cases(self, post_dir, sim_id, suffix=None):
+        """
+        Return the set of [case_id]'s that are already present in the
+        statistics file(s) of sim_id.
+        """
+        fname = os.path.join(post_dir, sim_id + '_statistics')
+        if suffix is True:
+            fnames = glob.glob(fname + '_[0-9]*.h5')
+            fnames += glob.glob(fname + '_[0-9]*.parquet')
+            fnames = sorted(set([os.path.splitext(f)[0] for f in fnames]))
+        elif isinstance(suffix, str):
+            fnames = [fname + suffix]
+        else:
+            fnames = [fname]
+        done = set()
+        for fname in fnames:
+            try:
+                df = misc.load_df(fname, columns=['[case_id]'])
+            except (IOError, KeyError):
+                continue
+            done.update(df['[case_id]'].unique().tolist())
+        return done
 
     def _add2newsigs(self, ch_dict, name, i_new_chans, new_sigs, addendum):
 
@@ -4504,11 +4804,11 @@ class Cases(object):
                 try:
                     df_dict2[str(colkey)] = np.array(col, dtype=np.float64)
                 except ValueError:
-                    df_dict2[str(colkey)] = np.array(col, dtype=np.str)
+                    df_dict2[str(colkey)] = np.array(col, dtype=str)
             except TypeError:
                 # in all other cases, make sure we have converted them to
                 # strings and NOT unicode
-                df_dict2[str(colkey)] = np.array(col, dtype=np.str)
+                df_dict2[str(colkey)] = np.array(col, dtype=str)
             except Exception as e:
                 print('failed to convert column %s to single data type' % colkey)
                 raise(e)
@@ -4644,7 +4944,8 @@ class Cases(object):
         dict_Leq_h = {'case_id':case_ids, 'hours':hours}
         df_Leq_h = misc.dict2df(dict_Leq_h, fname, update=update, csv=csv,
                                 save=save, check_datatypes=True, xlsx=xlsx,
-                                complib=self.complib)
+                                complib=self.complib,
+                                store_format=self.store_format)
 
         # ---------------------------------------------------------------------
         # column definitions
@@ -4718,7 +5019,8 @@ class Cases(object):
         fname = os.path.join(post_dir, sim_id + '_Leq')
         df_Leq = misc.dict2df(dict_Leq, fname, save=save, update=update,
                               csv=csv, check_datatypes=True, xlsx=xlsx,
-                              complib=self.complib)
+                              complib=self.complib,
+                              store_format=self.store_format)
 
         # only keep the ones that do not have nan's (only works with index)
         return df_Leq
@@ -4823,7 +5125,8 @@ class Cases(object):
         dict_AEP_h = {'case_id':case_ids, 'hours':hours}
         df_AEP_h = misc.dict2df(dict_AEP_h, fname, update=update, csv=csv,
                                 save=save, check_datatypes=True, xlsx=xlsx,
-                                complib=self.complib)
+                                complib=self.complib,
+                                store_format=self.store_format)
 
         # check if the power channel actually exists first!
         if ch_powe not in dfs[chan_col_name].unique():
@@ -4869,7 +5172,8 @@ class Cases(object):
         fname = os.path.join(post_dir, sim_id + '_AEP')
         df_AEP = misc.dict2df(dict_AEP, fname, update=update, csv=csv,
                               save=save, check_datatypes=True, xlsx=xlsx,
-                              complib=self.complib)
+                              complib=self.complib,
+                              store_format=self.store_format)
 
         return df_AEP
 
@@ -5218,6 +5522,16 @@ class Cases(object):
         self.cases = tmp_cases
 
 
+def _statistics_case_worker(args):
+    """
+    Calculate the statistics of one case in a worker process, see
+    Cases.statistics
+    """
+    cname, case, options, kwargs = args
+    cc = Cases({cname:case}, **options)
+    return cc._statistics_case(cname, case, **kwargs)
+
+
 class EnvelopeClass(object):
     """
     Class with the definition of the table for the envelope results
@@ -52,8 +52,13 @@ plt.rc('legend', numpoints=1)
 plt.rc('legend', borderaxespad=0)
 
 
-def merge_sim_ids(sim_ids, post_dirs, post_dir_save=False, columns=None):
+def merge_sim_ids(sim_ids, post_dirs, post_dir_save=False, columns=None,
+                  filters=None):
     """
+    Load and merge the statistics of one or more sim_id's.
+
+    Only the given columns and the rows matching filters (see
+    wetb.prepost.misc.filter_df) are loaded from the statistics.
     """
 
     cols_extra = ['[run_dir]', '[res_dir]', '[wdir]', '[DLC]', '[Case folder]']
@@ -73,9 +78,8 @@ def merge_sim_ids(sim_ids, post_dirs, post_dir_save=False, columns=None):
             else:
                 post_dir = post_dirs
             cc = sim.Cases(post_dir, sim_id, rem_failed=True)
-            df_stats, _, _ = cc.load_stats(leq=False)
-            if columns is not None:
-                df_stats = df_stats[columns]
+            df_stats, _, _ = cc.load_stats(leq=False, columns=columns,
+                                           filters=filters)
 
             # stats has only a few columns identifying the different cases
             # add some more for selecting them
@@ -139,7 +143,8 @@ def merge_sim_ids(sim_ids, post_dirs, post_dir_save=False, columns=None):
         if isinstance(post_dirs, list):
             post_dir = post_dirs[0]
         cc = sim.Cases(post_dir, sim_id, rem_failed=True)
-        df_stats, _, _ = cc.load_stats(columns=columns, leq=False)
+        df_stats, _, _ = cc.load_stats(columns=columns, leq=False,
+                                       filters=filters)
         if columns is not None:
             df_stats = df_stats[columns]
         run_dirs = [df_stats['[run_dir]'].unique()[0]]
@@ -483,7 +488,11 @@ class PlotStats(object):
     def __init__(self):
         pass
 
-    def load_stats(self, sim_ids, post_dirs, post_dir_save=False):
+    def load_stats(self, sim_ids, post_dirs, post_dir_save=False,
+                   filters=None):
+        """Load the statistics of one or more sim_id's. Only the rows that
+        match filters are loaded, see wetb.prepost.misc.filter_df.
+        """
 
         self.sim_ids = sim_ids
         self.post_dirs = post_dirs
@@ -501,7 +510,8 @@ class PlotStats(object):
                 else:
                     post_dir = post_dirs
                 cc = sim.Cases(post_dir, sim_id, rem_failed=True)
-                df_stats, _, _ = cc.load_stats(columns=cols, leq=False)
+                df_stats, _, _ = cc.load_stats(columns=cols, leq=False,
+                                               filters=filters)
                 print('%s Cases loaded.' % sim_id)
 
                 # if specified, save the merged sims elsewhere
@@ -535,7 +545,7 @@ class PlotStats(object):
             sim_ids = [sim_id]
             post_dir = post_dirs
             cc = sim.Cases(post_dir, sim_id, rem_failed=True)
-            df_stats, _, _ = cc.load_stats(leq=False)
+            df_stats, _, _ = cc.load_stats(leq=False, filters=filters)
 
         return df_stats
 
@@ -1199,20 +1199,138 @@ def df_dict_check_datatypes(df_dict):
             try:
                 df_dict2[str(colkey)] = np.array(col, dtype=np.float64)
             except ValueError:
-                df_dict2[str(colkey)] = np.array(col, dtype=np.str)
+                df_dict2[str(colkey)] = np.array(col, dtype=str)
         except TypeError:
             # in all other cases, make sure we have converted them to
             # strings and NOT unicode
-            df_dict2[str(colkey)] = np.array(col, dtype=np.str)
+            df_dict2[str(colkey)] = np.array(col, dtype=str)
         except Exception as e:
             print('failed to convert column %s to single data type' % colkey)
             raise(e)
     return df_dict2
 
 
+def df2parquet(df, fname, partition_cols=None, update=False):
+    """
+    Save a DataFrame as a Parquet dataset (a directory with one or more
+    Parquet files). Requires pyarrow.
+
+    Parameters
+    ----------
+
+    df : pandas.DataFrame
+
+    fname : str
+        Directory name of the dataset, including the .parquet extension.
+
+    partition_cols : list, default=None
+        Columns used to partition the dataset into sub-directories, e.g.
+        ['[DLC]']. Filters on these columns only read the matching
+        sub-directories. Columns that are not in df are ignored.
+
+    update : boolean, default=False
+        If True, df is added to an existing dataset, otherwise an existing
+        dataset is replaced.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if partition_cols is not None:
+        partition_cols = [col for col in partition_cols if col in df.columns]
+    if not update and os.path.isdir(fname):
+        shutil.rmtree(fname)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(table, fname, partition_cols=partition_cols or None)
+
+
+def filter_df(df, filters):
+    """
+    Select the rows of df that match filters.
+
+    Parameters
+    ----------
+
+    df : pandas.DataFrame
+
+    filters : list of tuples or list of lists of tuples
+        Filters in the same format as pyarrow/pandas.read_parquet: a list of
+        (column, op, value) tuples that all have to be True, with op one of
+        ==, =, !=, <, <=, >, >=, in, not in. A list of such lists selects the
+        rows that match any of them, e.g.
+        [('[DLC]', '==', 'dlc13_iec61400-1ed3'), ('channel', 'in', chans)]
+
+    Returns
+    -------
+
+    df : pandas.DataFrame
+    """
+    if not filters:
+        return df
+    if isinstance(filters[0], tuple):
+        filters = [filters]
+    ops = {'==': lambda c, v: c == v,
+           '=': lambda c, v: c == v,
+           '!=': lambda c, v: c != v,
+           '<': lambda c, v: c < v,
+           '<=': lambda c, v: c <= v,
+           '>': lambda c, v: c > v,
+           '>=': lambda c, v: c >= v,
+           'in': lambda c, v: c.isin(v),
+           'not in': lambda c, v: ~c.isin(v)}
+    sel = np.zeros(len(df), dtype=bool)
+    for conjunction in filters:
+        sel_and = np.ones(len(df), dtype=bool)
+        for col, op, value in conjunction:
+            if op not in ops:
+                raise ValueError('Unknown filter operator: %s' % op)
+            sel_and &= ops[op](df[col], value).values
+        sel |= sel_and
+    return df[sel]
+
+
+def load_df(fname, columns=None, filters=None):
+    """
+    Load a DataFrame saved by dict2df in the Parquet (fname.parquet) or
+    HDF5 (fname.h5) format.
+
+    For Parquet datasets, only the given columns and the row groups and
+    partitions matching filters are read from disc. For HDF5 the full table
+    is read and filtered in memory.
+
+    Parameters
+    ----------
+
+    fname : str
+        File name excluding the extension
+
+    columns : list, default=None
+        Columns to load, all if None
+
+    filters : list, default=None
+        Row filters, see filter_df
+
+    Returns
+    -------
+
+    df : pandas.DataFrame
+    """
+    if os.path.isdir(fname + '.parquet'):
+        df = pd.read_parquet(fname + '.parquet', engine='pyarrow',
+                             columns=columns, filters=filters or None)
+        return df
+    if filters:
+        # the filter columns might not be in columns
+        df = pd.read_hdf(fname + '.h5', 'table')
+        df = filter_df(df, filters)
+        if columns is not None:
+            df = df[columns]
+        return df
+    return pd.read_hdf(fname + '.h5', 'table', columns=columns)
+
+
 def dict2df(df_dict, fname, save=True, update=False, csv=False, colsort=None,
             check_datatypes=False, rowsort=None, csv_index=False, xlsx=False,
-            complib='blosc'):
+            complib='blosc', store_format='h5', partition_cols=None):
         """
         Convert the df_dict to df and save/update if required. If converting
         to df fails, pickle the object. Optionally save as csv too.
@@ -1224,8 +1342,15 @@ def dict2df(df_dict, fname, save=True, update=False, csv=False, colsort=None,
             Dictionary that will be converted to a DataFrame
 
         fname : str
-            File name excluding the extension. .pkl, .h5 and/or .csv will be
-            added.
+            File name excluding the extension. .pkl, .h5, .parquet and/or
+            .csv will be added.
+
+        store_format : str, default='h5'
+            Save as a PyTables HDF5 table (h5) or as Parquet dataset (parquet,
+            requires pyarrow). Use load_df to load the DataFrame again.
+
+        partition_cols : list, default=None
+            Columns used to partition the Parquet dataset, see df2parquet.
         """
         if check_datatypes:
             df_dict = df_dict_check_datatypes(df_dict)
@@ -1271,7 +1396,23 @@ def dict2df(df_dict, fname, save=True, update=False, csv=False, colsort=None,
 #                dfs[column_name] = dfs[column_name].astype('category')
 
         # and save/update the statistics database
-        if save and fname is not None:
+        if store_format not in ('h5', 'parquet'):
+            raise ValueError('store_format should be h5 or parquet, not %s'
+                             % store_format)
+
+        if save and fname is not None and store_format == 'parquet':
+            if update:
+                print('updating: %s ...' % (fname), end='')
+            else:
+                print('saving: %s ...' % (fname), end='')
+                if csv:
+                    dfs.to_csv('%s.csv' % fname, index=csv_index)
+                if xlsx:
+                    dfs.to_excel('%s.xlsx' % fname, index=csv_index)
+            df2parquet(dfs, '%s.parquet' % fname, partition_cols=partition_cols,
+                       update=update)
+            print('DONE!!\n')
+        elif save and fname is not None:
             if update:
                 print('updating: %s ...' % (fname), end='')
                 try:
@@ -27,6 +27,7 @@ import tarfile
 import glob
 import shutil
 import tempfile
+import multiprocessing
 
 import numpy as np
 import pandas as pd
@@ -670,9 +671,70 @@ def regroup_tarfiles(cc):
                     t2.addfile(tarinfo, fileobj)
 
 
+def _tar2df(tar_fname, tarmode='r:xz', dtypes={}, extensions=None,
+            index2col=None, fname_col=False, ignore_index=False, **kwargs):
+    """Read all csv files from a tar archive into one pd.DataFrame. All other
+    keyword arguments are passed on to pandas.read_csv.
+    """
+    dfs = []
+    with tarfile.open(tar_fname, mode=tarmode) as tar:
+        # iterate over the members rather than using getmembers() so the
+        # (compressed) archive is only read once from start to end
+        for tarinfo in tar:
+            if not tarinfo.isfile():
+                continue
+            if extensions is not None:
+                if tarinfo.name.split('.')[-1] not in extensions:
+                    continue
+            fileobj = tar.extractfile(tarinfo)
+            if tarinfo.name[-2:] == 'h5':
+                tmp = pd.read_hdf(fileobj, 'table', columns=kwargs.get('usecols'))
+            else:
+                tmp = pd.read_csv(fileobj, dtype=dtypes or None, **kwargs)
+            if index2col is not None:
+                # if the index does not have a name we can still set it
+                tmp[index2col] = tmp.index
+                tmp[index2col] = tmp[index2col].astype(str)
+                tmp.reset_index(level=0, drop=True, inplace=True)
+            # add the file name as a column
+            if fname_col:
+                case_id = os.path.basename(tarinfo.name)
+                tmp[fname_col] = '.'.join(case_id.split('.')[:-1])
+                tmp[fname_col] = tmp[fname_col].astype(str)
+            dfs.append(tmp)
+    if len(dfs) == 0:
+        return pd.DataFrame()
+    # a single concat instead of repeated appends (which copies all data
+    # for each append)
+    return pd.concat(dfs, ignore_index=ignore_index)
+
+
+def _tar2df_args(args):
+    tar_fname, kwargs = args
+    return tar_fname, _tar2df(tar_fname, **kwargs)
+
+
+def _imap_tar2df(tar_fnames, nr_cpus=1, **kwargs):
+    """Iterate over (tar_fname, df) of all tar_fnames. If nr_cpus > 1, the
+    tar archives are read in parallel by worker processes, but the results
+    are still returned in the order of tar_fnames.
+    """
+    args = [(tar_fname, kwargs) for tar_fname in tar_fnames]
+    if nr_cpus is None:
+        nr_cpus = multiprocessing.cpu_count()
+    if nr_cpus <= 1 or len(args) <= 1:
+        for arg in args:
+            yield _tar2df_args(arg)
+    else:
+        with multiprocessing.Pool(min(nr_cpus, len(args))) as pool:
+            for res in pool.imap(_tar2df_args, args):
+                yield res
+
+
 def merge_from_tarfiles(df_fname, path, pattern, tarmode='r:xz', tqdm=False,
                         header='infer', names=None, sep=',', min_itemsize={},
-                        verbose=False, dtypes={}):
+                        verbose=False, dtypes={}, nr_cpus=1,
+                        batchsize=1000000):
     """Merge all csv files from various tar archives into a big pd.DataFrame
     store.
 
@@ -714,10 +776,23 @@ def merge_from_tarfiles(df_fname, path, pattern, tarmode='r:xz', tqdm=False,
         Argument passed on to pandas.read_csv. Set to ';' when handling the
         ErrorLogs.
 
+    dtypes : dict, default={}
+        Argument passed on to pandas.read_csv (dtype). Set the data type of
+        given columns.
+
+    nr_cpus : int, default=1
+        Number of processes used to decompress and parse the tar archives.
+        If None, all cpus are used.
+
+    batchsize : int, default=1000000
+        The DataFrames of the tar archives are collected and appended to the
+        store when they contain at least batchsize rows in total.
+
     """
 
-    store = pd.HDFStore(os.path.join(path, df_fname), mode='w', format='table',
-                        complevel=9, complib='zlib')
+    # append always writes the table format
+    store = pd.HDFStore(os.path.join(path, df_fname), mode='w', complevel=9,
+                        complib='zlib')
 
     if tqdm:
         from tqdm import tqdm
@@ -725,31 +800,34 @@ def merge_from_tarfiles(df_fname, path, pattern, tarmode='r:xz', tqdm=False,
         def tqdm(itereable):
             return itereable
 
-    for tar_fname in tqdm(glob.glob(os.path.join(path, pattern))):
+    tar_fnames = glob.glob(os.path.join(path, pattern))
+    dfs, nr_rows = [], 0
+    for i, (tar_fname, tmp) in enumerate(tqdm(_imap_tar2df(
+            tar_fnames, nr_cpus=nr_cpus, tarmode=tarmode, dtypes=dtypes,
+            header=header, names=names, sep=sep))):
         if verbose:
             print(tar_fname)
-        with tarfile.open(tar_fname, mode=tarmode) as tar:
-            df = pd.DataFrame()
-            for tarinfo in tar.getmembers():
-                fileobj = tar.extractfile(tarinfo)
-                tmp = pd.read_csv(fileobj, header=header, names=names, sep=sep)
-                for col, dtype in dtypes.items():
-                    tmp[col] = tmp[col].astype(dtype)
-                df = df.append(tmp)
-            try:
-                if verbose:
-                    print('writing...')
-                store.append('table', df, min_itemsize=min_itemsize)
-            except Exception as e:
-                if verbose:
-                    print('store columns:')
-                    print(store.select('table', start=0, stop=0).columns)
-                    print('columns of the DataFrame being added:')
-                    print(df.columns)
-                storecols = store.select('table', start=0, stop=0).columns
-                store.close()
-                print(e)
-                return df, storecols
+        if len(tmp) > 0:
+            dfs.append(tmp)
+            nr_rows += len(tmp)
+        if len(dfs) == 0 or (nr_rows < batchsize and i < len(tar_fnames) - 1):
+            continue
+        df = pd.concat(dfs)
+        dfs, nr_rows = [], 0
+        try:
+            if verbose:
+                print('writing...')
+            store.append('table', df, min_itemsize=min_itemsize)
+        except Exception as e:
+            if verbose:
+                print('store columns:')
+                print(store.select('table', start=0, stop=0).columns)
+                print('columns of the DataFrame being added:')
+                print(df.columns)
+            storecols = store.select('table', start=0, stop=0).columns
+            store.close()
+            print(e)
+            return df, storecols
 
     store.close()
 
@@ -788,47 +866,31 @@ class AppendDataFrames(object):
 
     def df2store(self, store, path, tarmode='r:xz', min_itemsize={},
                  colnames=None, header='infer', columns=None, sep=';',
-                 index2col=None, ignore_index=True, fname_col=False):
-        """This is very slow, use txt2txt instead.
+                 index2col=None, ignore_index=True, fname_col=False,
+                 dtypes={}, nr_cpus=1, batchsize=1000000):
+        """Merge the csv (or h5) files of the tar archives matching path into
+        the pandas.HDFStore store.
+
+        The tar archives are decompressed and parsed by nr_cpus worker
+        processes (all cpus if None), and the DataFrames are appended to the
+        store in batches of at least batchsize rows. Use dtypes to set the
+        data type of given columns (passed on to pandas.read_csv).
         """
 
-        # TODO: it seems that with threading you could parallelize this kind
-        # of work: http://stackoverflow.com/q/23598063/3156685
-        # http://stackoverflow.com/questions/23598063/
-        # multithreaded-web-scraper-to-store-values-to-pandas-dataframe
-
-        # http://gouthamanbalaraman.com/blog/distributed-processing-pandas.html
-
-        df = pd.DataFrame()
-        for fname in self.tqdm(glob.glob(path)):
-            with tarfile.open(fname, mode=tarmode) as tar:
-                df = pd.DataFrame()
-                for tarinfo in tar.getmembers():
-                    fileobj = tar.extractfile(tarinfo)
-                    if tarinfo.name[-2:] == 'h5':
-                        tmp = pd.read_hdf(fileobj, 'table', columns=columns)
-                    elif tarinfo.name[-3:] == 'csv':
-                        tmp = pd.read_csv(fileobj, sep=sep, names=colnames,
-                                          header=header, usecols=columns)
-                    else:
-                        continue
-                    if index2col is not None:
-                        # if the index does not have a name we can still set it
-                        tmp[index2col] = tmp.index
-                        tmp[index2col] = tmp[index2col].astype(str)
-                        tmp.reset_index(level=0, drop=True, inplace=True)
-                    # add the file name as a column
-                    if fname_col:
-                        case_id = os.path.basename(tarinfo.name)
-                        tmp[fname_col] = '.'.join(case_id.split('.')[:-1])
-                        tmp[fname_col] = tmp[fname_col].astype(str)
-                    df = df.append(tmp, ignore_index=ignore_index)
-
-                store.append('table', df, min_itemsize=min_itemsize)
-#                if len(df) > w_every:
-#                    # and merge into the big ass DataFrame
-#                    store.append('table', df, min_itemsize=min_itemsize)
-#                    df = pd.DataFrame()
+        fnames = glob.glob(path)
+        dfs, nr_rows = [], 0
+        for i, (fname, tmp) in enumerate(self.tqdm(_imap_tar2df(
+                fnames, nr_cpus=nr_cpus, tarmode=tarmode, dtypes=dtypes,
+                extensions=['h5', 'csv'], index2col=index2col,
+                fname_col=fname_col, ignore_index=ignore_index, sep=sep,
+                names=colnames, header=header, usecols=columns))):
+            if len(tmp) > 0:
+                dfs.append(tmp)
+                nr_rows += len(tmp)
+            if len(dfs) > 0 and (nr_rows >= batchsize or i == len(fnames) - 1):
+                store.append('table', pd.concat(dfs, ignore_index=ignore_index),
+                             min_itemsize=min_itemsize)
+                dfs, nr_rows = [], 0
         return store
 
     # FIXME: when merging log file analysis (files with header), we are still
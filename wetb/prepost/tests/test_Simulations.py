@@ -14,6 +14,8 @@ import unittest
 import os
 import filecmp
 import shutil
+import glob
+import tempfile
 from zipfile import ZipFile
 
 import numpy as np
@@ -36,6 +38,77 @@ class TestErrorLogs(Template):
         # saved result to DataFrame
         pass
 
+    def test_check_dir(self):
+        logpath = os.path.join(self.basepath, '../../hawc2/tests/test_files/'
+                               'logfiles/model/logfiles/dlc14_iec61400-1ed3/')
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for fname in glob.glob(os.path.join(logpath, '*.log')):
+                shutil.copy(fname, tmpdir)
+            errorlogs = sim.ErrorLogs(silent=True)
+            errorlogs.PathToLogs = tmpdir
+            errorlogs.check(nr_cpus=2)
+            self.assertEqual(len(errorlogs.MsgListLog), 3)
+            for found_error, exit_correct in errorlogs.MsgListLog2.values():
+                self.assertFalse(found_error)
+                self.assertTrue(exit_correct)
+            fname = os.path.join(tmpdir, 'ErrorLog.csv')
+            self.assertEqual(len(errorlogs.csv2df(fname)), 3)
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestRunLocalParallel(Template):
+
+    def setUp(self):
+        super(TestRunLocalParallel, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        # fake wine that "runs" hawc2: copy a finished log file to log_dir
+        logfile = os.path.join(self.basepath, '../../hawc2/tests/test_files/'
+                               'logfiles/model/logfiles/dlc14_iec61400-1ed3/'
+                               'dlc14_wsp10_wdir000_s0000.log')
+        bindir = os.path.join(self.tmpdir, 'bin')
+        os.makedirs(bindir)
+        wine = os.path.join(bindir, 'wine')
+        with open(wine, 'w') as f:
+            f.write('#!/bin/sh\n')
+            f.write('echo "running $2"\n')
+            f.write('name=$(basename "$2" .htc)\n')
+            f.write('cp "%s" "logfiles/$name.log"\n' % os.path.abspath(logfile))
+        os.chmod(wine, 0o755)
+        self.path = os.environ['PATH']
+        os.environ['PATH'] = bindir + os.pathsep + self.path
+        self.cases = {}
+        for k in range(4):
+            self.cases['case%i.htc' % k] = {'[run_dir]':self.tmpdir,
+                                            '[htc_dir]':'htc/',
+                                            '[log_dir]':'logfiles/',
+                                            '[res_dir]':'res/',
+                                            '[pbs_out_dir]':'pbs_out/',
+                                            '[hawc2_exe]':'hawc2mb.exe',
+                                            '[sim_id]':'A0'}
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        shutil.rmtree(self.tmpdir)
+
+    def test_run_local_parallel(self):
+        cases = sim.run_local_parallel(self.cases, nr_cpus=2, silent=True)
+        for case, tags in cases.items():
+            self.assertTrue(tags['[hawc2_sim_ok]'])
+            with open(tags['sim_STDOUT_file']) as f:
+                self.assertEqual(f.read().strip(), 'running htc/%s' % case)
+        fname = os.path.join(self.tmpdir, 'logfiles', 'A0_ErrorLog.csv')
+        with open(fname) as f:
+            # header + one line per case
+            self.assertEqual(len(f.readlines()), 5)
+
+    def test_run_local_parallel_no_log(self):
+        os.remove(os.path.join(self.tmpdir, 'bin', 'wine'))
+        cases = sim.run_local_parallel(self.cases, nr_cpus=2, silent=True)
+        for tags in cases.values():
+            self.assertFalse(tags['[hawc2_sim_ok]'])
+
 
 class TestGenerateInputs(Template):
 
@@ -217,5 +290,53 @@ class TestFatigueLifetime(Template):
         np.testing.assert_allclose(df_Leq['m=5.2'].values, expected)
 
 
+class TestStatistics(Template):
+
+    def setUp(self):
+        super(TestStatistics, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        respath = os.path.join(self.basepath, '../../hawc2/tests/test_files/hawc2io/')
+        self.cases = {}
+        for k in range(3):
+            case_id = 'case%i' % k
+            for ext in ['.sel', '.dat']:
+                shutil.copy(os.path.join(respath, 'Hawc2bin' + ext),
+                            os.path.join(self.tmpdir, case_id + ext))
+            self.cases[case_id + '.htc'] = {'[run_dir]':self.tmpdir,
+                                            '[res_dir]':'',
+                                            '[post_dir]':self.tmpdir,
+                                            '[sim_id]':'A0',
+                                            '[case_id]':case_id,
+                                            '[seed]':k,
+                                            '[duration]':20.0}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def statistics(self, cases, **kwargs):
+        cc = sim.Cases(cases)
+        return cc.statistics(tags=['[seed]'], ch_fatigue=[], csv=False,
+                             silent=True, **kwargs)
+
+    def test_parallel(self):
+        df_serial = self.statistics(self.cases)
+        df_parallel = self.statistics(self.cases, nr_cpus=2)
+        self.assertEqual(len(df_serial), 3*28)
+        pd.testing.assert_frame_equal(df_serial, df_parallel)
+
+    def test_resume(self):
+        df_ref = self.statistics(self.cases)
+        fname = os.path.join(self.tmpdir, 'A0_statistics.h5')
+        # first case only, as if the post-processing was interrupted
+        self.statistics({'case0.htc':self.cases['case0.htc']})
+        self.statistics(self.cases, resume=True)
+        df = pd.read_hdf(fname, 'table')
+        self.assertEqual(len(df), len(df_ref))
+        self.assertEqual(sorted(df['[case_id]'].unique()),
+                         ['case0', 'case1', 'case2'])
+        pd.testing.assert_frame_equal(df.reset_index(drop=True),
+                                      df_ref.reset_index(drop=True))
+
+
 if __name__ == "__main__":
     unittest.main()
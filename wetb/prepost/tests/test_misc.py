@@ -0,0 +1,67 @@
+"""
+Tests for saving and loading DataFrames with wetb.prepost.misc
+"""
+import unittest
+import os
+import tempfile
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from wetb.prepost import misc
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class TestDict2df(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.fname = os.path.join(self.path, 'sim_id_statistics')
+        self.df_dict = {'[DLC]': ['dlc12', 'dlc12', 'dlc13', 'dlc13'] * 2,
+                        'channel': ['Tbx', 'Tby'] * 4,
+                        'max': np.arange(8, dtype=np.float64),
+                        'mean': np.ones(8)}
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_filter_df(self):
+        df = pd.DataFrame(self.df_dict)
+        df2 = misc.filter_df(df, [('[DLC]', '==', 'dlc13'), ('max', '>', 3)])
+        np.testing.assert_array_equal(df2['max'], [6, 7])
+        df2 = misc.filter_df(df, [[('max', '<', 1)], [('max', '>=', 7)]])
+        np.testing.assert_array_equal(df2['max'], [0, 7])
+        df2 = misc.filter_df(df, [('channel', 'not in', ['Tbx'])])
+        self.assertEqual(set(df2['channel']), {'Tby'})
+        self.assertRaises(ValueError, misc.filter_df, df, [('max', '~', 1)])
+
+    def test_load_df_h5(self):
+        misc.dict2df(self.df_dict, self.fname)
+        df = misc.load_df(self.fname, columns=['channel', 'max'],
+                          filters=[('[DLC]', '=', 'dlc12')])
+        self.assertEqual(list(df.columns), ['channel', 'max'])
+        np.testing.assert_array_equal(df['max'], [0, 1, 4, 5])
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_load_df_parquet(self):
+        misc.dict2df(self.df_dict, self.fname, store_format='parquet',
+                     partition_cols=['[DLC]', 'not_a_column'])
+        self.assertTrue(os.path.isdir(os.path.join(self.fname + '.parquet',
+                                                   '[DLC]=dlc13')))
+        df = misc.load_df(self.fname, columns=['channel', 'max'],
+                          filters=[('[DLC]', '=', 'dlc12')])
+        self.assertEqual(list(df.columns), ['channel', 'max'])
+        np.testing.assert_array_equal(np.sort(df['max']), [0, 1, 4, 5])
+        # update adds rows to the dataset
+        misc.dict2df(self.df_dict, self.fname, store_format='parquet',
+                     partition_cols=['[DLC]'], update=True)
+        self.assertEqual(len(misc.load_df(self.fname)), 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
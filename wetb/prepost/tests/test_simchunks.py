@@ -0,0 +1,68 @@
+"""
+Tests for merging the chunks of a simulation run
+"""
+import unittest
+import os
+import io
+import tarfile
+import tempfile
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from wetb.prepost.simchunks import merge_from_tarfiles, AppendDataFrames
+
+
+class TestMergeChunks(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        np.random.seed(1)
+        self.dfs = []
+        for i in range(4):
+            fname = os.path.join(self.path, 'chnk_%i.tar.xz' % i)
+            with tarfile.open(fname, mode='w:xz') as tar:
+                for j in range(3):
+                    df = pd.DataFrame({'case_id': ['case_%i_%i' % (i, j)] * 5,
+                                       'channel': np.arange(5),
+                                       'mean': np.random.rand(5)})
+                    self.dfs.append(df)
+                    data = df.to_csv(index=False).encode()
+                    tarinfo = tarfile.TarInfo('res/case_%i_%i.csv' % (i, j))
+                    tarinfo.size = len(data)
+                    tar.addfile(tarinfo, io.BytesIO(data))
+        self.df_ref = pd.concat(self.dfs, ignore_index=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def read_store(self, fname):
+        with pd.HDFStore(fname, mode='r') as store:
+            return store['table']
+
+    def test_merge_from_tarfiles(self):
+        for nr_cpus in [1, 2]:
+            merge_from_tarfiles('merged.h5', self.path, 'chnk_*.tar.xz',
+                                dtypes={'channel': np.int32}, nr_cpus=nr_cpus,
+                                batchsize=20, min_itemsize={'case_id': 20})
+            df = self.read_store(os.path.join(self.path, 'merged.h5'))
+            self.assertEqual(df['channel'].dtype, np.int32)
+            df = df.sort_values(['case_id', 'channel']).reset_index(drop=True)
+            pd.testing.assert_frame_equal(df, self.df_ref, check_dtype=False)
+
+    def test_df2store(self):
+        fname = os.path.join(self.path, 'merged.h5')
+        with pd.HDFStore(fname, mode='w') as store:
+            AppendDataFrames().df2store(store, os.path.join(self.path, '*.xz'),
+                                        sep=',', fname_col='fname', nr_cpus=2,
+                                        min_itemsize={'case_id': 20, 'fname': 20})
+        df = self.read_store(fname)
+        self.assertEqual(len(df), len(self.df_ref))
+        np.testing.assert_array_equal(df['case_id'], df['fname'])
+        df = df.sort_values(['case_id', 'channel']).reset_index(drop=True)
+        pd.testing.assert_frame_equal(df[self.df_ref.columns], self.df_ref)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,6 +14,8 @@ import unittest
 import io
 import os
 import tempfile
+import shutil
+from unittest import mock
 
 import numpy as np
 import pandas as pd
@@ -147,6 +149,51 @@ class TestsLogFile(unittest.TestCase):
         self.assertEqual(log.MsgListLog2[fpath], [True, True])
 
 
+    def test_readlogs_parallel(self):
+        fnames = ['simulating.log', 'simulation_error2.log', 'init_error.log',
+                  'tmp.log', 'finish.log']
+        fnames = [os.path.join(self.logpath, k) for k in fnames]
+        log_serial = windIO.LogFile()
+        log_serial.readlogs(fnames)
+        log = windIO.LogFile()
+        log.readlogs(fnames, nr_cpus=2, chunksize=2)
+        self.assertEqual(log.MsgListLog, log_serial.MsgListLog)
+        self.assertEqual(log.MsgListLog2, log_serial.MsgListLog2)
+        self.assertEqual([k[0] for k in log.MsgListLog], fnames)
+
+    def test_readlogs_errors(self):
+        # a log file that cannot be analysed is skipped by both the serial
+        # and the parallel analysis when ignore_errors is True
+        fnames = ['simulating.log', 'missing.log', 'finish.log']
+        fnames = [os.path.join(self.logpath, k) for k in fnames]
+        for nr_cpus in [1, 2]:
+            log = windIO.LogFile()
+            self.assertRaises(IOError, log.readlogs, fnames, nr_cpus=nr_cpus)
+            log = windIO.LogFile()
+            failed = log.readlogs(fnames, nr_cpus=nr_cpus, ignore_errors=True)
+            self.assertEqual([f for f, e in failed], [fnames[1]])
+            self.assertIsInstance(failed[0][1], IOError)
+            self.assertEqual([k[0] for k in log.MsgListLog], [fnames[0], fnames[2]])
+            self.assertEqual(sorted(log.MsgListLog2), sorted([fnames[0], fnames[2]]))
+
+    def test_msglistlog2df(self):
+        log = windIO.LogFile()
+        log.readlogs([os.path.join(self.logpath, k) for k in
+                      ['simulating.log', 'simulation_error2.log', 'tmp.log']])
+        fcsv = io.StringIO(log._msglistlog2csv(log._header()))
+        df = log.msglistlog2df()
+        pd.testing.assert_frame_equal(df, log.csv2df(fcsv))
+        self.assertEqual(df.loc[1,'nr_104'], 30)
+        self.assertEqual(df.loc[0,'msg_104'], '')
+
+    def test_readlog_iterations(self):
+        log = windIO.LogFile()
+        iterations = log.readlog(os.path.join(self.logpath, 'simulating.log'))
+        self.assertEqual(iterations.shape, (25, 3))
+        self.assertAlmostEqual(iterations[-1,0], 0.5, places=5)
+        self.assertEqual(iterations[:,1].sum(), 49)
+
+
 class TestsLoadResults(unittest.TestCase):
 
     def setUp(self):
@@ -184,6 +231,82 @@ class TestsLoadResults(unittest.TestCase):
             np.testing.assert_allclose(res_ascii.sig[:,k], res_bin.sig[:,k],
                                        rtol=1e-02, atol=0.001)
 
+    def test_lazy(self):
+        res = windIO.LoadResults(self.respath, self.fbin)
+        res_lazy = windIO.LoadResults(self.respath, self.fbin, lazy=True)
+        self.assertIsInstance(res_lazy.sig, windIO.LazySignals)
+        self.assertEqual(res_lazy.sig.shape, res.sig.shape)
+        self.assertEqual(len(res_lazy.sig._channels), 0)
+        np.testing.assert_array_equal(res_lazy.sig[:,0], res.sig[:,0])
+        np.testing.assert_array_equal(res_lazy.sig[10:20,[3,1]], res.sig[10:20,[3,1]])
+        np.testing.assert_array_equal(res_lazy.sig[5,2:4], res.sig[5,2:4])
+        np.testing.assert_array_equal(res_lazy.sig[:,-1], res.sig[:,-1])
+        self.assertEqual(len(res_lazy.sig._channels), 5)
+        name = res.ch_df.loc[7, 'unique_ch_name']
+        np.testing.assert_array_equal(res_lazy.sig[name], res.sig[:,7])
+        np.testing.assert_array_equal(res_lazy.sig[:,[name, 'Time']], res.sig[:,[7,0]])
+        np.testing.assert_array_equal(np.asarray(res_lazy.sig), res.sig)
+        # cached channels cannot be modified in place, copies can
+        with self.assertRaises(ValueError):
+            res_lazy.sig[:,0][0] = -1
+        with self.assertRaises(ValueError):
+            res_lazy.sig['Time'] *= 2
+        self.assertTrue(np.asarray(res_lazy.sig).flags.writeable)
+        np.testing.assert_array_equal(res_lazy.sig[:,0], res.sig[:,0])
+        pd.testing.assert_frame_equal(res_lazy.statsdel_df(delchans=[]),
+                                      res.statsdel_df(delchans=[]))
+        # statsdel_df only reads time and the selected channels
+        res_lazy = windIO.LoadResults(self.respath, self.fbin, lazy=True)
+        names = res.ch_df.loc[[7, 3], 'unique_ch_name'].tolist()
+        statsdel = res_lazy.statsdel_df(statchans=names, delchans=names[1:])
+        self.assertEqual(sorted(res_lazy.sig._channels), [0, 3, 7])
+        pd.testing.assert_frame_equal(
+            statsdel, res.statsdel_df(statchans=names, delchans=names[1:]))
+
+    def test_ch_index_cache(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for ext in ['.sel', '.dat']:
+                shutil.copy(os.path.join(self.respath, self.fbin + ext), tmpdir)
+            fname = os.path.join(tmpdir, self.fbin + '.ch_index.pkl')
+            res = windIO.LoadResults(tmpdir, self.fbin, ch_index_cache=True)
+            self.assertTrue(os.path.isfile(fname))
+            parse = windIO.LoadResults._unified_channel_names
+            with mock.patch.object(windIO.LoadResults, '_unified_channel_names',
+                                   autospec=True, side_effect=parse) as m:
+                res2 = windIO.LoadResults(tmpdir, self.fbin, ch_index_cache=True)
+                self.assertEqual(m.call_count, 0)
+                self.assertEqual(res2.ch_dict, res.ch_dict)
+                pd.testing.assert_frame_equal(res2.ch_df, res.ch_df)
+                # a changed sel file invalidates the index
+                fsel = os.path.join(tmpdir, self.fbin + '.sel')
+                st = os.stat(fsel)
+                os.utime(fsel, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+                res3 = windIO.LoadResults(tmpdir, self.fbin, ch_index_cache=True)
+                self.assertEqual(m.call_count, 1)
+                self.assertEqual(res3.ch_dict, res.ch_dict)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_statsdel_df(self):
+        res = windIO.LoadResults(self.respath, self.fbin)
+        chans = res.ch_df['unique_ch_name'].tolist()
+        df = res.statsdel_df(delchans=chans[5:10], m=[3, 12])
+        self.assertEqual(df.index.tolist(), chans)
+        self.assertEqual(df.columns.tolist()[-3:], ['m=3', 'm=12', 'intabs'])
+        sig = res.sig[:, res.ch_df.index.values]
+        np.testing.assert_allclose(df['max'], sig.max(axis=0))
+        np.testing.assert_allclose(df['mean'], sig.mean(axis=0))
+        np.testing.assert_allclose(df['std'], sig.std(axis=0), atol=1e-12)
+        np.testing.assert_allclose(df['absmax'], np.abs(sig).max(axis=0))
+        np.testing.assert_allclose(df['rms'], np.sqrt(np.mean(sig**2, axis=0)))
+        np.testing.assert_allclose(df['int'], np.trapz(sig, x=res.sig[:,0], axis=0))
+        np.testing.assert_allclose(df['intabs'], np.trapz(np.abs(sig), x=res.sig[:,0], axis=0))
+        self.assertTrue(df['m=3'].iloc[5:10].notnull().all())
+        self.assertTrue(df['m=3'].iloc[:5].isnull().all())
+        eq = res.calc_fatigue(sig[:, 6], m=[3, 12], neq=res.sig[-1,0] - res.sig[0,0])
+        np.testing.assert_allclose(df.iloc[6][['m=3', 'm=12']], eq)
+
     def test_unified_chan_names(self):
         res = windIO.LoadResults(self.respath, self.fascii, readdata=False)
         self.assertFalse(hasattr(res, 'sig'))
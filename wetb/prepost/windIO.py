@@ -23,16 +23,17 @@ __version__ = '0.5'
 
 import os
 import copy
+import multiprocessing
 import struct
 import math
 from time import time
 import codecs
 from itertools import chain
 import re as re
+import pickle
 
 import numpy as np
 import scipy as sp
-import scipy.integrate as integrate
 import pandas as pd
 
 # misc is part of prepost, which is available on the dtu wind gitlab server:
@@ -41,7 +42,9 @@ from wetb.prepost import misc
 # wind energy python toolbox, available on the dtu wind redmine server:
 # http://vind-redmine.win.dtu.dk/projects/pythontoolbox/repository/show/fatigue_tools
 from wetb.hawc2.Hawc2io import ReadHawc2
-from wetb.fatigue_tools.fatigue import (eq_load, cycle_matrix2)
+from wetb.signal.statistics import statistics
+from wetb.fatigue_tools.fatigue import (eq_load, eq_load_channels,
+                                        cycle_matrix2)
 
 
 class LogFile(object):
@@ -148,7 +151,14 @@ class LogFile(object):
         self.header = None
 
     def readlog(self, fname, case=None, save_iter=False):
-        """
+        """Analyse a single log file and append the result to
+        LogFile.MsgListLog and LogFile.MsgListLog2
+
+        Returns
+        -------
+
+        iterations : ndarray(nr_time_steps, 3)
+            time, number of iterations and error flag of each time step
         """
         # open the current log file
         with open(fname, 'r') as f:
@@ -381,16 +391,114 @@ class LogFile(object):
         self.MsgListLog.append(tempLog)
         self.MsgListLog2[fname] = [found_error, exit_correct]
 
+        return iterations
+
+    def readlogs(self, fnames, cases=None, save_iter=False, nr_cpus=1,
+                 chunksize=20, ignore_errors=False):
+        """Analyse many log files, optionally in parallel
+
+        Same as calling LogFile.readlog for each file, but the files are
+        distributed over nr_cpus processes. The results are appended to
+        LogFile.MsgListLog and LogFile.MsgListLog2 in the order of fnames.
+
+        Parameters
+        ----------
+
+        fnames : list
+            Log file names
+
+        cases : list, default=None
+            Case dictionary (tags) of each log file, see LogFile.readlog
+
+        save_iter : boolean, default=False
+            Save the iterations of each log file, see LogFile.readlog
+
+        nr_cpus : int, default=1
+            Number of processes. If None, the number of CPUs of the machine
+            is used.
+
+        chunksize : int, default=20
+            Number of log files send to a process at a time
+
+        ignore_errors : boolean, default=False
+            If True, log files that cannot be analysed are skipped (they are
+            not added to MsgListLog and MsgListLog2) and returned. If False,
+            the exception is raised
+
+        Returns
+        -------
+
+        failed : list
+            (fname, exception) of the skipped log files (only if
+            ignore_errors is True)
+        """
+        if cases is None:
+            cases = [None]*len(fnames)
+        if nr_cpus is None:
+            nr_cpus = multiprocessing.cpu_count()
+        failed = []
+        if nr_cpus < 2 or len(fnames) < 2:
+            for fname, case in zip(fnames, cases):
+                try:
+                    self.readlog(fname, case=case, save_iter=save_iter)
+                except Exception as e:
+                    if not ignore_errors:
+                        raise
+                    failed.append((fname, e))
+            return failed
+
+        # the workers get an empty copy of self to use the same messages
+        logfile = copy.copy(self)
+        logfile.MsgListLog, logfile.MsgListLog2 = [], dict()
+        args = [(logfile, fname, case, save_iter)
+                for fname, case in zip(fnames, cases)]
+        pool = multiprocessing.Pool(nr_cpus)
+        try:
+            for fname, result, error in pool.imap(_readlog, args, chunksize):
+                if error is not None:
+                    if not ignore_errors:
+                        raise error
+                    failed.append((fname, error))
+                    continue
+                tempLog, msg2 = result
+                self.MsgListLog.append(tempLog)
+                self.MsgListLog2[fname] = msg2
+        finally:
+            pool.close()
+            pool.join()
+        return failed
+
     def _msglistlog2csv(self, contents):
         """Write LogFile.MsgListLog to a csv file. Use LogFile._header to
         create a header.
         """
-        for k in self.MsgListLog:
-            for n in k:
-                contents = contents + str(n) + ';'
-            # at the end of each line, new line symbol
-            contents = contents + '\n'
-        return contents
+        # join once instead of growing the string, which is quadratic in time
+        lines = [''.join([str(n) + ';' for n in k]) for k in self.MsgListLog]
+        lines.append('')
+        return contents + '\n'.join(lines)
+
+    def msglistlog2df(self):
+        """Convert LogFile.MsgListLog to a pandas.DataFrame with the same
+        columns and data types as LogFile.csv2df, but without the detour
+        over a csv file.
+        """
+        colnames, min_itemsize, dtypes = self.headers4df()
+        # sim_id is not part of the log analysis
+        ncols = len(colnames) - 1
+        rows = [k[:ncols] + ['']*(ncols - len(k)) for k in self.MsgListLog]
+        columns = zip(*rows) if rows else [[]]*ncols
+        df_dict = {}
+        for col, values in zip(colnames, columns):
+            values = np.array(values, dtype=object)
+            if col == 'file_name' or dtypes.get(col, None) == str:
+                df_dict[col] = values.astype(str)
+            else:
+                values[values == ''] = np.nan
+                df_dict[col] = pd.to_numeric(values, errors='coerce')
+                if col in dtypes:
+                    df_dict[col] = df_dict[col].astype(dtypes[col])
+        df_dict['sim_id'] = np.full(len(rows), np.nan)
+        return pd.DataFrame(df_dict, columns=colnames)
 
     def csv2df(self, fname, header=0):
         """Read a csv log file analysis and convert to a pandas.DataFrame
@@ -485,6 +593,97 @@ class LogFile(object):
         return colnames, min_itemsize, dtypes
 
 
+def _readlog(args):
+    """Analyse a log file in a worker process, see LogFile.readlogs
+
+    Exceptions are returned instead of raised, such that one failing log
+    file does not abort the other files in the pool"""
+    logfile, fname, case, save_iter = args
+    try:
+        logfile.readlog(fname, case=case, save_iter=save_iter)
+    except Exception as e:
+        return fname, None, e
+    return fname, (logfile.MsgListLog.pop(), logfile.MsgListLog2.pop(fname)), None
+
+
+class LazySignals(object):
+    """Array-like proxy of LoadResults.sig for binary HAWC2 result files.
+
+    Channels are read (via a memory-map) and scaled on first access, and
+    cached for reuse. It is indexed as the sig array, sig[timeStep,channel],
+    or with the unique channel name (see LoadResults.ch_dict), for example:
+
+    >>> res = LoadResults(file_path, file_name, lazy=True)
+    >>> time = res.sig[:,0]
+    >>> mx = res.sig['tower-tower-node-001-momentvec-x']
+    >>> mxy = res.sig[:,['tower-tower-node-001-momentvec-x',
+                         'tower-tower-node-001-momentvec-y']]
+
+    np.asarray(res.sig) reads all channels.
+
+    The cached channels are read-only, i.e. single channels and slices of
+    channels (views of the cache) cannot be modified in place, e.g.
+    res.sig[:,1] -= 1 raises an error. Use a copy instead:
+
+    >>> mx = res.sig[:,1] - 1
+    """
+
+    def __init__(self, res):
+        self._res = res
+        self._channels = {}
+        self.shape = (int(res.NrSc), int(res.NrCh))
+        self.ndim = 2
+        self.dtype = np.dtype(res.dtype)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _chi(self, ch):
+        if isinstance(ch, str):
+            return self._res.ch_dict[ch]['chi']
+        return range(self.shape[1])[ch]
+
+    def channel(self, ch):
+        """Return channel ch (channel index or unique channel name)"""
+        chi = self._chi(ch)
+        if chi not in self._channels:
+            channel = self._res.ReadChannel(chi)
+            # protect the cached channel against in place modifications
+            channel.flags.writeable = False
+            self._channels[chi] = channel
+        return self._channels[chi]
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.channel(key)
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > 2:
+            raise IndexError('too many indices for LazySignals')
+        rows = key[0]
+        cols = key[1] if len(key) == 2 else slice(None)
+        if isinstance(cols, (str, int, np.integer)):
+            return self.channel(cols)[rows]
+        if isinstance(cols, (list, tuple)) and len(cols) > 0 and \
+                isinstance(cols[0], str):
+            chis = [self._chi(col) for col in cols]
+        else:
+            chis = np.arange(self.shape[1])[cols]
+        if len(chis) == 0:
+            nrows = len(np.arange(self.shape[0])[rows])
+            return np.empty((nrows, 0), dtype=self.dtype)
+        data = [self.channel(chi)[rows] for chi in chis]
+        if np.ndim(data[0]) == 0:
+            return np.array(data)
+        return np.stack(data, axis=-1)
+
+    def __array__(self, dtype=None):
+        data = self[:,:]
+        if dtype is not None:
+            return data.astype(dtype)
+        return data
+
+
 class LoadResults(ReadHawc2):
     """Read a HAWC2 result data file
 
@@ -494,6 +693,11 @@ class LoadResults(ReadHawc2):
     This class is called like a function:
     HawcResultData() will read the specified file upon object initialization.
 
+    For binary result files, use lazy=True to only read the channels that
+    are actually used, see LazySignals, and ch_index_cache=True to save the
+    unified channel names next to the .sel file (file_name.ch_index.pkl)
+    so they are not parsed again the next time the file is opened.
+
     Available output:
     obj.sig[timeStep,channel]   : complete result file in a numpy array
     obj.ch_details[channel,(0=ID; 1=units; 2=description)] : np.array
@@ -551,8 +755,12 @@ class LoadResults(ReadHawc2):
 
     # start with reading the .sel file, containing the info regarding
     # how to read the binary file and the channel information
+    # increase when the result of _unified_channel_names changes, so the
+    # cached channel indices are updated
+    ch_index_version = 1
+
     def __init__(self, file_path, file_name, debug=False, usecols=None,
-                 readdata=True):
+                 readdata=True, lazy=False, ch_index_cache=False):
 
         self.debug = debug
 
@@ -570,12 +778,15 @@ class LoadResults(ReadHawc2):
         self.file_name = file_name
         FileName = os.path.join(self.file_path, self.file_name)
 
-        super(LoadResults, self).__init__(FileName, ReadOnly=readdata)
+        super(LoadResults, self).__init__(FileName, ReadOnly=readdata,
+                                          mmap=lazy)
         self.FileType = self.FileFormat
         if self.FileType.find('HAWC2_') > -1:
             self.FileType = self.FileType[6:]
 
-        if readdata:
+        if readdata and lazy and self.FileType == 'BINARY':
+            self.sig = LazySignals(self)
+        elif readdata:
             ChVec = [] if usecols is None else usecols
             self.sig = self.ReadAll(ChVec=ChVec)
 
@@ -590,12 +801,57 @@ class LoadResults(ReadHawc2):
                 self.ch_details[ic, 1] = self.ChInfo[1][ic]
                 self.ch_details[ic, 2] = self.ChInfo[2][ic]
 
-        self._unified_channel_names()
+        if not (ch_index_cache and self._load_ch_index()):
+            self._unified_channel_names()
+            if ch_index_cache:
+                self._save_ch_index()
 
         if self.debug:
             stop = time() - start
             print('time to load HAWC2 file:', stop, 's')
 
+    def _ch_index_fname(self):
+        return os.path.join(self.file_path, self.file_name + '.ch_index.pkl')
+
+    def _sel_signature(self):
+        st = os.stat(os.path.join(self.file_path, self.file_name + '.sel'))
+        return (self.ch_index_version, st.st_mtime_ns, st.st_size)
+
+    def _load_ch_index(self):
+        """Load ch_dict and ch_df saved by _save_ch_index. Return False if
+        there is no (valid) saved channel index for the current .sel file.
+        """
+        if self.FileType not in ['ASCII', 'BINARY']:
+            return False
+        try:
+            with open(self._ch_index_fname(), 'rb') as f:
+                signature, ch_dict, ch_df = pickle.load(f)
+            if signature != self._sel_signature():
+                return False
+        except Exception:
+            return False
+        self.ch_dict, self.ch_df = ch_dict, ch_df
+        return True
+
+    def _save_ch_index(self):
+        """Save ch_dict and ch_df next to the .sel file. Failing to save
+        (e.g. no write permission) is ignored.
+        """
+        if self.FileType not in ['ASCII', 'BINARY']:
+            return
+        fname = self._ch_index_fname()
+        # write to a temporary file first, so parallel readers never see a
+        # partly written file
+        fname_tmp = '%s.%i.tmp' % (fname, os.getpid())
+        try:
+            with open(fname_tmp, 'wb') as f:
+                pickle.dump((self._sel_signature(), self.ch_dict, self.ch_df),
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(fname_tmp, fname)
+        except OSError:
+            if os.path.isfile(fname_tmp):
+                os.remove(fname_tmp)
+
     # TODO: THIS IS STILL A WIP
     def _make_channel_names(self):
         """Give every channel a unique channel name which is (nearly) identical
@@ -1483,16 +1739,9 @@ class LoadResults(ReadHawc2):
     # TODO: general signal method, this is not HAWC2 specific, move out
     def calc_stats(self, sig, i0=0, i1=None):
 
-        stats = {}
-        # calculate the statistics values:
-        stats['max'] = sig[i0:i1, :].max(axis=0)
-        stats['min'] = sig[i0:i1, :].min(axis=0)
-        stats['mean'] = sig[i0:i1, :].mean(axis=0)
-        stats['std'] = sig[i0:i1, :].std(axis=0)
-        stats['range'] = stats['max'] - stats['min']
-        stats['absmax'] = np.absolute(sig[i0:i1, :]).max(axis=0)
-        stats['rms'] = np.sqrt(np.mean(sig[i0:i1, :]*sig[i0:i1, :], axis=0))
-        stats['int'] = integrate.trapz(sig[i0:i1, :], x=sig[i0:i1, 0], axis=0)
+        # calculate the statistics values in one pass over the signal
+        stats = statistics(sig[i0:i1, :], time=sig[i0:i1, 0])
+        del stats['intabs']
         return stats
 
     def statsdel_df(self, i0=0, i1=None, statchans='all', delchans='all',
@@ -1544,31 +1793,36 @@ class LoadResults(ReadHawc2):
         if len(set(delchans) - set(statchans)) > 0:
             raise ValueError('delchans has to be a subset of statchans')
 
-        tmp = np.ndarray((len(statchans), len(stats+m)))
-        tmp[:,:] = np.nan
         m_cols = ['m=%i' % m_ for m_ in m]
-        statsdel = pd.DataFrame(tmp, columns=stats+m_cols)
-        statsdel.index = statchans
-
-        datasel = self.sig[i0:i1,statchis]
-        time = self.sig[i0:i1,0]
-        statsdel['max'] = datasel.max(axis=0)
-        statsdel['min'] = datasel.min(axis=0)
-        statsdel['mean'] = datasel.mean(axis=0)
-        statsdel['std'] = datasel.std(axis=0)
-        statsdel['range'] = statsdel['max'] - statsdel['min']
-        statsdel['absmax'] = np.abs(datasel).max(axis=0)
-        statsdel['rms'] = np.sqrt(np.mean(datasel*datasel, axis=0))
-        statsdel['int'] = integrate.trapz(datasel, x=time, axis=0)
-        statsdel['intabs'] = integrate.trapz(np.abs(datasel), x=time, axis=0)
+        columns = stats + m_cols + ['intabs']
+        # collect all results in one array and create the DataFrame once
+        data = np.full((len(statchis), len(columns)), np.nan)
+
+        # only read time and the selected channels (see LazySignals), and
+        # map the channel indices to the columns of the selection
+        chis = np.unique(np.concatenate([[0], statchis, delchis])).astype(int)
+        sig = self.sig[i0:i1, chis.tolist()]
+        icols = pd.Index(chis)
+
+        # all statistics in one pass over the selected channels
+        stats_ch = statistics(sig, time=sig[:,0],
+                              channels=icols.get_indexer(statchis))
+        for i, stat in enumerate(stats):
+            data[:,i] = stats_ch[stat]
+        data[:,-1] = stats_ch['intabs']
 
         if neq is None:
             neq = self.sig[-1,0] - self.sig[0,0]
 
-        for chi, chan in zip(delchis, delchans):
-            signal = self.sig[i0:i1,chi]
-            eq = self.calc_fatigue(signal, no_bins=no_bins, neq=neq, m=m)
-            statsdel.loc[chan][m_cols] = eq
+        # all DEL channels in one vectorized call, shape (1, len(m), len(delchis))
+        if len(delchis) > 0:
+            eq = eq_load_channels(sig[:,icols.get_indexer(delchis)],
+                                  no_bins=no_bins, neq=neq, m=m)
+            irows = pd.Index(statchis).get_indexer(delchis)
+            data[irows, len(stats):len(stats)+len(m)] = eq[0].T
+
+        index = self.ch_df.loc[statchis, 'unique_ch_name'].values
+        statsdel = pd.DataFrame(data, columns=columns, index=index)
 
         return statsdel
 
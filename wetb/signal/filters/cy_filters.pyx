@@ -17,7 +17,7 @@ cimport numpy as np
 @cython.locals(alpha=cython.float, i=cython.int)
 cpdef cy_low_pass_filter(np.ndarray[double,ndim=1] inp, double delta_t, double tau):
     cdef np.ndarray[double,ndim=1] output
-    output = np.empty_like(inp, dtype=np.float)
+    output = np.empty_like(inp, dtype=np.float64)
     output[0] = inp[0]
 
     alpha = delta_t / (tau + delta_t)
@@ -30,7 +30,7 @@ cpdef cy_dynamic_low_pass_filter(np.ndarray[double,ndim=1] inp, double delta_t,
     cdef np.ndarray[double,ndim=1] output, alpha
     cdef int i
 
-    output = np.empty_like(inp, dtype=np.float)
+    output = np.empty_like(inp, dtype=np.float64)
     output[0] = inp[0]
 
     if method == 1:
@@ -50,7 +50,7 @@ cpdef cy_dynamic_low_pass_filter(np.ndarray[double,ndim=1] inp, double delta_t,
 @cython.locals(alpha=cython.float, i=cython.int)
 cpdef cy_high_pass_filter(np.ndarray[double,ndim=1] inp, double delta_t, double tau):
     cdef np.ndarray[double,ndim=1] output
-    output = np.empty_like(inp, dtype=np.float)
+    output = np.empty_like(inp, dtype=np.float64)
     output[0] = inp[0]
     alpha = tau / (tau + delta_t)
     for i in range(1, inp.shape[0]):
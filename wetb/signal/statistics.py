@@ -0,0 +1,112 @@
+"""
+Statistics of many channels in one pass over the data
+"""
+import numpy as np
+
+
+def trapz_weights(x):
+    """Weights, w, of the trapezoidal rule, such that np.trapz(y, x) == w @ y
+
+    Parameters
+    ----------
+    x : array_like
+        Sample points (e.g. time), shape (n,)
+
+    Returns
+    -------
+    w : ndarray, shape (n,)
+    """
+    dx = np.diff(np.asarray(x, dtype=np.float64))
+    w = np.zeros(len(dx) + 1)
+    w[:-1] += dx / 2
+    w[1:] += dx / 2
+    return w
+
+
+def statistics(data, time=None, channels=None, chunksize=512):
+    """Max, min, mean, std, range, absmax, rms and integrals of all channels in one pass
+
+    The data is processed in blocks of chunksize samples, i.e. each sample is read once and only
+    small (cache sized) temporary arrays are allocated. All sums are accumulated in float64,
+    also for float32 input
+
+    Parameters
+    ----------
+    data : array_like
+        Signals, shape (n,) or (n, no_channels)
+    time : array_like, optional
+        Time (or other sample points), shape (n,), used for the integrals 'int' and 'intabs'.
+        If None, the integrals are not calculated
+    channels : array_like, optional
+        Indexes of the channels (columns) of data to include. If None, all channels are included.
+        Selecting channels here avoids copying data
+    chunksize : int, optional
+        Number of samples per block
+
+    Returns
+    -------
+    stats : dict
+        Dictionary with 'max', 'min', 'mean', 'std', 'range', 'absmax', 'rms' and,
+        if time is given, 'int' (trapezoidal integral) and 'intabs' (integral of the absolute value).
+        The values are float64 arrays of shape (no_channels,) or scalars for 1D data
+
+    Examples
+    --------
+    >>> stats = statistics(sig[:, 1:], time=sig[:, 0])
+    >>> stats['mean'], stats['std']
+    """
+    data = np.asarray(data)
+    squeeze = data.ndim == 1
+    if squeeze:
+        data = data[:, np.newaxis]
+    if channels is not None:
+        channels = np.asarray(channels)
+        # contiguous ranges can be sliced (no copy)
+        if len(channels) > 0 and np.all(np.diff(channels) == 1):
+            data, channels = data[:, channels[0]:channels[-1] + 1], None
+    n = data.shape[0]
+    if n == 0:
+        raise ValueError("statistics of empty signals are not defined")
+    nch = data.shape[1] if channels is None else len(channels)
+
+    if time is not None:
+        w = trapz_weights(time)
+        if len(w) != n:
+            raise ValueError("time and data must have the same number of samples")
+    # The sums are calculated of data minus the first sample to reduce cancellation errors in std
+    shift = np.asarray(data[0] if channels is None else data[0, channels], dtype=np.float64)
+    mx = np.full(nch, -np.inf)
+    mn = np.full(nch, np.inf)
+    s1 = np.zeros(nch)
+    s2 = np.zeros(nch)
+    if time is not None:
+        int_ = np.zeros(nch)
+        intabs = np.zeros(nch)
+    for i in range(0, n, chunksize):
+        block = data[i:i + chunksize]
+        if channels is not None:
+            block = block[:, channels]
+        np.maximum(mx, block.max(0), out=mx)
+        np.minimum(mn, block.min(0), out=mn)
+        if time is not None:
+            w_block = w[i:i + chunksize]
+            intabs += w_block @ np.abs(block)
+        block = np.subtract(block, shift, dtype=np.float64)
+        s1 += block.sum(0)
+        s2 += np.einsum('ij,ij->j', block, block)
+        if time is not None:
+            int_ += w_block @ block
+
+    mean = s1 / n
+    stats = {'max': mx, 'min': mn, 'mean': shift + mean,
+             'std': np.sqrt(np.maximum(s2 / n - mean**2, 0)),
+             'range': mx - mn,
+             'absmax': np.maximum(np.abs(mx), np.abs(mn)),
+             'rms': np.sqrt(np.maximum((s2 + 2 * shift * s1) / n + shift**2, 0))}
+    if time is not None:
+        stats['int'] = int_ + shift * w.sum()
+        stats['intabs'] = intabs
+    stats = {k: v.astype(np.float64) for k, v in stats.items()}
+    if squeeze:
+        stats = {k: v[0] for k, v in stats.items()}
+    return stats
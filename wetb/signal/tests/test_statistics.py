@@ -0,0 +1,59 @@
+"""
+Tests for wetb.signal.statistics
+"""
+import unittest
+
+import numpy as np
+from wetb.signal.statistics import statistics, trapz_weights
+
+
+class TestStatistics(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(1)
+        self.time = np.cumsum(np.random.rand(1000))
+        self.data = np.random.randn(1000, 5) * 10 + np.arange(5) * 1e4
+
+    def test_trapz_weights(self):
+        np.testing.assert_allclose(trapz_weights(self.time) @ self.data, np.trapz(self.data, self.time, axis=0))
+
+    def test_statistics(self):
+        data = self.data
+        stats = statistics(data, self.time, chunksize=64)
+        np.testing.assert_array_equal(stats['max'], data.max(0))
+        np.testing.assert_array_equal(stats['min'], data.min(0))
+        np.testing.assert_allclose(stats['mean'], data.mean(0))
+        np.testing.assert_allclose(stats['std'], data.std(0))
+        np.testing.assert_allclose(stats['range'], data.max(0) - data.min(0))
+        np.testing.assert_allclose(stats['absmax'], np.abs(data).max(0))
+        np.testing.assert_allclose(stats['rms'], np.sqrt(np.mean(data**2, 0)))
+        np.testing.assert_allclose(stats['int'], np.trapz(data, self.time, axis=0))
+        np.testing.assert_allclose(stats['intabs'], np.trapz(np.abs(data), self.time, axis=0))
+
+    def test_channels(self):
+        for channels in [[1, 2, 3], [4, 0, 2]]:
+            stats = statistics(self.data, self.time, channels=channels)
+            ref = statistics(self.data[:, channels], self.time)
+            for k in ref:
+                np.testing.assert_allclose(stats[k], ref[k], rtol=1e-12)
+
+    def test_1d_float32(self):
+        data = self.data[:, 2].astype(np.float32)
+        stats = statistics(data)
+        self.assertNotIn('int', stats)
+        self.assertEqual(stats['max'].dtype, np.float64)
+        self.assertEqual(np.ndim(stats['mean']), 0)
+        np.testing.assert_allclose(stats['mean'], data.astype(np.float64).mean(), rtol=1e-12)
+        np.testing.assert_allclose(stats['std'], data.astype(np.float64).std(), rtol=1e-6)
+
+    def test_nan(self):
+        data = self.data.copy()
+        data[500, 1] = np.nan
+        stats = statistics(data, chunksize=100)
+        self.assertTrue(np.isnan(stats['max'][1]))
+        self.assertTrue(np.isnan(stats['mean'][1]))
+        self.assertFalse(np.isnan(stats['max'][0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
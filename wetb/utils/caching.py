@@ -9,11 +9,16 @@ from __future__ import division
 from __future__ import absolute_import
 from future import standard_library
 import sys
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 import os
 standard_library.install_aliases()
 import inspect
 import numpy as np
+import functools
+import hashlib
+import pickle
+import threading
+import weakref
 def set_cache_property(obj, name, get_func, set_func=None):
     """Create a cached property
 
@@ -93,25 +98,161 @@ def cache_function(f):
         raise AttributeError("Functions decorated with cache_function are not allowed to take a parameter called 'reload'")
     return wrap
 
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "currsize", "bytes", "maxsize", "max_bytes"])
+
+
+def _nbytes(obj):
+    """Approximate memory usage of obj in bytes"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes + sys.getsizeof(np.empty(0))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum([_nbytes(v) for v in obj])
+    elif isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum([_nbytes(k) + _nbytes(v) for k, v in obj.items()])
+    elif hasattr(obj, 'memory_usage'):
+        # pandas Series and DataFrame
+        return int(np.sum(obj.memory_usage(deep=True)))
+    return sys.getsizeof(obj)
+
+
+class _LRUCache(object):
+    """Thread-safe dict with least recently used eviction by number of items and size in bytes"""
+
+    def __init__(self, maxsize, max_bytes=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.items = OrderedDict()  # key: (value, nbytes)
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        """Return (True, value) if key is in cache otherwise (False, None)"""
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return True, self.items[key][0]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        nbytes = _nbytes(value) if self.max_bytes is not None else 0
+        with self.lock:
+            if key in self.items:
+                self.bytes -= self.items.pop(key)[1]
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                return  # too large to be cached
+            self.items[key] = (value, nbytes)
+            self.bytes += nbytes
+            while len(self.items) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                self.bytes -= self.items.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def info(self):
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, len(self.items), self.bytes,
+                             self.maxsize, self.max_bytes)
+
+
 class cache_method():
-    def __init__(self, N):
+    """Least recently used cache decorator for methods with arguments
+
+    Arguments (including numpy arrays, lists, tuples and dicts) are identified by a hash of their values.
+    The cache is thread-safe.
+
+    Parameters
+    ----------
+    N : int
+        Maximum number of cached results (per instance or in total if shared is True)
+    max_bytes : int or None, optional
+        Maximum size of cached results in bytes (per instance or in total if shared is True).
+        If None (default), the size is not limited
+    shared : bool, optional
+        If False (default), each instance has its own cache
+        If True, one cache is shared by all instances (note that the cache keeps a reference
+        to the instances of the cached results)
+
+    Examples
+    --------
+    >>> class Example(object):
+    >>>    @cache_method(10, max_bytes=100 * 1024**2)
+    >>>    def slow_function(self, x):
+    >>>        # calculate slow result
+    >>>        return x
+    >>>
+    >>> e = Example()
+    >>> e.slow_function(np.arange(10)) # Call, store and return result
+    >>> e.slow_function(np.arange(10)) # Return stored result
+    >>> e.slow_function.cache_info(e) # CacheInfo(hits=1, misses=1, evictions=0, currsize=1, bytes=..., maxsize=10, max_bytes=104857600)
+    >>> e.slow_function.cache_clear(e)
+    """
+
+    def __init__(self, N, max_bytes=None, shared=False):
         self.N = N
-        
-        
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.caches = weakref.WeakSet()
+        self.lock = threading.Lock()
+        if shared:
+            self.shared_cache = _LRUCache(N, max_bytes)
+            self.caches.add(self.shared_cache)
+
+    def get_cache(self, caller_obj, name):
+        if self.shared:
+            return self.shared_cache
+        attr = '%s_cache' % name
+        with self.lock:
+            if attr not in caller_obj.__dict__:
+                cache = _LRUCache(self.N, self.max_bytes)
+                setattr(caller_obj, attr, cache)
+                self.caches.add(cache)
+            return caller_obj.__dict__[attr]
+
+    def cache_info(self, caller_obj=None):
+        """Statistics of the cache of caller_obj or, if None, the sum of all existing caches"""
+        if caller_obj is not None and not self.shared:
+            return self.get_cache(caller_obj, self.name).info()
+        info_lst = [cache.info() for cache in list(self.caches)]
+        maxsize, max_bytes = self.N, self.max_bytes
+        return CacheInfo(*([sum([getattr(info, k) for info in info_lst]) for k in CacheInfo._fields[:5]] +
+                           [maxsize, max_bytes]))
+
+    def cache_clear(self, caller_obj=None):
+        """Clear the cache of caller_obj or, if None, all caches"""
+        if caller_obj is not None and not self.shared:
+            self.get_cache(caller_obj, self.name).clear()
+        else:
+            for cache in list(self.caches):
+                cache.clear()
+
     def __call__(self, f):
-        def wrapped(caller_obj, *args):
-            name = "_" + f.__name__
-            arg_id = ";".join([str(a) for a in args])
-            if not hasattr(caller_obj,'%s_cache_dict'%name):
-                setattr(caller_obj,'%s_cache_dict'%name, OrderedDict())
-            cache_dict = getattr(caller_obj,'%s_cache_dict'%name)
-            if arg_id not in cache_dict: 
-                cache_dict[arg_id] = f(caller_obj, *args)
-                if len(cache_dict)>self.N:
-                    cache_dict.popitem(last=False)
-            return cache_dict[arg_id]
+        self.name = "_" + f.__name__
+
+        @functools.wraps(f)
+        def wrapped(caller_obj, *args, **kwargs):
+            cache = self.get_cache(caller_obj, self.name)
+            h = hashlib.sha1()
+            _update_hash(h, (args, kwargs))
+            key = h.digest()
+            if self.shared:
+                key = (id(caller_obj), key)
+            found, res = cache.get(key)
+            if not found:
+                res = f(caller_obj, *args, **kwargs)
+                # keep reference to caller_obj to prevent reuse of its id
+                cache.put(key, (caller_obj, res) if self.shared else res)
+                return res
+            return res[1] if self.shared else res
+        wrapped.cache_info = self.cache_info
+        wrapped.cache_clear = self.cache_clear
         return wrapped
-    
+
+
 def cache_npsave(f):
     def wrap(filename,*args,**kwargs):
         np_filename = os.path.splitext(filename)[0] + ".npy"
@@ -153,4 +294,210 @@ def cache_npsavez(f):
 
 
 def cache_npsavez_compressed(f):
-    return _get_npsavez_wrap(f, True)
\ No newline at end of file
+    return _get_npsavez_wrap(f, True)
+
+
+# Settings of cache_persistent. Can be changed at runtime, e.g. caching.persistent_cache_dir = "c:/tmp/wetb_cache"
+persistent_cache_dir = os.environ.get('WETB_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.wetb_cache'))
+persistent_cache_max_size = 2 * 1024 ** 3  # bytes
+
+
+def _file_signature(filename, key='mtime'):
+    """Signature of file: 'mtime' -> absolute path, size and modification time, 'content' -> sha1 of content"""
+    stat = os.stat(filename)
+    if key == 'content':
+        sig_key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+        if sig_key not in _file_content_hashes:
+            h = hashlib.sha1()
+            with open(filename, 'rb') as fid:
+                for chunk in iter(lambda: fid.read(2 ** 20), b''):
+                    h.update(chunk)
+            _file_content_hashes[sig_key] = h.hexdigest()
+        return "content:%s" % _file_content_hashes[sig_key]
+    elif key == 'mtime':
+        return "mtime:%s;%d;%d" % (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+    raise ValueError("key must be 'mtime' or 'content', not '%s'" % key)
+_file_content_hashes = {}
+
+
+def _update_hash(h, obj, file_key=None, _path=None):
+    """Update the hashlib object, h, with a stable representation of obj
+
+    Strings that are paths of existing files are replaced by the file signature
+    if file_key ('mtime' or 'content') is given. Memory-mapped arrays are hashed by
+    their file signature and position in the file, i.e. the file is not read.
+    References back to an object that is being hashed (cycles) are hashed by the depth of the object"""
+    def update(*strings):
+        for s in strings:
+            h.update(s.encode('utf-8') if isinstance(s, str) else s)
+    atomic = obj is None or isinstance(obj, (str, bytes, bool, int, float, complex, np.generic))
+    if not atomic:
+        if _path is None:
+            _path = {}  # id: depth of the objects on the current path
+        if id(obj) in _path:
+            update('cycle', str(_path[id(obj)]), ';')
+            return
+        _path[id(obj)] = len(_path)
+    if isinstance(obj, str):
+        if file_key is not None and len(obj) < 4096 and os.path.isfile(obj):
+            update('file', _file_signature(obj, file_key), ';')
+        else:
+            update('str', str(len(obj)), ':', obj)
+    elif isinstance(obj, bytes):
+        update('bytes', str(len(obj)), ':', obj)
+    elif obj is None or isinstance(obj, (bool, int, float, complex, np.generic)):
+        update(type(obj).__name__, repr(obj), ';')
+    elif isinstance(obj, np.memmap) and getattr(obj, '_mmap', None) is not None and obj.filename:
+        # position of (a view of) the memory-mapped file relative to the start of the mapped array
+        root = obj
+        while isinstance(root.base, np.ndarray):
+            root = root.base
+        start = obj.offset + obj.__array_interface__['data'][0] - root.__array_interface__['data'][0]
+        update('memmap', str(obj.dtype), str(obj.shape), str(obj.strides), str(start), ';',
+               _file_signature(obj.filename, file_key or 'mtime'), ';')
+    elif isinstance(obj, np.ndarray):
+        update('ndarray', str(obj.dtype), str(obj.shape))
+        if obj.dtype.hasobject:
+            _update_hash(h, obj.tolist(), file_key, _path)
+        else:
+            update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        update(type(obj).__name__, '(')
+        for v in obj:
+            _update_hash(h, v, file_key, _path)
+        update(')')
+    elif isinstance(obj, dict):
+        update(type(obj).__name__, '{')
+        for k, v in sorted(obj.items(), key=lambda kv: repr(kv[0])):
+            _update_hash(h, k, file_key, _path)
+            _update_hash(h, v, file_key, _path)
+        update('}')
+    elif isinstance(obj, (set, frozenset)):
+        update(type(obj).__name__, '{')
+        for v in sorted(obj, key=repr):
+            _update_hash(h, v, file_key, _path)
+        update('}')
+    elif hasattr(obj, 'index') and hasattr(obj, 'values') and isinstance(getattr(obj, 'values'), np.ndarray):
+        # pandas Series and DataFrame
+        update(type(obj).__name__)
+        _update_hash(h, [np.asarray(obj.index), np.asarray(getattr(obj, 'columns', [])), obj.values], file_key, _path)
+    elif inspect.isfunction(obj) or inspect.ismethod(obj) or inspect.isclass(obj) or inspect.isbuiltin(obj):
+        update(getattr(obj, '__module__', None) or '', '.', getattr(obj, '__qualname__', obj.__name__))
+        if inspect.ismethod(obj):
+            _update_hash(h, obj.__self__, file_key, _path)
+    elif hasattr(obj, '__dict__'):
+        update(type(obj).__module__, '.', type(obj).__qualname__)
+        _update_hash(h, vars(obj), file_key, _path)
+    else:
+        update(type(obj).__name__, repr(obj))
+    if not atomic:
+        del _path[id(obj)]
+
+
+def cache_persistent(f=None, cache_dir=None, max_size=None, key='mtime'):
+    """Persistent cache decorator
+
+    The result is pickled into a file in the cache directory. The file name is a hash of
+    the function name, the arguments, the wetb version and the signature of the files
+    given as arguments (string arguments that are paths of existing files), i.e. the cached
+    result is not used if the file has changed. Other objects are hashed via their attributes.
+    The cache directory is limited to max_size bytes. When exceeded the least recently
+    used results are deleted.
+
+    Parameters
+    ----------
+    f : function
+        Function to cache
+    cache_dir : str, optional
+        Cache directory. Default is caching.persistent_cache_dir, i.e. the environment variable
+        WETB_CACHE_DIR or ~/.wetb_cache
+    max_size : int, optional
+        Maximum size of the cache directory in bytes. Default is caching.persistent_cache_max_size (2GB)
+    key : {'mtime','content'}
+        - 'mtime': Files are identified by path, size and modification time
+        - 'content': Files are identified by a sha1 hash of their content, i.e. the cached results
+        are reused for copies of the file
+
+    Examples
+    --------
+    >>> @cache_persistent
+    >>> def load_data(filename):
+    >>>     return np.loadtxt(filename)
+    >>>
+    >>> load = cache_persistent(gtsdf.load, key='content')
+    >>> eq_load = cache_persistent(fatigue.eq_load)
+    >>> # Both files are arguments, i.e. changes in the .sel and .dat file are detected.
+    >>> # Note, methods that modify their instance, e.g. ReadHawc2.ReadAll, should not be cached directly,
+    >>> # as the instance (including the modified attributes) is part of the key
+    >>> @cache_persistent
+    >>> def read_hawc2(sel_file, dat_file):
+    >>>     return Hawc2io.ReadHawc2(os.path.splitext(sel_file)[0]).ReadAll()
+    >>> read_hawc2.cache_clear() # Remove all cached results of the function
+    """
+    if f is None:
+        return lambda f: cache_persistent(f, cache_dir, max_size, key)
+    if key not in ('mtime', 'content'):
+        raise ValueError("key must be 'mtime' or 'content', not '%s'" % key)
+    name = "%s.%s" % (f.__module__, getattr(f, '__qualname__', f.__name__))
+    prefix = "".join([c if c.isalnum() or c in "._" else "_" for c in name])
+
+    def get_cache_dir():
+        return cache_dir or persistent_cache_dir
+
+    @functools.wraps(f)
+    def wrap(*args, **kwargs):
+        from wetb import __version__
+        h = hashlib.sha1()
+        _update_hash(h, (name, __version__, args, kwargs), key)
+        filename = os.path.join(get_cache_dir(), "%s_%s.pkl" % (prefix, h.hexdigest()))
+        if os.path.isfile(filename):
+            try:
+                with open(filename, 'rb') as fid:
+                    res = pickle.load(fid)
+                os.utime(filename, None)  # modification time is used as last access time
+                return res
+            except Exception:
+                pass
+        res = f(*args, **kwargs)
+        _save_persistent_cache(filename, res, max_size or persistent_cache_max_size)
+        return res
+    wrap.cache_clear = lambda: clear_persistent_cache(get_cache_dir(), prefix + "_")
+    return wrap
+
+
+def _save_persistent_cache(filename, res, max_size):
+    cache_dir = os.path.dirname(filename)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+    try:
+        with open(tmp_filename, 'wb') as fid:
+            pickle.dump(res, fid, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, filename)
+    except Exception:
+        # result cannot be pickled or cache directory not writable
+        if os.path.isfile(tmp_filename):
+            os.remove(tmp_filename)
+        return
+    # Delete least recently used files
+    files = sorted([entry.stat().st_mtime, entry.stat().st_size, entry.path] for entry in os.scandir(cache_dir)
+                   if entry.name.endswith('.pkl'))
+    size = sum([s for _, s, _ in files])
+    for _, s, path in files:
+        if size <= max_size or path == filename:
+            break
+        try:
+            os.remove(path)
+            size -= s
+        except OSError:
+            pass
+
+
+def clear_persistent_cache(cache_dir=None, prefix=""):
+    """Delete the results of cache_persistent in cache_dir (default is caching.persistent_cache_dir)
+    whose file names start with prefix"""
+    cache_dir = cache_dir or persistent_cache_dir
+    if os.path.isdir(cache_dir):
+        for entry in os.scandir(cache_dir):
+            if entry.name.startswith(prefix) and entry.name.endswith('.pkl'):
+                os.remove(entry.path)
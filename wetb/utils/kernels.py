@@ -0,0 +1,172 @@
+'''
+Registry of the computational kernels that exists in a compiled (cython) and a pure python version
+
+The kernels are written in "pure python mode" and compiled by setup.py (see the .pyx files).
+get_kernel returns a kernel function from the preferred available backend:
+
+- 'compiled': the cython extension module build by setup.py
+- 'numba': the pure python implementation jit-compiled by numba (if numba is installed)
+- 'python': the pure python implementation (slow)
+
+The preferred order can be changed by set_backend or the environment variable
+WETB_KERNEL_BACKEND, e.g. WETB_KERNEL_BACKEND=python
+
+Examples
+--------
+>>> peak_trough = get_kernel('peak_trough', 'peak_trough')
+>>> kernel_backends()
+{'peak_trough': 'compiled', 'pair_range': 'compiled', 'rainflowcount_astm': 'compiled', 'cy_filters': 'compiled'}
+
+Run "python -m wetb.utils.kernels" to print the active backends
+'''
+import importlib
+import importlib.machinery
+import importlib.util
+import os
+import warnings
+
+backends = ['compiled', 'numba', 'python']
+
+# kernel name: module name
+kernel_modules = {'peak_trough': 'wetb.fatigue_tools.rainflowcounting.peak_trough',
+                  'pair_range': 'wetb.fatigue_tools.rainflowcounting.pair_range',
+                  'rainflowcount_astm': 'wetb.fatigue_tools.rainflowcounting.rainflowcount_astm',
+                  'cy_filters': 'wetb.signal.filters.cy_filters'}
+
+_backend_order = None
+_modules = {}  # kernel name: (backend, module)
+_functions = {}  # (kernel name, function name): function
+_warned = set()
+
+
+def set_backend(backend=None):
+    """Set preferred kernel backend
+
+    Parameters
+    ----------
+    backend : {'compiled', 'numba', 'python'}, list or None
+        Preferred backend or list of backends in preferred order.
+        If the preferred backend is not available, the next backend in backends is used.
+        If None, the environment variable WETB_KERNEL_BACKEND or the default order is used
+    """
+    global _backend_order
+    if backend is None:
+        backend = os.environ.get('WETB_KERNEL_BACKEND') or backends
+    if isinstance(backend, str):
+        backend = [b.strip() for b in backend.split(",")]
+    for b in backend:
+        if b not in backends:
+            raise ValueError("Unknown kernel backend, '%s'. Valid backends are: %s" % (b, ", ".join(backends)))
+    # always fall back on the remaining backends
+    _backend_order = list(backend) + [b for b in backends if b not in backend]
+    _modules.clear()
+    _functions.clear()
+
+
+def _load_python_module(module_name):
+    """Load the pure python implementation (also if the compiled module exists)"""
+    package_name, name = module_name.rsplit(".", 1)
+    package = importlib.import_module(package_name)
+    filename = os.path.join(os.path.dirname(package.__file__), name + ".py")
+    spec = importlib.util.spec_from_file_location(module_name + "_py", filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _load_compiled_module(module_name):
+    """Return the compiled extension module or None if it does not exist"""
+    module = importlib.import_module(module_name)
+    if any([module.__file__.endswith(suffix) for suffix in importlib.machinery.EXTENSION_SUFFIXES]):
+        return module
+
+
+class _NumbaKernel(object):
+    """numba jit-compiled function that falls back on the python function if compilation fails"""
+
+    def __init__(self, kernel, func):
+        import numba
+        self.kernel = kernel
+        self.func = func
+        self.jit_func = numba.njit(cache=True)(func)
+
+    def __call__(self, *args):
+        if self.jit_func is not None:
+            try:
+                return self.jit_func(*args)
+            except Exception as e:
+                import numba.core.errors
+                if not isinstance(e, numba.core.errors.NumbaError):
+                    raise
+                warnings.warn("numba compilation of %s.%s failed. The python implementation is used" %
+                              (self.kernel, self.func.__name__), RuntimeWarning)
+                self.jit_func = None
+        return self.func(*args)
+
+
+def _load_kernel(kernel):
+    if kernel not in kernel_modules:
+        raise ValueError("Unknown kernel, '%s'. Valid kernels are: %s" % (kernel, ", ".join(kernel_modules)))
+    if _backend_order is None:
+        set_backend()
+    module_name = kernel_modules[kernel]
+    for backend in _backend_order:
+        if backend == 'compiled':
+            module = _load_compiled_module(module_name)
+            if module is not None:
+                return backend, module
+        elif backend == 'numba':
+            try:
+                import numba  # @UnusedImport
+            except ImportError:
+                continue
+            return backend, _load_python_module(module_name)
+        else:
+            if 'compiled' in _backend_order[:_backend_order.index('python')] and kernel not in _warned:
+                _warned.add(kernel)
+                warnings.warn("The compiled version of '%s' is not available (i.e. slow pure python implementation is used). "
+                              "Reinstall wetb with cython and a C-compiler available" % module_name, RuntimeWarning)
+            return backend, _load_python_module(module_name)
+
+
+def get_kernel(kernel, function_name):
+    """Return function from the preferred available backend
+
+    Parameters
+    ----------
+    kernel : str
+        Kernel name, i.e. key of kernel_modules, e.g. 'peak_trough'
+    function_name : str
+        Name of function in kernel module, e.g. 'peak_trough'
+
+    Returns
+    -------
+    function : callable
+    """
+    key = (kernel, function_name)
+    if key not in _functions:
+        if kernel not in _modules:
+            _modules[kernel] = _load_kernel(kernel)
+        backend, module = _modules[kernel]
+        func = getattr(module, function_name)
+        if backend == 'numba':
+            func = _NumbaKernel(kernel, func)
+        _functions[key] = func
+    return _functions[key]
+
+
+def kernel_backend(kernel):
+    """Return the active backend ('compiled', 'numba' or 'python') of kernel"""
+    if kernel not in _modules:
+        _modules[kernel] = _load_kernel(kernel)
+    return _modules[kernel][0]
+
+
+def kernel_backends():
+    """Return dict with the active backend of all kernels"""
+    return {kernel: kernel_backend(kernel) for kernel in kernel_modules}
+
+
+if __name__ == '__main__':
+    for kernel, backend in kernel_backends().items():
+        print("%-20s %s" % (kernel, backend))
@@ -18,7 +18,14 @@ import numpy as np
 
 from wetb.utils.timing import get_time
 from wetb.utils.caching import cache_function, set_cache_property, cache_method,\
-    cache_npsavez, cache_npsave, cache_npsavez_compressed
+    cache_npsavez, cache_npsave, cache_npsavez_compressed, cache_persistent,\
+    clear_persistent_cache
+import hashlib
+import shutil
+import tempfile
+from unittest import mock
+
+from wetb.utils import caching
 
 tfp = os.path.dirname(__file__) + "/test_files/"
 class Example(object):
@@ -56,6 +63,21 @@ class Example(object):
         time.sleep(1)
         return x*2
 
+class ArrayExample(object):
+    def __init__(self):
+        self.calls = 0
+
+    @cache_method(3, max_bytes=3000)
+    def scale(self, x, factor=1):
+        self.calls += 1
+        return x * factor
+
+    @cache_method(2, shared=True)
+    def shared(self, x):
+        self.calls += 1
+        return x
+
+
 @cache_npsave
 def open_csv(filename):
     return np.loadtxt(filename)
@@ -114,6 +136,46 @@ class TestCacheProperty(unittest.TestCase):
         self.assertEqual(e.test_cache_method1(5), 5)
         self.assertAlmostEqual(get_time(e.test_cache_method1)(5)[1], 0, places=1)
          
+    def test_cache_method_arrays(self):
+        e = ArrayExample()
+        x = np.arange(10.)
+        np.testing.assert_array_equal(e.scale(x), x)
+        np.testing.assert_array_equal(e.scale(x.copy()), x)
+        np.testing.assert_array_equal(e.scale(x, factor=2), x * 2)
+        np.testing.assert_array_equal(e.scale(x.astype(int)), x)
+        self.assertEqual(e.calls, 3)
+        info = e.scale.cache_info(e)
+        self.assertEqual((info.hits, info.misses, info.evictions, info.currsize), (1, 3, 0, 3))
+        e.scale(np.arange(340.))  # 2720 bytes, evicts all other results
+        info = e.scale.cache_info(e)
+        self.assertEqual((info.evictions, info.currsize), (3, 1))
+        self.assertLessEqual(info.bytes, 3000)
+        e.scale(np.arange(1000.))  # too large to be cached
+        self.assertEqual(e.scale.cache_info(e).currsize, 1)
+        e2 = ArrayExample()
+        e2.scale(x)
+        self.assertEqual(e.scale.cache_info(e).misses, 5)
+        self.assertEqual(e2.scale.cache_info(e2).misses, 1)
+        e.scale.cache_clear(e)
+        self.assertEqual(e.scale.cache_info(e).currsize, 0)
+
+    def test_cache_method_shared_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+        e1, e2 = ArrayExample(), ArrayExample()
+        e1.shared.cache_clear()
+        self.assertEqual(e1.shared(1), 1)
+        self.assertEqual(e2.shared(1), 1)
+        self.assertEqual(e1.shared(1), 1)
+        self.assertEqual((e1.calls, e2.calls), (1, 1))
+        e1.shared(2)  # evicts e2.shared(1) (max 2 results in total)
+        self.assertEqual(e1.shared.cache_info().evictions, 1)
+        with ThreadPoolExecutor(8) as executor:
+            res = list(executor.map(lambda i: e1.scale(np.array([i % 4])), range(200)))
+        self.assertEqual([r[0] for r in res], [i % 4 for i in range(200)])
+        info = e1.scale.cache_info(e1)
+        self.assertEqual(info.hits + info.misses, 200)
+        self.assertEqual(info.currsize, 3)
+
     def test_cache_property(self):
         e = Example()
         t = time.time()
@@ -162,7 +224,108 @@ class TestCacheProperty(unittest.TestCase):
         B = func(tfp + "test.csv")
         np.testing.assert_array_equal(A,B)
         os.remove(npfilename)
-                
+
+
+    def test_cache_persistent(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            calls = []
+
+            @cache_persistent(cache_dir=cache_dir)
+            def load(filename, scale=1):
+                calls.append(filename)
+                return np.loadtxt(filename) * scale
+            fn = os.path.join(cache_dir, "test.csv")
+            shutil.copy(tfp + "test.csv", fn)
+            A = load(fn)
+            np.testing.assert_array_equal(load(fn), A)
+            self.assertEqual(len(calls), 1)
+            np.testing.assert_array_equal(load(fn, scale=2), A * 2)
+            self.assertEqual(len(calls), 2)
+
+            # changed file
+            np.savetxt(fn, A + 1)
+            os.utime(fn, (0, 0))
+            np.testing.assert_array_equal(load(fn), A + 1)
+            self.assertEqual(len(calls), 3)
+
+            load.cache_clear()
+            load(fn)
+            self.assertEqual(len(calls), 4)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_cache_persistent_content_lru(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            calls = []
+
+            @cache_persistent(cache_dir=cache_dir, key='content', max_size=2500)
+            def mean(x, filename=None):
+                calls.append(x)
+                return np.zeros(100) + np.mean(x)
+            fn1, fn2 = os.path.join(cache_dir, "a.csv"), os.path.join(cache_dir, "b.csv")
+            shutil.copy(tfp + "test.csv", fn1)
+            mean(np.arange(10), fn1)
+            shutil.copy(tfp + "test.csv", fn2)
+            mean(np.arange(10), fn2)  # same content
+            self.assertEqual(len(calls), 1)
+            mean(np.arange(11))
+            mean(np.arange(10), fn1)  # mark as recently used
+            mean(np.arange(12))  # evicts result of np.arange(11)
+            self.assertEqual(len([f for f in os.listdir(cache_dir) if f.endswith(".pkl")]), 2)
+            mean(np.arange(10), fn2)
+            self.assertEqual(len(calls), 3)
+            mean(np.arange(11))
+            self.assertEqual(len(calls), 4)
+            clear_persistent_cache(cache_dir)
+            self.assertEqual([f for f in os.listdir(cache_dir) if f.endswith(".pkl")], [])
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_update_hash_cycles(self):
+        def key(obj):
+            h = hashlib.sha1()
+            caching._update_hash(h, obj)
+            return h.hexdigest()
+        a, b = [1], [1]
+        a.append(a)
+        b.append(b)
+        self.assertEqual(key(a), key(b))
+        self.assertNotEqual(key(a), key([1, [1]]))
+        e1, e2 = Example(), Example()
+        e1.me, e2.me = e1, e2
+        e1.x = e2.x = np.arange(3)
+        self.assertEqual(key(e1), key(e2))
+        e2.x = np.arange(4)
+        self.assertNotEqual(key(e1), key(e2))
+        # shared (not cyclic) objects are hashed by value
+        x = [1, 2]
+        self.assertEqual(key([x, x]), key([x, [1, 2]]))
+
+    def test_update_hash_memmap(self):
+        def key(obj):
+            h = hashlib.sha1()
+            caching._update_hash(h, obj)
+            return h.hexdigest()
+        tmp = tempfile.mkdtemp()
+        try:
+            fn = os.path.join(tmp, 'data.bin')
+            np.arange(100, dtype=np.float64).tofile(fn)
+            m = np.memmap(fn, dtype=np.float64, mode='r')
+            with mock.patch.object(caching.np, 'ascontiguousarray', side_effect=AssertionError("content read")):
+                k = key(m)
+                self.assertEqual(k, key(np.memmap(fn, dtype=np.float64, mode='r')))
+                self.assertNotEqual(key(m[10:20]), key(m[20:30]))
+                self.assertEqual(key(m[10:20]), key(np.memmap(fn, dtype=np.float64, mode='r', offset=80, shape=(10,))))
+                self.assertNotEqual(key(m[::2]), key(m[:50]))
+            del m
+            np.arange(100, dtype=np.float64).tofile(fn)
+            os.utime(fn, (0, 0))
+            self.assertNotEqual(key(np.memmap(fn, dtype=np.float64, mode='r')), k)
+        finally:
+            shutil.rmtree(tmp)
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
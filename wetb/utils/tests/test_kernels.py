@@ -0,0 +1,50 @@
+import unittest
+import warnings
+
+import numpy as np
+from wetb.utils import kernels
+from wetb.utils.kernels import get_kernel, kernel_backends, set_backend
+
+
+class TestKernels(unittest.TestCase):
+
+    def tearDown(self):
+        set_backend()
+
+    def test_kernel_backends(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            backends = kernel_backends()
+        self.assertEqual(sorted(backends), sorted(kernels.kernel_modules))
+        for backend in backends.values():
+            self.assertIn(backend, kernels.backends)
+
+    def test_python_backend(self):
+        set_backend('python')
+        self.assertEqual(set(kernel_backends().values()), {'python'})
+        peak_trough = get_kernel('peak_trough', 'peak_trough')
+        self.assertTrue(peak_trough.__module__.endswith("_py"))
+        np.testing.assert_array_equal(peak_trough(np.array([0, 10, 2, 8, 0, 10]), 5), [0, 10, 2, 8, 0, 10])
+        find_extremes = get_kernel('rainflowcount_astm', 'find_extremes')
+        np.testing.assert_array_equal(find_extremes(np.array([0., 1, 2, 1, 0, 3])), [0, 2, 0, 3])
+
+    def test_compiled_equals_python(self):
+        signal = np.cumsum(np.random.RandomState(0).randn(1000))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            find_extremes = get_kernel('rainflowcount_astm', 'find_extremes')
+            rainflowcount = get_kernel('rainflowcount_astm', 'rainflowcount')
+        res = np.array(rainflowcount(find_extremes(signal)))
+        set_backend('python')
+        ref = np.array(get_kernel('rainflowcount_astm', 'rainflowcount')(
+            get_kernel('rainflowcount_astm', 'find_extremes')(signal)))
+        np.testing.assert_array_almost_equal(res, ref)
+
+    def test_invalid(self):
+        self.assertRaisesRegex(ValueError, "Unknown kernel backend", set_backend, 'fortran')
+        self.assertRaisesRegex(ValueError, "Unknown kernel", get_kernel, 'fft', 'fft')
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
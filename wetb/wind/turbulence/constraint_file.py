@@ -1,3 +1,4 @@
+import itertools
 import numpy as np
 import os
 from wetb.hawc2.htc_file import HTCFile
@@ -41,14 +42,18 @@ class ConstraintFile(object):
         
         parameters
         ----------
-        glpos : (float or array_like, float or array_like, float or array_like)
+        glpos : (float or array_like, float or array_like, float or array_like) or list of these
             global position(s), (x,y,z) of measurement point point(s)\n
             x: horizontal left seen in direction of mean wind, y: direction of mean wind, z: vertical down\n
-        tuvw: array_like (shape: no_obs x (1+no_components))
+            For multiple masts/beams, a list with the global position(s) of each mast
+        tuvw: array_like (shape: no_obs x (1+no_components)) or list of these
             time and u[, v[, w]] components of wind at measurement point\n
             v and w components are optional\n
+            For multiple masts/beams, a list (or 3D array with shape no_masts x no_obs x (1+no_components))
+            with one array for each mast. The number of components must be the same for all masts.
+            The result equals adding the constraints of the masts one by one
         subtract_mean : boolean, optional
-            if True, default, the mean values are subtracted from u,v,w
+            if True, default, the mean values are subtracted from u,v,w (of each mast)
         fail_outside_box : boolean, optional
             if True, default, an error is raised if any positions are outside the box\n
             if False, mann coordinates modulo N is used
@@ -60,18 +65,26 @@ class ConstraintFile(object):
         dx, dy, dz = self.dxyz
         center_x, center_y, center_z = self.center_gl_xyz
 
-        time, u, v, w = (list(tuvw.T) + [None, None])[:4]
-        x, y, z = glpos
-        mxs = np.round((time * self.box_transport_speed + (center_y - y)) / dx).astype(np.int)
-        if not np.array(y).shape==mxs.shape:
-            y = np.zeros_like(mxs)+y
-        if not np.array(x).shape==mxs.shape:
-            x = np.zeros_like(mxs)+x 
-        if not np.array(z).shape==mxs.shape:
-            z = np.zeros_like(mxs)+z
+        if isinstance(tuvw, (list, tuple)) or np.ndim(tuvw) == 3:
+            if len(glpos) != len(tuvw):
+                raise ValueError("Number of positions (%d) does not match number of masts (%d)" % (len(glpos), len(tuvw)))
+            tuvw_lst, glpos_lst = [np.asarray(a) for a in tuvw], glpos
+        else:
+            tuvw_lst, glpos_lst = [np.asarray(tuvw)], [glpos]
+        if len(set([a.shape[1] for a in tuvw_lst])) > 1:
+            raise ValueError("Number of components must be the same for all masts")
+        no_obs = [len(a) for a in tuvw_lst]
+        mast = np.repeat(np.arange(len(no_obs)), no_obs)
+        time, u, v, w = (list(np.concatenate(tuvw_lst).T) + [None, None])[:4]
+        x, y, z = [np.concatenate([np.broadcast_to(np.asarray(pos[i]), (n,)) for pos, n in zip(glpos_lst, no_obs)])
+                   for i in range(3)]
+        if len(time) == 0:
+            return
+
+        mxs = np.round((time * self.box_transport_speed + (center_y - y)) / dx).astype(int)
         x_err = y-(-(mxs*dx-time*self.box_transport_speed-center_y))
-        mys = np.round(((ny - 1) / 2. + (-x+center_x) / dy)).astype(np.int)
-        mzs = np.round(((nz - 1) / 2. + (center_z - z) / dz)).astype(np.int)
+        mys = np.round(((ny - 1) / 2. + (-x+center_x) / dy)).astype(int)
+        mzs = np.round(((nz - 1) / 2. + (center_z - z) / dz)).astype(int)
 
         y_err = x-(-((mys-(ny-1)/2)*dy-center_x))
         z_err = z-(-(mzs-(nz-1)/2)*dz+center_z)
@@ -88,28 +101,34 @@ class ConstraintFile(object):
             mxs%=nx
             mys%=ny
             mzs%=nz
-        mann_pos = ["%06d%02d%02d"%(mx,my,mz) for mx,my,mz in zip(mxs,mys,mzs)]
-        i = 0
-        N = len(mann_pos)
+        # consecutive observations of the same mast that map to the same mann grid point forms a group
+        mann_index = (mxs * ny + mys) * nz + mzs
+        first = np.r_[0, np.flatnonzero((np.diff(mann_index) != 0) | (np.diff(mast) != 0)) + 1]
+        group_size = np.diff(np.r_[first, len(mxs)])
+        group = np.repeat(np.arange(len(first)), group_size)
         uvw_lst = [uvw for uvw in [u,v,w] if uvw is not None]
         if subtract_mean:
-            uvw_lst = [uvw - uvw.mean() for uvw in uvw_lst]
-        while i<N:
-            for j in range(i+1,N+1):
-                if j==N or mann_pos[i]!=mann_pos[j]:
-                    break
-            for comp, wsp in zip(['u', 'v', 'w'], uvw_lst):
-                if nearest:
-                    value = wsp[i:j][np.argmin(pos_err[i:j])]
-                else: #mean
-                    value = wsp[i:j].mean()
-                self.constraints[comp].append((mxs[i] + 1, mys[i] + 1, mzs[i] + 1, value))
-            i=j
-                    
+            uvw_lst = [uvw - np.repeat([x.mean() for x in np.split(uvw, np.cumsum(no_obs)[:-1])], no_obs)
+                       for uvw in uvw_lst]
+        if nearest:
+            # index of the observation closest to the grid point in each group (first if equal)
+            i = np.lexsort((pos_err, group))[first]
+            values = [uvw[i] for uvw in uvw_lst]
+        else: #mean
+            values = [np.add.reduceat(uvw, first) / group_size for uvw in uvw_lst]
+        mxyz = [(ms[first] + 1).tolist() for ms in [mxs, mys, mzs]]
+        for comp, value in zip(['u', 'v', 'w'], values):
+            self.constraints[comp].extend(zip(*mxyz, value.tolist()))
 
     def __str__(self):
-        return "\n".join(["%d;%d;%d;%s;%.10f" % (mx, my, mz, comp, value) for comp in ['u', 'v', 'w']
-                          for mx, my, mz, value in self.constraints[comp]])
+        lines = []
+        for comp in ['u', 'v', 'w']:
+            constraints = self.constraints[comp]
+            if constraints:
+                # format all constraints of a component in one operation
+                fmt = "\n".join(["%d;%d;%d;" + comp + ";%.10f"] * len(constraints))
+                lines.append(fmt % tuple(itertools.chain.from_iterable(constraints)))
+        return "\n".join(lines)
 
     def save(self, path, name, folder="./constraints/"):
         path = os.path.join(path, folder)
@@ -123,7 +142,7 @@ class ConstraintFile(object):
         u,v,w = [(np.zeros_like(time)+ np.nan)]*3
         for uvw, constr in zip([u,v,w], [np.array(self.constraints[uvw]) for uvw in 'uvw']):
             if constr.shape[0]>0:
-                uvw[constr[:,0].astype(np.int)-1] =constr[:,3] 
+                uvw[constr[:,0].astype(int)-1] =constr[:,3] 
         return time, np.array([u,v,w]).T
     
 
@@ -0,0 +1,331 @@
+'''
+FFT based generator of Mann turbulence boxes (Mann, J. 1998, Wind field simulation, Prob. Engng. Mech. 13(4))
+
+The boxes are written in the HAWC2/Mann binary format (little endian float32, x, y, z order), i.e.
+they can be loaded by mann_turbulence.load and wetb.hawc2.turbulence_file.TurbulenceFile.
+Note that the random numbers differ from the Mann generator of HAWC2, i.e. a seed does not
+give the same box as HAWC2
+'''
+import os
+import tempfile
+
+import numpy as np
+from scipy import fft as sp_fft
+from scipy.special import hyp2f1
+
+
+def _beta_table(n=2001):
+    """Tabulated beta(kL)/Gamma = (kL)^(-2/3) / sqrt(2F1(1/3, 17/6; 4/3; -(kL)^-2))"""
+    kL = np.logspace(-6, 6, n)
+    return np.log(kL), np.log(kL**(-2 / 3) / np.sqrt(hyp2f1(1 / 3, 17 / 6, 4 / 3, -kL**-2)))
+
+
+_log_kL, _log_beta = _beta_table()
+
+
+def eddy_lifetime(kL, Gamma):
+    """Non-dimensional eddy lifetime (shear parameter), beta, of the Mann model
+
+    Parameters
+    ----------
+    kL : array_like
+        Magnitude of wave number vector times length scale
+    Gamma : float
+        Anisotropy parameter, Gamma, of the Mann model
+
+    Returns
+    -------
+    beta : ndarray
+    """
+    kL = np.asarray(kL, dtype=np.float64)
+    beta = np.zeros_like(kL)
+    m = kL > 0
+    # log-log interpolation of the tabulated hypergeometric function (relative error < 1e-6)
+    beta[m] = Gamma * np.exp(np.interp(np.log(kL[m]), _log_kL, _log_beta))
+    return beta
+
+
+def sheared_tensor_amplitude(k1, k2, k3, ae23, L, Gamma):
+    """Amplitude matrix, C, of the sheared Mann spectral tensor, Phi = C C^T
+
+    Parameters
+    ----------
+    k1, k2, k3 : array_like
+        Wave numbers (broadcastable)
+    ae23 : float
+        Alpha epsilon^(2/3) of the Mann model
+    L : float
+        Length scale of the Mann model
+    Gamma : float
+        Anisotropy parameter of the Mann model
+
+    Returns
+    -------
+    C : ndarray, shape (3, 3) + broadcast shape of k1, k2, k3
+    """
+    k1, k2, k3 = np.broadcast_arrays(*[np.asarray(k, dtype=np.float64) for k in (k1, k2, k3)])
+    k_sq = k1**2 + k2**2 + k3**2
+    beta = eddy_lifetime(np.sqrt(k_sq) * L, Gamma)
+    k30 = k3 + beta * k1
+    k0_sq = k1**2 + k2**2 + k30**2
+    kh_sq = k1**2 + k2**2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        C1 = beta * k1**2 * (k0_sq - 2 * k30**2 + beta * k1 * k30) / (k_sq * kh_sq)
+        C2 = k2 * k0_sq / kh_sq**1.5 * np.arctan2(beta * k1 * np.sqrt(kh_sq), k0_sq - k30 * k1 * beta)
+        zeta1 = np.where(k1 != 0, C1 - k2 / k1 * C2, 0)
+        zeta2 = np.where(k1 != 0, k2 / k1 * C1 + C2, 0)
+        k0L = np.sqrt(k0_sq) * L
+        E = 1.453 * ae23 * L**(5 / 3) * k0L**4 / (1 + k0L**2)**(17 / 6)
+        A = np.where(k0_sq > 0, np.sqrt(E / (4 * np.pi * k0_sq**2)), 0)
+        k0_sq_k_sq = np.where(k_sq > 0, k0_sq / k_sq, 0)
+    zero = np.zeros_like(k1)
+    C = np.array([[k2 * zeta1, k30 - k1 * zeta1, -k2],
+                  [k2 * zeta2 - k30, -k1 * zeta2, k1],
+                  [k0_sq_k_sq * k2, -k0_sq_k_sq * k1, zero]])
+    return C * A
+
+
+def _cholesky3(a):
+    """Lower Cholesky factors of stacked, symmetric, positive semidefinite 3x3 matrices, shape (3, 3, ...)"""
+    def div(x, y):
+        return np.divide(x, y, out=np.zeros_like(x), where=y > 0)
+    l = np.zeros_like(a)
+    l[0, 0] = np.sqrt(np.maximum(a[0, 0], 0))
+    l[1, 0] = div(a[1, 0], l[0, 0])
+    l[2, 0] = div(a[2, 0], l[0, 0])
+    l[1, 1] = np.sqrt(np.maximum(a[1, 1] - l[1, 0]**2, 0))
+    l[2, 1] = div(a[2, 1] - l[2, 0] * l[1, 0], l[1, 1])
+    l[2, 2] = np.sqrt(np.maximum(a[2, 2] - l[2, 0]**2 - l[2, 1]**2, 0))
+    return l
+
+
+def _cell_average(k1, k2, k3, dk, ae23, L, Gamma, n):
+    """Spectral tensor, Phi=C C^T, averaged over n x n points of the wave number cells in the k2 and k3 directions"""
+    offsets = (np.arange(n) + .5) / n - .5
+    phi = 0
+    for o2 in offsets:
+        for o3 in offsets:
+            C = sheared_tensor_amplitude(k1, k2 + o2 * dk[1], k3 + o3 * dk[2], ae23, L, Gamma)
+            phi = phi + np.einsum('ik...,jk...->ij...', C, C)
+    return phi / n**2
+
+
+def _amplitude(k1, k2, k3, dk, ae23, L, Gamma, high_frq_compensation):
+    """Lower Cholesky factor of the (cell integrated) spectral tensor, shape (3, 3, len(k1), len(k2), len(k3))"""
+    k1 = np.asarray(k1)[:, np.newaxis, np.newaxis]
+    if not high_frq_compensation:
+        return _cholesky3(_cell_average(k1, k2[:, np.newaxis], k3, dk, ae23, L, Gamma, 1))
+    # The spectral tensor is integrated over the wave number cells in the (short) y and z directions,
+    # i.e. the variance of the grid is not over/underestimated where the tensor varies much within a cell.
+    # This is mainly the cells closest to the k1 axis, where the sheared tensor is very peaked
+    # and a much finer integration is needed
+    phi = _cell_average(k1, k2[:, np.newaxis], k3, dk, ae23, L, Gamma, 3)
+    j2 = np.flatnonzero(np.abs(k2) < 1.5 * dk[1])
+    j3 = np.flatnonzero(np.abs(k3) < 1.5 * dk[2])
+    phi[:, :, :, j2[:, np.newaxis], j3] = _cell_average(k1, k2[j2, np.newaxis], k3[j3], dk, ae23, L, Gamma, 32)
+    return _cholesky3(phi)
+
+
+def _buffer(shape, dtype, folder, name):
+    if folder is None:
+        return np.zeros(shape, dtype)
+    return np.memmap(os.path.join(folder, name), dtype=dtype, mode='w+', shape=shape)
+
+
+class MannTurbulenceGenerator(object):
+    """FFT based Mann turbulence box generator
+
+    The amplitudes of the Fourier coefficients only depends on the Mann parameters and the grid and are
+    calculated once (at the first call to generate) and reused for all seeds, i.e. generating many seeds
+    with the same generator only costs the random numbers and the FFTs
+
+    The Fourier coefficients are transformed to physical space by multi-threaded real FFTs in single
+    precision (complex64/float32 buffers). The inverse transform is done in two steps (first along x,
+    then y and z for chunks of x) such that the output and the spectral buffers can be memory mapped files,
+    i.e. large boxes, e.g. 8192x64x64, can be generated out-of-core.
+    The boxes are not scaled, i.e. the variance is determined by ae23 (as HAWC2 without std_scaling)
+
+    Parameters
+    ----------
+    ae23 : float
+        Alpha epsilon^(2/3) of the Mann model
+    L : float
+        Length scale of the Mann model
+    Gamma : float
+        Anisotropy parameter of the Mann model
+    no_grid_points : (nx, ny, nz)
+        Number of grid points
+    box_dimension : (Lx, Ly, Lz)
+        Box dimensions [m], i.e. the grid spacing is box_dimension / no_grid_points
+    high_frq_compensation : bool, optional
+        If True, default, the spectral tensor is integrated over the wave number cells in y and z.
+        If False, the tensor is evaluated at the grid wave numbers only, which misrepresents the
+        variance distribution of the components when the box width is not much larger than L
+    tmp_folder : str, optional
+        If given, the amplitudes (nx x 6 x ny x (nz//2+1) x 4 bytes) and the complex spectral buffers
+        (3 x nx x ny x (nz//2+1) x 8 bytes) are memory mapped temporary files in this folder instead of
+        in memory
+    workers : int, optional
+        Number of threads used by the FFTs, -1 (default) means all cpus
+    chunksize : int, optional
+        Number of x wave numbers (and x grid points) processed per block. If None, blocks of ~1e6
+        values are used
+
+    Examples
+    --------
+    >>> mtg = MannTurbulenceGenerator(.1, 29.4, 3.9, (8192, 32, 32), (16384, 186, 186))
+    >>> u, v, w = mtg.generate(1001)
+    >>> for seed in range(1001, 2001):
+    >>>     mtg.generate(seed, filenames="./turb/s%04d%%s.bin" % seed)
+    """
+
+    def __init__(self, ae23, L, Gamma, no_grid_points=(8192, 32, 32), box_dimension=(16384, 32, 32),
+                 high_frq_compensation=True, tmp_folder=None, workers=-1, chunksize=None):
+        self.ae23, self.L, self.Gamma = ae23, L, Gamma
+        self.no_grid_points = tuple([int(n) for n in no_grid_points])
+        self.box_dimension = tuple(box_dimension)
+        self.high_frq_compensation = high_frq_compensation
+        self.tmp_folder = tmp_folder
+        self.workers = workers
+        nx, ny, nz = self.no_grid_points
+        self.chunksize = chunksize or max(1, 2**20 // (ny * (nz // 2 + 1)))
+        self._amplitudes = None
+        self._tmp_dir = None
+
+    def __del__(self):
+        if self._tmp_dir is not None:
+            self._amplitudes = None
+            self._tmp_dir.cleanup()
+
+    def _temp_dir(self):
+        if self.tmp_folder is not None and self._tmp_dir is None:
+            self._tmp_dir = tempfile.TemporaryDirectory(dir=self.tmp_folder)
+        return self._tmp_dir and self._tmp_dir.name
+
+    def wave_numbers(self):
+        """Wave numbers, k1, k2 and k3 (half spectrum), of the Fourier coefficients"""
+        nx, ny, nz = self.no_grid_points
+        dxyz = np.asarray(self.box_dimension, dtype=np.float64) / self.no_grid_points
+        return (2 * np.pi * np.fft.fftfreq(nx, dxyz[0]),
+                2 * np.pi * np.fft.fftfreq(ny, dxyz[1]),
+                2 * np.pi * np.fft.rfftfreq(nz, dxyz[2]))
+
+    @property
+    def amplitudes(self):
+        """Lower triangle (00, 10, 11, 20, 21, 22) of the Cholesky factor of the discrete spectral tensor times
+        sqrt(dk1 dk2 dk3), shape (nx, 6, ny, nz//2+1), float32"""
+        if self._amplitudes is None:
+            nx, ny, nz = self.no_grid_points
+            k1, k2, k3 = self.wave_numbers()
+            dk = 2 * np.pi / np.asarray(self.box_dimension, dtype=np.float64)
+            # The k3=0 (and Nyquist) planes are made hermitian by the real inverse FFT which halves their variance
+            plane_scale = np.full(len(k3), np.sqrt(np.prod(dk)))
+            plane_scale[0] *= np.sqrt(2)
+            if nz % 2 == 0:
+                plane_scale[-1] *= np.sqrt(2)
+            amplitudes = _buffer((nx, 6, ny, len(k3)), np.float32, self._temp_dir(), 'amplitudes.bin')
+            tril = np.tril_indices(3)
+            for i in range(0, nx, self.chunksize):
+                l = _amplitude(k1[i:i + self.chunksize], k2, k3, dk, self.ae23, self.L, self.Gamma,
+                               self.high_frq_compensation) * plane_scale
+                amplitudes[i:i + self.chunksize] = np.moveaxis(l[tril], 0, 1)
+            amplitudes[0, :, 0, 0] = 0  # zero mean
+            self._amplitudes = amplitudes
+        return self._amplitudes
+
+    def generate(self, seed, filenames=None):
+        """Generate Mann turbulence box
+
+        Parameters
+        ----------
+        seed : int
+            Seed of the random generator
+        filenames : list or str, optional
+            If given, the boxes are written as memory mapped files (HAWC2 format) and memmaps are returned.\n
+            - if list: list of u,v,w filenames\n
+            - if str: filename pattern where u,v,w are replaced with '%s'
+
+        Returns
+        -------
+        u,v,w : list of ndarray or np.memmap
+            float32 arrays of shape (nx, ny*nz) as returned by mann_turbulence.load
+        """
+        nx, ny, nz = self.no_grid_points
+        nk3 = nz // 2 + 1
+        chunksize = self.chunksize
+        amplitudes = self.amplitudes
+        tmp_dir = self._temp_dir()
+        uvw_hat = [_buffer((nx, ny, nk3), np.complex64, tmp_dir, 'hat_%s.bin' % uvw) for uvw in 'uvw']
+        rng = np.random.default_rng(seed)
+        for i in range(0, nx, chunksize):
+            a = amplitudes[i:i + chunksize]
+            # noise drawn per x wave number, i.e. the box does not depend on chunksize
+            n = rng.standard_normal((len(a), 2, 3, ny, nk3), dtype=np.float32)
+            n = (n[:, 0] + 1j * n[:, 1]) * np.float32(np.sqrt(.5))
+            uvw_hat[0][i:i + chunksize] = a[:, 0] * n[:, 0]
+            uvw_hat[1][i:i + chunksize] = a[:, 1] * n[:, 0] + a[:, 2] * n[:, 1]
+            uvw_hat[2][i:i + chunksize] = a[:, 3] * n[:, 0] + a[:, 4] * n[:, 1] + a[:, 5] * n[:, 2]
+
+        if filenames is None:
+            uvw_lst = [np.empty((nx, ny, nz), np.float32) for _ in range(3)]
+        else:
+            if isinstance(filenames, str):
+                filenames = [filenames % uvw for uvw in 'uvw']
+            uvw_lst = [np.memmap(f, dtype='<f', mode='w+', shape=(nx, ny, nz)) for f in filenames]
+
+        ny_chunk = max(1, chunksize * ny // nx)
+        for hat, out in zip(uvw_hat, uvw_lst):
+            for j in range(0, ny, ny_chunk):
+                hat[:, j:j + ny_chunk] = sp_fft.ifft(hat[:, j:j + ny_chunk], axis=0, norm='forward',
+                                                     overwrite_x=True, workers=self.workers)
+            for i in range(0, nx, chunksize):
+                out[i:i + chunksize] = sp_fft.irfft2(hat[i:i + chunksize], s=(ny, nz), axes=(1, 2),
+                                                     norm='forward', workers=self.workers)
+            if isinstance(out, np.memmap):
+                out.flush()
+        del uvw_hat
+        return [uvw.reshape(nx, ny * nz) for uvw in uvw_lst]
+
+
+def generate(ae23, L, Gamma, seed, no_grid_points=(8192, 32, 32), box_dimension=(16384, 32, 32),
+             high_frq_compensation=True, filenames=None, tmp_folder=None, workers=-1):
+    """Generate Mann turbulence box
+
+    Use MannTurbulenceGenerator to generate several seeds with the same parameters
+    (the amplitudes of the Fourier coefficients are only calculated once)
+
+    Parameters
+    ----------
+    ae23 : float
+        Alpha epsilon^(2/3) of the Mann model
+    L : float
+        Length scale of the Mann model
+    Gamma : float
+        Anisotropy parameter of the Mann model
+    seed : int
+        Seed of the random generator
+    no_grid_points : (nx, ny, nz)
+        Number of grid points
+    box_dimension : (Lx, Ly, Lz)
+        Box dimensions [m]
+    high_frq_compensation : bool, optional
+        If True, default, the spectral tensor is integrated over the wave number cells in y and z
+    filenames : list or str, optional
+        If given, the boxes are written as memory mapped files (HAWC2 format), see MannTurbulenceGenerator.generate
+    tmp_folder : str, optional
+        If given, the temporary buffers are memory mapped files in this folder
+    workers : int, optional
+        Number of threads used by the FFTs, -1 (default) means all cpus
+
+    Returns
+    -------
+    u,v,w : list of ndarray or np.memmap
+        float32 arrays of shape (nx, ny*nz) as returned by mann_turbulence.load
+
+    Examples
+    --------
+    >>> u, v, w = generate(.1, 29.4, 3.9, 1001, (8192, 32, 32), (16384, 186, 186))
+    >>> generate(.1, 29.4, 3.9, 1001, (8192, 64, 64), (16384, 186, 186), filenames="./turb/s1001%s.bin")
+    """
+    return MannTurbulenceGenerator(ae23, L, Gamma, no_grid_points, box_dimension, high_frq_compensation,
+                                   tmp_folder, workers).generate(seed, filenames)
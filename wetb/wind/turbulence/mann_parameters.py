@@ -5,6 +5,7 @@ Created on 03/06/2014
 '''
 
 
+import multiprocessing
 import os
 
 from scipy.interpolate import RectBivariateSpline
@@ -22,6 +23,7 @@ RBS1 = RectBivariateSpline(xp, yp, sp1)
 RBS2 = RectBivariateSpline(xp, yp, sp2)
 RBS3 = RectBivariateSpline(xp, yp, sp3)
 RBS4 = RectBivariateSpline(xp, yp, sp4)
+RBS = [RBS1, RBS2, RBS3, RBS4]
 
 
 # def mean_spectra(fs, u_ref_lst, u_lst, v_lst=None, w_lst=None):
@@ -41,13 +43,16 @@ RBS4 = RectBivariateSpline(xp, yp, sp4)
 def get_mann_model_spectra(ae, L, G, k1):
     """Mann model spectra
 
+    ae, L, G and k1 are broadcasted, i.e. the spectra of many parameter sets can be evaluated
+    in one call, e.g. ae, L, G of shape (n, 1) and k1 of shape (m,) or (n, m) gives spectra of shape (n, m)
+
     Parameters
     ----------
-    ae : int or float
+    ae : int, float or array_like
         Alpha epsilon^(2/3) of Mann model
-    L : int or float
+    L : int, float or array_like
         Length scale of Mann model
-    G : int or float
+    G : int, float or array_like
         Gamma of Mann model
     k1 : array_like
         Desired wave numbers
@@ -63,14 +68,15 @@ def get_mann_model_spectra(ae, L, G, k1):
     uw : array_like
         The u,w cross spectrum of the wave numbers, k1
     """
+    return tuple(_mann_model_spectra(ae, L, G, k1))
+
+
+def _mann_model_spectra(ae, L, G, k1, components=(0, 1, 2, 3)):
+    """Mann model spectra of components (0: uu, 1: vv, 2: ww, 3: uw), i.e. only the required splines are evaluated"""
     xq = np.log10(L * k1)
     yq = (np.zeros_like(xq) + G)
     f = L ** (5 / 3) * ae
-    uu = f * RBS1.ev(yq, xq)
-    vv = f * RBS2.ev(yq, xq)
-    ww = f * RBS3.ev(yq, xq)
-    uw = f * RBS4.ev(yq, xq)
-    return uu, vv, ww, uw
+    return [f * RBS[c].ev(yq, xq) for c in components]
 
 
 def _local_error(x, k1, uu, vv, ww=None, uw=None):
@@ -149,6 +155,218 @@ def fit_mann_model_spectra(k1, uu, vv=None, ww=None, uw=None, log10_bin_size=.2,
     return x
 
 
+def _logbin_columns(k1, spectra, log10_bin_size=.2, min_bin_count=2):
+    """Log-bin each column of k1 and the spectra independently (as logbin_spectrum of each column)
+
+    All columns are binned in one pass (one bincount per spectrum)
+
+    Returns
+    -------
+    bk1 : ndarray, shape (no_columns, max_no_bins)
+        Binned wave numbers, padded with nan
+    bsp : ndarray, shape (len(spectra), no_columns, max_no_bins)
+        Binned spectra, padded with nan
+    """
+    k1 = np.asarray(k1, dtype=np.float64)
+    no_cols = k1.shape[1]
+    x = np.log(k1) / (np.log(10) * log10_bin_size)
+    low, high = np.floor(x.min(0)), np.ceil(x.max(0))
+    no_bins = np.maximum((high - low).astype(int), 1)
+    # index of bin in each column, the last bin includes the upper edge (as np.histogram)
+    idx = np.minimum(np.floor(x - low).astype(int), no_bins - 1) + np.r_[0, np.cumsum(no_bins)[:-1]]
+    idx = idx.ravel()
+    counts = np.bincount(idx, minlength=no_bins.sum())
+    mask = counts >= min_bin_count
+    col = np.repeat(np.arange(no_cols), no_bins)[mask]
+    no_kept = np.bincount(col, minlength=no_cols)
+    pos = np.arange(len(col)) - np.repeat(np.r_[0, np.cumsum(no_kept)[:-1]], no_kept)
+    out = np.full((len(spectra) + 1, no_cols, max(no_kept.max(), 1)), np.nan)
+    for i, xx in enumerate([k1] + list(spectra)):
+        out[i, col, pos] = np.bincount(idx, weights=np.asarray(xx, dtype=np.float64).ravel(),
+                                       minlength=len(counts))[mask] / counts[mask]
+    return out[0], out[1:]
+
+
+def _local_errors(x, k1, spectra, components=(0, 1, 2, 3)):
+    """Vectorized _local_error of candidates x, shape (n, 3), and binned spectra of shape (n, no_bins)
+
+    components are the indexes (in the output of get_mann_model_spectra) of the spectra
+    """
+    ae, L, G = [v[:, np.newaxis] for v in np.asarray(x).T]
+    val = np.full(len(x), 10.**99)
+    with np.errstate(invalid='ignore'):
+        log_k1L = np.log10(k1[:, :1] * L)
+        valid = ((ae >= 0) & (G >= 0) & (G <= 5) & (L > 0) & (log_k1L >= -3) & (log_k1L <= 3))[:, 0]
+    if valid.any():
+        bk1 = k1[valid]
+        nan = np.isnan(bk1)
+        # pad bins are evaluated at the first bin and get zero weight
+        bk1 = np.where(nan, bk1[:, :1], bk1)
+        model = _mann_model_spectra(ae[valid], L[valid], G[valid], bk1, components)
+        err = 0
+        for sp, msp in zip(spectra, model):
+            err = err + np.where(nan, 0, (bk1 * sp[valid] - bk1 * msp) ** 2).sum(1)
+        val[valid] = err
+    return val
+
+
+def _fmin_batch(func, x0, xtol=1e-4, ftol=1e-4, maxiter=None, maxfun=None):
+    """Minimize many independent problems simultaneously with the Nelder-Mead algorithm of scipy.optimize.fmin
+
+    All active problems take a step in each iteration and the function is evaluated for all problems in one call,
+    i.e. the python overhead is per iteration instead of per problem and function evaluation
+
+    Parameters
+    ----------
+    func : callable
+        func(x, rows) returns the function values, shape (n,), of the points x, shape (n, N), of problem rows
+    x0 : array_like, shape (no_problems, N)
+        Start points
+    xtol, ftol, maxiter, maxfun
+        see scipy.optimize.fmin. maxiter and maxfun defaults to 200 * N
+
+    Returns
+    -------
+    x : ndarray, shape (no_problems, N)
+    """
+    x0 = np.array(x0, dtype=np.float64)
+    P, N = x0.shape
+    maxiter = maxiter or N * 200
+    maxfun = maxfun or N * 200
+    rho, chi, psi, sigma = 1, 2, 0.5, 0.5
+    rows = np.arange(P)
+
+    sim = np.repeat(x0[:, np.newaxis], N + 1, 1)
+    for k in range(N):
+        sim[:, k + 1, k] = np.where(x0[:, k] != 0, (1 + 0.05) * x0[:, k], 0.00025)
+    fsim = func(sim.reshape(-1, N), np.repeat(rows, N + 1)).reshape(P, N + 1)
+    fcalls = np.full(P, N + 1)
+
+    def sort(sim, fsim):
+        ind = np.argsort(fsim, 1)
+        return np.take_along_axis(sim, ind[:, :, np.newaxis], 1), np.take_along_axis(fsim, ind, 1)
+    sim, fsim = sort(sim, fsim)
+
+    iterations = 1
+    active = np.ones(P, dtype=bool)
+    while iterations < maxiter:
+        active &= fcalls < maxfun
+        active &= ~((np.abs(sim[:, 1:] - sim[:, :1]).max((1, 2)) <= xtol) &
+                    (np.abs(fsim[:, :1] - fsim[:, 1:]).max(1) <= ftol))
+        a = np.flatnonzero(active)
+        if len(a) == 0:
+            break
+        s, fs = sim[a], fsim[a]
+        xbar = s[:, :-1].sum(1) / N
+        xr = (1 + rho) * xbar - rho * s[:, -1]
+        fxr = func(xr, a)
+        fcalls[a] += 1
+        x_new, f_new = xr.copy(), fxr.copy()
+        shrink = np.zeros(len(a), dtype=bool)
+
+        expand = fxr < fs[:, 0]
+        if expand.any():
+            xe = (1 + rho * chi) * xbar[expand] - rho * chi * s[expand, -1]
+            fxe = func(xe, a[expand])
+            fcalls[a[expand]] += 1
+            better = fxe < fxr[expand]
+            x_new[expand] = np.where(better[:, np.newaxis], xe, xr[expand])
+            f_new[expand] = np.where(better, fxe, fxr[expand])
+
+        contract = ~expand & ~(fxr < fs[:, -2])
+        outside = contract & (fxr < fs[:, -1])
+        if outside.any():
+            xc = (1 + psi * rho) * xbar[outside] - psi * rho * s[outside, -1]
+            fxc = func(xc, a[outside])
+            fcalls[a[outside]] += 1
+            x_new[outside], f_new[outside] = xc, fxc
+            shrink[outside] = ~(fxc <= fxr[outside])
+        inside = contract & ~(fxr < fs[:, -1])
+        if inside.any():
+            xcc = (1 - psi) * xbar[inside] + psi * s[inside, -1]
+            fxcc = func(xcc, a[inside])
+            fcalls[a[inside]] += 1
+            x_new[inside], f_new[inside] = xcc, fxcc
+            shrink[inside] = ~(fxcc < fs[inside, -1])
+
+        s[~shrink, -1] = x_new[~shrink]
+        fs[~shrink, -1] = f_new[~shrink]
+        if shrink.any():
+            s[shrink, 1:] = s[shrink, :1] + sigma * (s[shrink, 1:] - s[shrink, :1])
+            fs[shrink, 1:] = func(s[shrink, 1:].reshape(-1, N), np.repeat(a[shrink], N)).reshape(-1, N)
+            fcalls[a[shrink]] += N
+        iterations += 1
+        sim[a], fsim[a] = sort(s, fs)
+    return sim[:, 0]
+
+
+def _fit_mann_model_spectra_batch(args):
+    k1, spectra, components, log10_bin_size, min_bin_count, start_vals_for_optimisation = args
+    bk1, bsp = _logbin_columns(k1, spectra, log10_bin_size, min_bin_count)
+    x0 = np.repeat([start_vals_for_optimisation], k1.shape[1], 0)
+    return _fmin_batch(lambda x, rows: _local_errors(x, bk1[rows], bsp[:, rows], components), x0)
+
+
+def fit_mann_model_spectra_batch(k1, uu, vv=None, ww=None, uw=None, log10_bin_size=.2, min_bin_count=2,
+                                 start_vals_for_optimisation=(0.01, 50, 3.3), nr_cpus=1, chunksize=10000):
+    """Fit a mann model to each column of the spectra, e.g. one column per 10 min period
+
+    The result of each column is equivalent to fit_mann_model_spectra of the column, but the spectra
+    of all columns are log-binned in one pass and the optimizations (Nelder-Mead as fit_mann_model_spectra)
+    run simultaneously with the mann spectra evaluated for all columns in one call
+
+    Parameters
+    ----------
+    k1 : array_like, shape (n, no_columns)
+        Wave numbers
+    uu : array_like, shape (n, no_columns)
+        The u-autospectra of the wave numbers, k1
+    vv : array_like, optional
+        The v-autospectra of the wave numbers, k1
+    ww : array_like, optional
+        The w-autospectra of the wave numbers, k1
+    uw : array_like, optional
+        The u,w cross spectra of the wave numbers, k1
+    log10_bin_size : int or float, optional
+        Bin size (log 10, based)
+    min_bin_count : int, optional
+        Minimum number of values in a bin
+    start_vals_for_optimization : (ae, L, G), optional
+        Start values of the optimization of all columns
+    nr_cpus : int, optional
+        Number of processes, default is 1. If None, all cpus are used.
+    chunksize : int, optional
+        Number of columns fitted per batch (and process)
+
+    Returns
+    -------
+    x : ndarray, shape (no_columns, 3)
+        ae, L and G of each column
+
+    Examples
+    --------
+    >>> k1, uu, vv, ww, uw = spectra_from_time_series(sample_frq, Uvw_lst)  # one column per period
+    >>> ae, L, G = fit_mann_model_spectra_batch(k1, uu, vv, ww, uw, nr_cpus=None).T
+    """
+    if ww is not None and uw is None:
+        raise ValueError("uw must be specified when ww is specified")
+    # components (index in get_mann_model_spectra output) included in the error, see _local_error
+    components = [i for i, xx in zip(range(4), [uu, vv, ww, uw]) if xx is not None]
+    spectra = [np.asarray(xx, dtype=np.float64) for xx in [uu, vv, ww, uw] if xx is not None]
+    if spectra[0].ndim == 1:
+        spectra = [sp[:, np.newaxis] for sp in spectra]
+    k1 = np.asarray(k1, dtype=np.float64)
+    k1 = np.broadcast_to(k1.reshape(len(k1), -1), spectra[0].shape)  # 1D k1: same wave numbers for all columns
+    args = [(k1[:, i:i + chunksize], [sp[:, i:i + chunksize] for sp in spectra], components, log10_bin_size,
+             min_bin_count, start_vals_for_optimisation) for i in range(0, k1.shape[1], chunksize)]
+    if nr_cpus is None:
+        nr_cpus = multiprocessing.cpu_count()
+    if nr_cpus > 1 and len(args) > 1:
+        with multiprocessing.Pool(min(nr_cpus, len(args))) as pool:
+            return np.concatenate(list(pool.imap(_fit_mann_model_spectra_batch, args)))
+    return np.concatenate([_fit_mann_model_spectra_batch(arg) for arg in args])
+
+
 def residual(ae, L, G, k1, uu, vv=None, ww=None, uw=None, log10_bin_size=.2):
     """Fit a mann model to the spectra
 
@@ -3,13 +3,15 @@ Created on 20. jul. 2017
 
 @author: mmpe
 '''
+import os
+
 import numpy as np
 
 from wetb.wind.turbulence.spectra import spectra, spectra_from_time_series
 name_format = "mann_l%.1f_ae%.4f_g%.1f_h%d_%dx%dx%d_%.3fx%.2fx%.2f_s%04d%c.turb"
 
 
-def load(filename, N=(32, 32)):
+def load(filename, N=(32, 32), mmap=False):
     """Load mann turbulence box
 
     Parameters
@@ -18,6 +20,9 @@ def load(filename, N=(32, 32)):
         Filename of turbulence box
     N : tuple, (ny,nz) or (nx,ny,nz)
         Number of grid points
+    mmap : bool, optional
+        If True, a read-only memory mapped view of the file is returned instead of a copy in memory,
+        i.e. only the accessed parts of the box are read and boxes can be shared between processes
 
     Returns
     -------
@@ -27,7 +32,10 @@ def load(filename, N=(32, 32)):
     --------
     >>> u = load('turb_u.dat')
     """
-    data = np.fromfile(filename, np.dtype('<f'), -1)
+    if mmap:
+        data = np.memmap(filename, np.dtype('<f'), mode='r')
+    else:
+        data = np.fromfile(filename, np.dtype('<f'), -1)
     if len(N) == 2:
         ny, nz = N
         nx = len(data) / (ny * nz)
@@ -41,7 +49,7 @@ def load(filename, N=(32, 32)):
     return data.reshape(nx, ny * nz)
 
 
-def load_uvw(filenames, N=(1024, 32, 32)):
+def load_uvw(filenames, N=(1024, 32, 32), mmap=False):
     """Load u, v and w turbulence boxes
 
     Parameters
@@ -51,6 +59,8 @@ def load_uvw(filenames, N=(1024, 32, 32)):
         if str: filename pattern where u,v,w are replaced with '%s'
     N : tuple
         Number of grid point in the x, y and z direction
+    mmap : bool, optional
+        If True, read-only memory mapped views are returned, see load
 
     Returns
     -------
@@ -61,9 +71,9 @@ def load_uvw(filenames, N=(1024, 32, 32)):
     >>> u,v,w =load_uvw('turb_%s.dat')
     """
     if isinstance(filenames, str):
-        return [load(filenames % uvw, N) for uvw in 'uvw']
+        return [load(filenames % uvw, N, mmap) for uvw in 'uvw']
     else:
-        return [load(f, N) for f in filenames]
+        return [load(f, N, mmap) for f in filenames]
 
 
 def save(turb, filename):
@@ -73,8 +83,8 @@ def save(turb, filename):
 def parameters2name(no_grid_points, box_dimension, ae23, L, Gamma, high_frq_compensation, seed, folder="./turb/"):
 
     dxyz = tuple(np.array(box_dimension) / no_grid_points)
-    return ["./turb/" + name_format % ((L, ae23, Gamma, high_frq_compensation) +
-                                       no_grid_points + dxyz + (seed, uvw)) for uvw in ['u', 'v', 'w']]
+    return [os.path.join(folder, name_format % ((L, ae23, Gamma, high_frq_compensation) +
+                                                tuple(no_grid_points) + dxyz + (seed, uvw))) for uvw in ['u', 'v', 'w']]
 
 
 def fit_mann_parameters(spatial_resolution, u, v, w=None, plt=None):
@@ -113,6 +123,29 @@ def fit_mann_parameters(spatial_resolution, u, v, w=None, plt=None):
     return fit_mann_model_spectra(*spectra(spatial_resolution, u, v, w), plt=plt)
 
 
-def fit_mann_parameters_from_time_series(sample_frq, Uvw_lst, plt=None):
-    from wetb.wind.turbulence.mann_parameters import fit_mann_model_spectra
+def fit_mann_parameters_from_time_series(sample_frq, Uvw_lst, plt=None, batch=False, nr_cpus=1):
+    """Fit mann parameters, ae, L, G, to time series
+
+    Parameters
+    ----------
+    sample_frq : int or float
+        Sample frequency
+    Uvw_lst : array_like
+        list of U, v and w, [(U1,v1,w1),(U2,v2,w2)...], v and w are optional
+    plt : matplotlib.pyplot, optional
+        If given, the fit is plotted (not if batch is True)
+    batch : bool, optional
+        If False (default), one set of parameters is fitted to the mean spectra of all time series.\n
+        If True, the parameters are fitted to each time series (e.g. each 10 min period of a met mast)
+        in one batched call, see mann_parameters.fit_mann_model_spectra_batch
+    nr_cpus : int, optional
+        Number of processes used if batch is True. If None, all cpus are used
+
+    Returns
+    -------
+    ae, L, G : float or (if batch) array_like, shape (len(Uvw_lst), 3)
+    """
+    from wetb.wind.turbulence.mann_parameters import fit_mann_model_spectra, fit_mann_model_spectra_batch
+    if batch:
+        return fit_mann_model_spectra_batch(*spectra_from_time_series(sample_frq, Uvw_lst), nr_cpus=nr_cpus)
     return fit_mann_model_spectra(*spectra_from_time_series(sample_frq, Uvw_lst), plt=plt)
@@ -108,7 +108,7 @@ def spectra(spatial_resolution, u, v=None, w=None, detrend=True):
         if w is not None:
             assert np.abs(np.mean(w)) < 1
         assert isinstance(k, float)
-        k1_vec = np.linspace(0, k / 2, len(u) / 2)[1:]
+        k1_vec = np.linspace(0, k / 2, len(u) // 2)[1:]
     if detrend:
         u, v, w = detrend_wsp(u, v, w)
 
@@ -146,13 +146,218 @@ def spectra_from_time_series(sample_frq, Uvw_lst):
         assert np.abs(np.nanmean(v, 0)).max() < 1, "Max absolute mean of v is %f" % np.abs(np.nanmean(v, 0)).max()
     if w is not None:
         assert np.abs(np.nanmean(w, 0)).max() < 1
-    k1_vec = np.array([np.linspace(0, k_ / 2, U.shape[0] / 2)[1:] for k_ in k]).T
+    k1_vec = np.array([np.linspace(0, k_ / 2, U.shape[0] // 2)[1:] for k_ in k]).T
     u = U - np.nanmean(U, 0)
     u, v, w = detrend_wsp(u, v, w)
 
     return [k1_vec] + [spectrum(x1, x2, k=k) for x1, x2 in [(u, u), (v, v), (w, w), (w, u)]]
 
 
+class WelchSpectra(object):
+    """Streaming, segmented spectra estimator (Welch's method)
+
+    The time series are split into overlapping segments of nperseg observations. Each segment is
+    detrended, windowed and transformed by rfft and the uu, vv, ww auto spectra and the uw cross spectrum
+    are accumulated, i.e. the time series can be added block by block (e.g. from gtsdf files, see
+    welch_spectra_from_gtsdf) and only the current block and the accumulated spectra are kept in memory.
+    Observations that do not fill a segment are buffered until the next block is added.
+    Segments containing NaN are skipped (for the time series in question only), i.e. the spectra are
+    the mean of the segments without NaN.
+
+    The spectra are scaled like spectrum, i.e. for nperseg equal to the length of the time series,
+    noverlap=0, window='boxcar' and detrend=False, the spectra equals the output of spectra
+    (except the wave numbers, which are the exact rfft wave numbers)
+
+    Parameters
+    ----------
+    nperseg : int
+        Number of observations per segment. The lowest wave number is 2*pi*spatial_resolution/nperseg
+    spatial_resolution : int or float, optional
+        Distance between samples in meters (1/dx), see spectra. Added u,v and w are wind speed fluctuations
+    sample_frq : int or float, optional
+        Sample frequency of time series. Added u is the wind speed, U, and the wave numbers are computed
+        from the mean wind speed of all added observations (Taylor's frozen turbulence hypothesis),
+        see spectra_from_time_series. The running mean of U (the mean of the observations added so far)
+        is subtracted from the segments, i.e. also for detrend=False, the mean wind speed does not leak
+        into the lowest wave numbers. Either spatial_resolution or sample_frq must be specified
+    noverlap : int, optional
+        Number of observations overlapping between segments. Default is nperseg // 2
+    window : str, tuple or array_like, optional
+        Window, see scipy.signal.get_window, or array of length nperseg. Default is 'hann'
+    detrend : {'linear', 'constant', False}, optional
+        Detrending of each segment. Default is 'linear'
+    max_buffer_size : int, optional
+        Max number of values in the segment buffer of one rfft call
+
+    Examples
+    --------
+    >>> ws = WelchSpectra(1024, sample_frq=20)
+    >>> for time, data in gtsdf.iter_blocks('sonic.hdf5', columns=[0, 1, 2]):
+    >>>     ws.add(*data.T)
+    >>> k1, uu, vv, ww, uw = ws.spectra()
+    """
+
+    def __init__(self, nperseg, spatial_resolution=None, sample_frq=None, noverlap=None, window='hann',
+                 detrend='linear', max_buffer_size=2**22):
+        if (spatial_resolution is None) == (sample_frq is None):
+            raise ValueError("Either spatial_resolution or sample_frq must be specified")
+        if noverlap is None:
+            noverlap = nperseg // 2
+        if not 0 <= noverlap < nperseg:
+            raise ValueError("noverlap must be >=0 and less than nperseg")
+        if detrend not in ('linear', 'constant', False, None):
+            raise ValueError("detrend must be 'linear', 'constant' or False")
+        if isinstance(window, (str, tuple)):
+            from scipy.signal import get_window
+            window = get_window(window, nperseg)
+        self.window = np.asarray(window, dtype=np.float64)
+        if self.window.shape != (nperseg,):
+            raise ValueError("Length of window must be nperseg")
+        self.nperseg = nperseg
+        self.noverlap = noverlap
+        self.spatial_resolution = spatial_resolution
+        self.sample_frq = sample_frq
+        self.detrend = detrend
+        self.max_buffer_size = max_buffer_size
+        self.no_segments = 0
+        self._segment_counts = 0  # number of segments without NaN of each time series
+        self._components = None  # u,v,w present
+        self._buffer = None  # observations not yet used in a full segment, shape (no_components, no_columns, r)
+        self._sums = None  # accumulated uu, vv, ww, uw, shape (4, no_columns, no_wave_numbers)
+        self._U_sum = 0
+        self._U_count = 0
+
+    def add(self, u, v=None, w=None):
+        """Add block of observations
+
+        Parameters
+        ----------
+        u, v, w : array_like
+            Next block of the u(or U), v and w time series (v and w are optional)\n
+            - if shape is (r,): One time series with *r* observations\n
+            - if shape is (r,c): *c* different time series with *r* observations\n
+            Shape and the presence of v and w must be the same for all blocks
+        """
+        components = tuple([x is not None for x in [u, v, w]])
+        if self._components is None:
+            self._components = components
+            self._ndim = np.ndim(u)
+        elif components != self._components:
+            raise ValueError("The same components must be added in all blocks")
+        x = np.array([np.asarray(x, dtype=np.float64) for x in [u, v, w] if x is not None])
+        if x.ndim == 2:
+            x = x[:, :, np.newaxis]
+        if self._buffer is not None and x.shape[2] != self._buffer.shape[1]:
+            raise ValueError("Number of time series must be the same for all blocks")
+        x = x.transpose(0, 2, 1)  # (no_components, no_columns, r)
+        U_mean = None
+        if self.sample_frq is not None:
+            finite = np.isfinite(x[0])
+            self._U_sum = self._U_sum + np.where(finite, x[0], 0).sum(1)
+            self._U_count = self._U_count + finite.sum(1)
+            U_mean = np.divide(self._U_sum, self._U_count, out=np.zeros_like(self._U_sum),
+                               where=self._U_count > 0)
+        if self._buffer is not None and self._buffer.shape[2]:
+            x = np.concatenate([self._buffer, x], 2)
+
+        n, step = self.nperseg, self.nperseg - self.noverlap
+        no_segments = max((x.shape[2] - n) // step + 1, 0)
+        chunk = max(self.max_buffer_size // (x.shape[0] * x.shape[1] * n), 1)
+        for i in range(0, no_segments, chunk):
+            starts = np.arange(i, min(i + chunk, no_segments)) * step
+            self._add_segments(x[:, :, starts[:, np.newaxis] + np.arange(n)], U_mean)
+        self.no_segments += no_segments
+        self._buffer = x[:, :, no_segments * step:].copy()
+
+    def _add_segments(self, segments, U_mean=None):
+        # segments: (no_components, no_columns, no_segments, nperseg)
+        if U_mean is not None:
+            segments = segments.copy()
+            segments[0] -= U_mean[:, np.newaxis, np.newaxis]
+        # segments with NaN are set to zero, i.e. they do not contribute to the sums
+        valid = np.isfinite(segments).all(-1).all(0)  # (no_columns, no_segments)
+        segments = np.where(valid[..., np.newaxis], segments, 0)
+        self._segment_counts = self._segment_counts + valid.sum(1)
+        if self.detrend == 'linear':
+            t = np.arange(self.nperseg) - (self.nperseg - 1) / 2
+            segments = segments - segments.mean(-1, keepdims=True) - \
+                t * (segments @ t / (t @ t))[..., np.newaxis]
+        elif self.detrend == 'constant':
+            segments = segments - segments.mean(-1, keepdims=True)
+        segments = segments * self.window
+        fft = np.fft.rfft(segments, axis=-1)[..., 1:(self.nperseg + 1) // 2]
+        fft = dict(zip([c for c, present in zip('uvw', self._components) if present], fft))
+        if self._sums is None:
+            self._sums = np.zeros((4,) + fft['u'].shape[:1] + fft['u'].shape[2:])
+        for i, (x1, x2) in enumerate([('u', 'u'), ('v', 'v'), ('w', 'w'), ('w', 'u')]):
+            if x1 in fft and x2 in fft:
+                self._sums[i] += np.real(fft[x1] * np.conj(fft[x2])).sum(1)
+
+    def spectra(self):
+        """Return the wave number, the uu, vv, ww autospectra and the uw cross spectra of the added observations
+
+        Returns
+        -------
+        k1, uu, vv, ww, uw : array_like or None
+            See spectra. vv, ww and uw are None if v and w are not added.
+            For two dimensional input, the spectra of each time series are returned as columns
+        """
+        if self.no_segments == 0:
+            raise ValueError("Number of added observations is less than nperseg")
+        if np.any(self._segment_counts == 0):
+            raise ValueError("All segments of a time series contain NaN")
+        if self.sample_frq is not None:
+            k = 2 * np.pi * self.sample_frq / (self._U_sum / self._U_count)
+        else:
+            k = np.full(self._sums.shape[1], 2 * np.pi * self.spatial_resolution)
+        k1 = k[:, np.newaxis] * np.arange(1, (self.nperseg + 1) // 2) / self.nperseg
+        sp = self._sums / (k[:, np.newaxis] * (self.window**2).sum() * self._segment_counts[:, np.newaxis])
+        if self._ndim == 1:
+            k1, sp = k1[0], sp[:, 0]
+        else:
+            k1, sp = k1.T, sp.transpose(0, 2, 1)
+        present = {'u': True, 'v': self._components[1], 'w': self._components[2]}
+        return [k1] + [(sp[i] if present[x1] and present[x2] else None)
+                       for i, (x1, x2) in enumerate([('u', 'u'), ('v', 'v'), ('w', 'w'), ('w', 'u')])]
+
+
+def welch_spectra_from_gtsdf(filename, columns, nperseg, sample_frq=None, time_range=None, **kwargs):
+    """Return the wave number, the uu, vv, ww autospectra and the uw cross spectra of time series in a gtsdf file
+
+    The file is read block by block, i.e. the file does not need to fit into memory.
+    The time series of all blocks are assumed to be consecutive
+
+    Parameters
+    ----------
+    filename : str
+        gtsdf filename
+    columns : list
+        Indexes or names of the U[, v[, w]] columns
+    nperseg : int
+        Number of observations per segment, see WelchSpectra
+    sample_frq : int or float, optional
+        Sample frequency. If None, default, it is computed from the time of the first block
+    time_range : (start, stop), optional
+        See gtsdf.load
+    kwargs : optional
+        noverlap, window, detrend and max_buffer_size, see WelchSpectra
+
+    Returns
+    -------
+    k1, uu, vv, ww, uw : array_like or None
+        See WelchSpectra.spectra
+    """
+    from wetb import gtsdf
+    ws = None
+    for time, data in gtsdf.iter_blocks(filename, columns=columns, time_range=time_range):
+        if ws is None:
+            if sample_frq is None:
+                sample_frq = 1 / np.median(np.diff(time))
+            ws = WelchSpectra(nperseg, sample_frq=sample_frq, **kwargs)
+        ws.add(*data.T)
+    if ws is None:
+        raise ValueError("No data in %s" % filename)
+    return ws.spectra()
 
 
 def bin_spectrum(x, y, bin_size, min_bin_count=2):
@@ -89,6 +89,36 @@ class TestConstraintFile(unittest.TestCase):
         self.assertRaisesRegex(ValueError, "At time, t=0, global position \(0,2,-85\)", constraint_file.add_constraints, (0, 2, -85), tu)
         self.assertRaisesRegex(ValueError, "At time, t=2, global position \(0,-13,-85\)", constraint_file.add_constraints, (0, -13, -85), tu)
 
+    def test_nearest_mean(self):
+        # time 0, .1, .2 maps to grid point 1 (dx=2m) and 0.3,0.4 to grid point 2
+        tu = np.array([[0, .1, .2, .3, .4], [1, 2, 3, 4, 5]]).T
+        for nearest, ref in [(True, [1, 5]), (False, [2, 4.5])]:
+            constraint_file = ConstraintFile(center_gl_xyz=(0, 0, 0), box_transport_speed=5, no_grid_points=(16, 8, 8), box_size=(30, 70, 70))
+            constraint_file.add_constraints([0, 0, 0], tu, subtract_mean=False, nearest=nearest)
+            np.testing.assert_array_equal(constraint_file.constraints['u'], [(1, 5, 5, ref[0]), (2, 5, 5, ref[1])])
+
+    def test_multiple_masts(self):
+        time = np.arange(0, 2, .25)
+        rng = np.random.RandomState(0)
+        glpos_lst = [(0, 0, -85), (-10, -4, -95), (0, np.linspace(0, -3, 8), -90)]
+        tuvw_lst = [np.array([time, 8 + rng.randn(8), rng.randn(8), rng.randn(8)]).T for _ in glpos_lst]
+        for nearest in [True, False]:
+            ref = ConstraintFile(center_gl_xyz=(-5, 0, -90), box_transport_speed=10, no_grid_points=(16, 8, 8), box_size=(30, 70, 70))
+            for glpos, tuvw in zip(glpos_lst, tuvw_lst):
+                ref.add_constraints(glpos, tuvw, nearest=nearest)
+            constraint_file = ConstraintFile(center_gl_xyz=(-5, 0, -90), box_transport_speed=10, no_grid_points=(16, 8, 8), box_size=(30, 70, 70))
+            constraint_file.add_constraints(glpos_lst, tuvw_lst, nearest=nearest)
+            self.assertEqual(str(constraint_file), str(ref))
+        # 3D array (no_masts x no_obs x (1+no_components))
+        ref = ConstraintFile(center_gl_xyz=(-5, 0, -90), box_transport_speed=10, no_grid_points=(16, 8, 8), box_size=(30, 70, 70))
+        ref.add_constraints(glpos_lst[0], tuvw_lst[0])
+        ref.add_constraints(glpos_lst[1], tuvw_lst[1])
+        constraint_file = ConstraintFile(center_gl_xyz=(-5, 0, -90), box_transport_speed=10, no_grid_points=(16, 8, 8), box_size=(30, 70, 70))
+        constraint_file.add_constraints(glpos_lst[:2], np.array(tuvw_lst[:2]))
+        self.assertEqual(str(constraint_file), str(ref))
+        self.assertRaises(ValueError, constraint_file.add_constraints, glpos_lst[:2], tuvw_lst)
+        self.assertRaises(ValueError, constraint_file.add_constraints, glpos_lst[:2], [tuvw_lst[0], tuvw_lst[1][:, :2]])
+
     def test_hawc2_cmd(self):
         constraint_file = ConstraintFile(center_gl_xyz=(0, 0, -85), box_transport_speed=10, no_grid_points=(16, 8, 8), box_size=(30, 70, 70))
         mann = constraint_file.hawc2_mann_section("test",1)
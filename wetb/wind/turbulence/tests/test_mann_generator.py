@@ -0,0 +1,71 @@
+"""
+Tests for the FFT based Mann turbulence generator
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from wetb.wind.turbulence import mann_turbulence
+from wetb.wind.turbulence.mann_generator import MannTurbulenceGenerator, generate, sheared_tensor_amplitude
+from wetb.wind.turbulence.mann_parameters import get_mann_model_spectra
+from tests import npt
+
+
+class TestMannGenerator(unittest.TestCase):
+
+    def test_sheared_tensor(self):
+        # the 1D spectra of the tensor equals the model spectra (without the 1.453 factor)
+        ae, L, G = .1, 30, 3.9
+        k1 = np.array([.3, 1, 3]) / L
+        for i, kk in enumerate(k1):
+            k = np.sinh(np.linspace(-12, 12, 801)) / L * max(kk * L, .1)
+            dk = np.gradient(k)
+            C = sheared_tensor_amplitude(kk, k[:, np.newaxis], k[np.newaxis], ae, L, G)
+            phi = np.einsum('ik...,jk...->ij...', C, C) * dk[:, np.newaxis] * dk[np.newaxis]
+            F = [phi[i, j].sum() for i, j in [(0, 0), (1, 1), (2, 2), (0, 2)]]
+            npt.assert_allclose(F, np.array(get_mann_model_spectra(ae, L, G, kk)) * 1.453, rtol=0.01)
+
+    def test_generate(self):
+        N, B = (256, 8, 8), (512, 64, 64)
+        u, v, w = generate(.1, 30, 3.9, 1, N, B)
+        self.assertEqual(u.shape, (256, 64))
+        self.assertEqual(u.dtype, np.float32)
+        self.assertAlmostEqual(u.mean(), 0, 5)
+
+        # same box for the same seed independent of chunksize, different box for other seed
+        mtg = MannTurbulenceGenerator(.1, 30, 3.9, N, B, chunksize=7)
+        for a, b in zip(mtg.generate(1), [u, v, w]):
+            npt.assert_array_equal(a, b)
+        self.assertFalse(np.allclose(mtg.generate(2)[0], u))
+
+    def test_variance(self):
+        mtg = MannTurbulenceGenerator(.1, 30, 3.9, (128, 16, 16), (1024, 128, 128))
+        var = np.mean([[uvw.var() for uvw in mtg.generate(seed)] for seed in range(20)], 0)
+        # variance of the Mann model, i.e. the model spectra (times 1.453, see test_sheared_tensor)
+        # integrated over the k1 resolved by the box (the mean, k1=0, is removed)
+        k1 = mtg.wave_numbers()[0]
+        uu, vv, ww = get_mann_model_spectra(.1, 30, 3.9, np.abs(k1[1:]))[:3]
+        var_ref = np.array([uu.sum(), vv.sum(), ww.sum()]) * k1[1] * 1.453
+        # the box misses a bit of variance at the high k2 and k3 wave numbers
+        npt.assert_allclose(var, var_ref, rtol=.15)
+        npt.assert_allclose(var / var[0], var_ref / var_ref[0], rtol=.1)
+        # sheared turbulence: sigma_u > sigma_v > sigma_w
+        self.assertTrue(var[0] > var[1] > var[2])
+
+    def test_memmap(self):
+        N, B = (64, 8, 8), (128, 32, 32)
+        u_ref = generate(.1, 30, 3.9, 1, N, B)[0]
+        with tempfile.TemporaryDirectory() as folder:
+            filenames = os.path.join(folder, "s0001%s.turb")
+            mtg = MannTurbulenceGenerator(.1, 30, 3.9, N, B, tmp_folder=folder)
+            u, v, w = mtg.generate(1, filenames)
+            npt.assert_array_equal(u, u_ref)
+            npt.assert_array_equal(mann_turbulence.load(filenames % 'u', N), u_ref)
+            self.assertTrue(os.path.isfile(filenames % 'w'))
+            del u, v, w, mtg
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
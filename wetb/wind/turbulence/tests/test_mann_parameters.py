@@ -0,0 +1,73 @@
+"""
+Tests for the (batched) fit of Mann parameters
+"""
+import unittest
+
+import numpy as np
+from wetb.wind.turbulence import mann_parameters, mann_turbulence
+from wetb.wind.turbulence.mann_generator import generate
+from wetb.wind.turbulence.mann_parameters import get_mann_model_spectra, fit_mann_model_spectra, \
+    fit_mann_model_spectra_batch
+from wetb.wind.turbulence.spectra import logbin_spectra, spectra_from_time_series
+from tests import npt
+
+
+def noisy_spectra(no_columns, seed=1):
+    rng = np.random.RandomState(seed)
+    k1 = np.linspace(0, np.pi / 2, 1025)[1:, np.newaxis] * rng.uniform(.7, 1.3, no_columns)
+    ae, L, G = rng.uniform(.05, .3, no_columns), rng.uniform(10, 60, no_columns), rng.uniform(2, 4, no_columns)
+    sp = np.array(get_mann_model_spectra(ae, L, G, k1)) * rng.exponential(1, (4,) + k1.shape)
+    return [k1] + list(sp)
+
+
+class TestMannParameters(unittest.TestCase):
+
+    def test_get_mann_model_spectra_vectorized(self):
+        k1 = np.logspace(-3, 0, 20)
+        ae, L, G = np.array([.1, .2]), np.array([30, 40]), np.array([3, 3.5])
+        sp = np.array(get_mann_model_spectra(ae[:, np.newaxis], L[:, np.newaxis], G[:, np.newaxis], k1))
+        self.assertEqual(sp.shape, (4, 2, 20))
+        for i in range(2):
+            npt.assert_array_equal(sp[:, i], get_mann_model_spectra(ae[i], L[i], G[i], k1))
+
+    def test_logbin_columns(self):
+        k1, uu, vv, ww, uw = noisy_spectra(5)
+        bk1, bsp = mann_parameters._logbin_columns(k1, [uu, vv, ww, uw])
+        for i in range(5):
+            ref = logbin_spectra(k1[:, i], uu[:, i], vv[:, i], ww[:, i], uw[:, i])
+            n = len(ref[0])
+            npt.assert_array_equal(bk1[i, :n], ref[0])
+            npt.assert_array_equal(bsp[:, i, :n], ref[1:])
+            self.assertTrue(np.isnan(bk1[i, n:]).all())
+
+    def test_fit_mann_model_spectra_batch(self):
+        k1, uu, vv, ww, uw = noisy_spectra(6)
+        x = fit_mann_model_spectra_batch(k1, uu, vv, ww, uw)
+        self.assertEqual(x.shape, (6, 3))
+        for i in range(6):
+            npt.assert_allclose(x[i], fit_mann_model_spectra(k1[:, i], uu[:, i], vv[:, i], ww[:, i], uw[:, i]),
+                                rtol=1e-8)
+        # uu only, 1D k1 (same wave numbers for all columns)
+        x = fit_mann_model_spectra_batch(k1[:, 0], uu[:, :3])
+        for i in range(3):
+            npt.assert_allclose(x[i], fit_mann_model_spectra(k1[:, 0], uu[:, i]), rtol=1e-8)
+        self.assertRaises(ValueError, fit_mann_model_spectra_batch, k1, uu, vv, ww)
+
+    def test_fit_mann_model_spectra_batch_multiprocessing(self):
+        k1, uu, vv, ww, uw = noisy_spectra(4)
+        npt.assert_array_equal(fit_mann_model_spectra_batch(k1, uu, vv, ww, uw, nr_cpus=2, chunksize=2),
+                               fit_mann_model_spectra_batch(k1, uu, vv, ww, uw))
+
+    def test_fit_mann_parameters_from_time_series_batch(self):
+        u, v, w = generate(.1, 30, 3.9, 1, (1024, 4, 4), (2048, 64, 64))
+        U = 10
+        Uvw_lst = [(U + u[:, i], v[:, i], w[:, i]) for i in range(3)]
+        sample_frq = U / 2  # dx = 2m
+        x = mann_turbulence.fit_mann_parameters_from_time_series(sample_frq, Uvw_lst, batch=True)
+        self.assertEqual(x.shape, (3, 3))
+        npt.assert_array_equal(x, fit_mann_model_spectra_batch(*spectra_from_time_series(sample_frq, Uvw_lst)))
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
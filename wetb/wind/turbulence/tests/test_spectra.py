@@ -0,0 +1,148 @@
+"""
+Tests for the streaming Welch spectra
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from wetb import gtsdf
+from wetb.wind.turbulence.spectra import spectra, spectrum, WelchSpectra, welch_spectra_from_gtsdf
+from tests import npt
+
+
+def uvw(r, c=None, seed=1):
+    rng = np.random.RandomState(seed)
+    shape = (r,) if c is None else (r, c)
+    u, v, w = rng.normal(0, 1, (3,) + shape)
+    return u, v, .5 * w + .3 * u
+
+
+class TestWelchSpectra(unittest.TestCase):
+
+    def test_single_segment(self):
+        # one segment without window and detrending equals spectra
+        u, v, w = uvw(256)
+        u, v, w = [x - x.mean() for x in [u, v, w]]
+        ws = WelchSpectra(256, spatial_resolution=.5, noverlap=0, window='boxcar', detrend=False)
+        ws.add(u, v, w)
+        sp = ws.spectra()
+        ref = spectra(.5, u, v, w, detrend=False)
+        for x, x_ref in zip(sp[1:], ref[1:]):
+            npt.assert_allclose(x, x_ref)
+        npt.assert_allclose(sp[0], 2 * np.pi * .5 * np.arange(1, 128) / 256)
+
+    def test_blocks(self):
+        u, v, w = uvw(5000, 3)
+        ws = WelchSpectra(512, spatial_resolution=1, max_buffer_size=2000)
+        ws.add(u, v, w)
+        ws_blocks = WelchSpectra(512, spatial_resolution=1)
+        for i in range(0, 5000, 700):
+            ws_blocks.add(u[i:i + 700], v[i:i + 700], w[i:i + 700])
+        self.assertEqual(ws.no_segments, (5000 - 512) // 256 + 1)
+        self.assertEqual(ws_blocks.no_segments, ws.no_segments)
+        for x, x_ref in zip(ws_blocks.spectra(), ws.spectra()):
+            npt.assert_allclose(x, x_ref)
+        k1, uu, vv, ww, uw = ws.spectra()
+        self.assertEqual(k1.shape, (255, 3))
+        self.assertEqual(uu.shape, (255, 3))
+
+        # mean of independent segments equals mean of spectrum of each segment
+        ws = WelchSpectra(500, spatial_resolution=1, noverlap=0, window='boxcar', detrend='constant')
+        ws.add(u[:, 0])
+        ref = np.mean([spectrum(u[i:i + 500, 0] - u[i:i + 500, 0].mean()) for i in range(0, 5000, 500)], 0)
+        npt.assert_allclose(ws.spectra()[1], ref / (2 * np.pi))
+
+    def test_variance(self):
+        # integral of white noise spectra equals half the variance (same scaling as spectrum)
+        u, v, w = uvw(2**16)
+        ws = WelchSpectra(256, spatial_resolution=2)
+        ws.add(u, v, w)
+        k1, uu, vv, ww, uw = ws.spectra()
+        dk = k1[1] - k1[0]
+        npt.assert_allclose([uu.sum() * dk, ww.sum() * dk, uw.sum() * dk], [.5, .17, .15], rtol=.05)
+
+    def test_uu_only(self):
+        u = uvw(2000)[0]
+        ws = WelchSpectra(128, spatial_resolution=1)
+        ws.add(u)
+        k1, uu, vv, ww, uw = ws.spectra()
+        self.assertEqual(uu.shape, (63,))
+        self.assertIsNone(vv)
+        self.assertIsNone(uw)
+        self.assertRaises(ValueError, ws.add, u, u)
+        self.assertRaises(ValueError, WelchSpectra(128, spatial_resolution=1).spectra)
+        self.assertRaises(ValueError, WelchSpectra, 128)
+        self.assertRaises(ValueError, WelchSpectra, 128, 1, noverlap=128)
+
+    def test_sample_frq(self):
+        u, v, w = uvw(4000)
+        U = 8 + u
+        ws = WelchSpectra(256, sample_frq=20)
+        ws.add(U, v, w)
+        ws_ref = WelchSpectra(256, spatial_resolution=20 / U.mean())
+        ws_ref.add(U - U.mean(), v, w)
+        for x, x_ref in zip(ws.spectra(), ws_ref.spectra()):
+            npt.assert_allclose(x, x_ref)
+
+    def test_sample_frq_no_detrend(self):
+        u, v, w = uvw(4000)
+        U = 8 + u
+        ws_ref = WelchSpectra(256, spatial_resolution=20 / U.mean(), detrend=False)
+        ws_ref.add(U - U.mean(), v, w)
+        ws = WelchSpectra(256, sample_frq=20, detrend=False)
+        ws.add(U, v, w)
+        for x, x_ref in zip(ws.spectra(), ws_ref.spectra()):
+            npt.assert_allclose(x, x_ref)
+        # added block by block, the running mean is subtracted, i.e. the mean does not leak into uu
+        ws_blocks = WelchSpectra(256, sample_frq=20, detrend=False)
+        for i in range(0, 4000, 1000):
+            ws_blocks.add(U[i:i + 1000], v[i:i + 1000], w[i:i + 1000])
+        npt.assert_allclose(ws_blocks.spectra()[1][:3], ws_ref.spectra()[1][:3], rtol=.1)
+
+    def test_nan(self):
+        u, v, w = uvw(4096, 2)
+        u[100, 0] = np.nan
+        ws = WelchSpectra(256, spatial_resolution=1, noverlap=0)
+        ws.add(u, v, w)
+        self.assertEqual(ws.no_segments, 16)
+        k1, uu, vv, ww, uw = ws.spectra()
+        self.assertFalse(np.isnan(uu).any())
+        # the first segment of the first time series is skipped
+        ws_ref = WelchSpectra(256, spatial_resolution=1, noverlap=0)
+        ws_ref.add(u[256:, 0], v[256:, 0], w[256:, 0])
+        for x, x_ref in zip([uu, vv, ww, uw], ws_ref.spectra()[1:]):
+            npt.assert_allclose(x[:, 0], x_ref)
+        ws_ref = WelchSpectra(256, spatial_resolution=1, noverlap=0)
+        ws_ref.add(u[:, 1], v[:, 1], w[:, 1])
+        npt.assert_allclose(uu[:, 1], ws_ref.spectra()[1])
+
+        # U with NaN
+        ws = WelchSpectra(256, sample_frq=20, noverlap=0)
+        U = 8 + u[:, 0]
+        ws.add(U)
+        ws_ref = WelchSpectra(256, spatial_resolution=20 / np.nanmean(U), noverlap=0)
+        ws_ref.add(U[256:] - np.nanmean(U))
+        npt.assert_allclose(ws.spectra()[1], ws_ref.spectra()[1])
+
+        ws = WelchSpectra(256, spatial_resolution=1)
+        ws.add(np.full(1000, np.nan))
+        self.assertRaises(ValueError, ws.spectra)
+
+    def test_gtsdf(self):
+        u, v, w = uvw(3000)
+        U = 8 + u
+        with tempfile.TemporaryDirectory() as folder:
+            fn = os.path.join(folder, 'sonic.hdf5')
+            gtsdf.save(fn, np.array([U[:1000], v[:1000], w[:1000]]).T, time_step=.05, dtype=np.float64)
+            gtsdf.append_block(fn, np.array([U[1000:], v[1000:], w[1000:]]).T, time_step=.05, dtype=np.float64)
+            sp = welch_spectra_from_gtsdf(fn, [0, 1, 2], 256)
+        ws = WelchSpectra(256, sample_frq=20)
+        ws.add(U, v, w)
+        for x, x_ref in zip(sp, ws.spectra()):
+            npt.assert_allclose(x, x_ref)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
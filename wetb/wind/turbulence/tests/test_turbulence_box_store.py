@@ -0,0 +1,123 @@
+"""
+Tests for the store of Mann turbulence boxes
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from wetb.hawc2.htc_file import HTCFile
+from wetb.wind.turbulence import mann_turbulence
+from wetb.wind.turbulence.mann_generator import MannTurbulenceGenerator, generate
+from wetb.wind.turbulence.turbulence_box_store import TurbulenceBoxStore
+from tests import npt
+
+N, B = (64, 8, 8), (128, 32, 32)
+
+
+class TestTurbulenceBoxStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmp.name, 'turb_store')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get(self):
+        store = TurbulenceBoxStore(self.folder)
+        self.assertFalse(store.exists(.1, 29.4, 3.9, 1001, N, B))
+        with mock.patch.object(MannTurbulenceGenerator, 'generate', autospec=True,
+                               side_effect=MannTurbulenceGenerator.generate) as m:
+            u, v, w = store.get(.1, 29.4, 3.9, 1001, N, B)
+            u2, v2, w2 = store.get(.1, 29.4, 3.9, 1001, N, B)
+            store.get(.1, 29.4, 3.9, 1002, N, B)
+        self.assertEqual(m.call_count, 2)  # generated once per seed
+        self.assertEqual(len(store._generators.items), 1)  # one generator for both seeds
+        self.assertTrue(store.exists(.1, 29.4, 3.9, 1001, N, B))
+        self.assertEqual(os.path.basename(store.filenames(.1, 29.4, 3.9, 1001, N, B)[0]),
+                         os.path.basename(mann_turbulence.parameters2name(N, B, .1, 29.4, 3.9, 1, 1001)[0]))
+        self.assertIsInstance(u, np.memmap)
+        self.assertEqual(u.shape, (64, 64))
+        npt.assert_array_equal(u, generate(.1, 29.4, 3.9, 1001, N, B)[0])
+        npt.assert_array_equal(w, w2)
+        with self.assertRaises(ValueError):
+            u[0, 0] = 1  # read-only
+        self.assertEqual(os.listdir(self.folder).count("turbulence_box_usage.json"), 0)
+        self.assertFalse([f for f in os.listdir(self.folder) if f.endswith('.tmp')])
+
+        store = TurbulenceBoxStore(self.folder, generate=False)
+        self.assertRaises(FileNotFoundError, store.get, .1, 29.4, 3.9, 1003, N, B)
+
+    def test_usage(self):
+        store = TurbulenceBoxStore(self.folder)
+        store.get(.1, 29.4, 3.9, 1001, N, B, case='case1')
+        store.get(.1, 29.4, 3.9, 1001, N, B, case='case2')
+        store.get(.1, 29.4, 3.9, 1002, N, B, case='case1')
+        store.get(.1, 29.4, 3.9, 1003, N, B)
+        name = store.box_name(store.filenames(.1, 29.4, 3.9, 1001, N, B)[0])
+        self.assertEqual(store.usage[name], {'case1', 'case2'})
+        self.assertEqual(len(store.boxes()), 3)
+        self.assertEqual(store.unused(), [store.box_name(store.filenames(.1, 29.4, 3.9, 1003, N, B)[0])])
+        store.unregister('case1')
+        store.save_usage()
+
+        store = TurbulenceBoxStore(self.folder)
+        self.assertEqual(store.usage[name], {'case2'})
+        self.assertEqual(len(store.unused()), 2)
+        self.assertEqual(len(store.remove_unused()), 2)
+        self.assertEqual(store.boxes(), [name])
+
+    def test_concurrent_usage(self):
+        # two stores (e.g. processes) register and save usage of different cases
+        store1, store2 = TurbulenceBoxStore(self.folder), TurbulenceBoxStore(self.folder)
+        store1.get(.1, 29.4, 3.9, 1001, N, B, case='case1')
+        store2.get(.1, 29.4, 3.9, 1002, N, B, case='case2')
+        f1, f2 = store1.filenames(.1, 29.4, 3.9, 1001, N, B), store1.filenames(.1, 29.4, 3.9, 1002, N, B)
+        store1.save_usage()
+        store2.save_usage()
+        self.assertEqual(TurbulenceBoxStore(self.folder).usage, {store1.box_name(f1[0]): {'case1'},
+                                                                  store1.box_name(f2[0]): {'case2'}})
+        # store1 does not know case2, but rereads the usage before removing boxes
+        self.assertEqual(store1.remove_unused(), [])
+        store2.unregister('case2')
+        store2.save_usage()
+        self.assertEqual(store1.remove_unused(), [store1.box_name(f2[0])])
+        self.assertFalse(os.path.isfile(f2[0]))
+        self.assertFalse(os.path.isfile(store1.parameters_file(f2[0])))
+        # registration of case1 continues from the saved usage
+        store3 = TurbulenceBoxStore(self.folder)
+        store3.get(.1, 29.4, 3.9, 1003, N, B, case='case1')
+        store3.save_usage()
+        self.assertEqual(len([name for name, cases in TurbulenceBoxStore(self.folder).usage.items()
+                              if 'case1' in cases]), 2)
+
+    def test_parameters(self):
+        # Gamma 3.9 and 3.94 map to the same name, but the box is not reused
+        store = TurbulenceBoxStore(self.folder)
+        self.assertEqual(store.filenames(.1, 29.4, 3.9, 1001, N, B), store.filenames(.1, 29.4, 3.94, 1001, N, B))
+        store.get(.1, 29.4, 3.9, 1001, N, B)
+        self.assertTrue(store.exists(.1, 29.4, 3.9, 1001, N, B))
+        self.assertRaises(ValueError, store.exists, .1, 29.4, 3.94, 1001, N, B)
+        self.assertRaises(ValueError, store.get, .1, 29.4, 3.94, 1001, N, B)
+        # overwrite regenerates the box with the new parameters
+        store.create(.1, 29.4, 3.94, 1001, N, B, overwrite=True)
+        npt.assert_array_equal(store.get(.1, 29.4, 3.94, 1001, N, B)[0], generate(.1, 29.4, 3.94, 1001, N, B)[0])
+        self.assertRaises(ValueError, store.get, .1, 29.4, 3.9, 1001, N, B)
+
+    def test_set_htc(self):
+        store = TurbulenceBoxStore(self.folder)
+        htc = HTCFile(modelpath=self.tmp.name)
+        filenames = store.set_htc(htc, .1, 29.4, 3.9, 1001, N, B, case='case1')
+        self.assertEqual(htc.wind.mann.filename_u[0], "./turb_store/" + os.path.basename(filenames[0]))
+        self.assertEqual(htc.wind.turb_format[0], 1)
+        self.assertEqual(htc.wind.mann.create_turb_parameters.values, [29.4, .1, 3.9, 1001, 1])
+        self.assertEqual(htc.wind.mann.box_dim_v.values, [8, 4])
+        self.assertEqual(store.usage[store.box_name(filenames[0])], {'case1'})
+        self.assertRaises(ValueError, store.set_htc, HTCFile(), .1, 29.4, 3.9, 1001, N, B)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,294 @@
+'''
+Store of Mann turbulence boxes shared between cases (e.g. design variants of a DLB)
+
+Each box is stored once in the store folder, named by mann_turbulence.name_format, i.e. keyed on
+(L, ae23, Gamma, high frequency compensation, grid, dx, seed). Missing boxes are generated by
+mann_generator. The boxes are accessed as read-only memory mapped views and htc files reference
+the boxes in the store instead of copies. The exact parameters of each box are saved next to the box,
+such that parameters that map to the same name (e.g. Gamma=3.9 and 3.94) are not mixed up.
+
+The usage of the boxes (which cases uses which box) is tracked and saved in the store folder, such that
+unused boxes can be found and removed. The usage is saved in one file per case, i.e. processes that
+work on different cases can register and save usage concurrently without losing each other's registrations.
+
+Examples
+--------
+>>> store = TurbulenceBoxStore('/data/turb_store')
+>>> for case, (wsp, seed) in cases.items():
+>>>     htc = HTCFile(base_htc)
+>>>     store.set_htc(htc, ae23, 29.4, 3.9, seed, (8192, 32, 32), (wsp * 600, 180, 180), case=case)
+>>>     htc.save(...)
+>>> store.save_usage()
+>>> u, v, w = store.get(ae23, 29.4, 3.9, 1001, (8192, 32, 32), (6000, 180, 180))
+'''
+import glob
+import hashlib
+import json
+import os
+
+from wetb.utils.caching import _LRUCache
+from wetb.wind.turbulence import mann_turbulence
+from wetb.wind.turbulence.mann_generator import MannTurbulenceGenerator
+
+
+class TurbulenceBoxStore(object):
+    """Store of Mann turbulence boxes
+
+    Parameters
+    ----------
+    folder : str
+        Store folder
+    generate : bool, optional
+        If True, default, missing boxes are generated by mann_generator. If False, missing boxes raises FileNotFoundError
+    tmp_folder : str, optional
+        Folder for temporary buffers used when generating large boxes, see MannTurbulenceGenerator
+    """
+    usage_foldername = "turbulence_box_usage"
+
+    def __init__(self, folder, generate=True, tmp_folder=None):
+        self.folder = folder
+        self.generate = generate
+        self.tmp_folder = tmp_folder
+        # the amplitudes of a generator only depends on the parameters and grid, i.e. they are reused for all seeds
+        self._generators = _LRUCache(2)
+        self._case_boxes = {}  # case: set of box names, for the cases registered/unregistered by this store
+        self._changed = set()  # cases with unsaved changes
+
+    @property
+    def usage_folder(self):
+        return os.path.join(self.folder, self.usage_foldername)
+
+    def _usage_file(self, case):
+        # one file per case. The case (e.g. a htc filename) is hashed to get a valid filename
+        return os.path.join(self.usage_folder, hashlib.sha1(case.encode('utf-8')).hexdigest() + ".json")
+
+    def _load_case_usage(self, filename):
+        """Return case and set of box names saved in usage file (None, set() if the file is removed meanwhile)"""
+        try:
+            with open(filename) as fid:
+                usage = json.load(fid)
+        except FileNotFoundError:
+            return None, set()
+        return usage['case'], set(usage['boxes'])
+
+    @property
+    def usage(self):
+        """Usage, {box name: set of cases}, of the saved cases (reread from the store folder) and the unsaved
+        changes of this store"""
+        case_boxes = dict([self._load_case_usage(f) for f in glob.glob(os.path.join(self.usage_folder, "*.json"))])
+        case_boxes.pop(None, None)
+        case_boxes.update({case: self._case_boxes[case] for case in self._changed})
+        usage = {}
+        for case, names in case_boxes.items():
+            for name in names:
+                usage.setdefault(name, set()).add(case)
+        return usage
+
+    def filenames(self, ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation=True):
+        """Filenames of the u, v and w box in the store"""
+        return mann_turbulence.parameters2name(tuple(no_grid_points), box_dimension, ae23, L, Gamma,
+                                               int(high_frq_compensation), seed, self.folder)
+
+    @staticmethod
+    def box_name(filename):
+        """Name of box (filename without folder and u/v/w-suffix)"""
+        return os.path.basename(filename)[:-len("u.turb")]
+
+    def parameters_file(self, filename):
+        """Filename of the file with the exact parameters of the box of filename"""
+        return os.path.join(os.path.dirname(filename), self.box_name(filename) + ".json")
+
+    @staticmethod
+    def _parameters(ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation):
+        # json round trip, i.e. tuples become lists and numpy numbers python numbers
+        return json.loads(json.dumps({'ae23': float(ae23), 'L': float(L), 'Gamma': float(Gamma), 'seed': int(seed),
+                                      'no_grid_points': [int(n) for n in no_grid_points],
+                                      'box_dimension': [float(d) for d in box_dimension],
+                                      'high_frq_compensation': bool(high_frq_compensation)}))
+
+    def _check_parameters(self, filenames, parameters):
+        """Raise ValueError if the existing box of filenames was generated with other parameters.
+        Boxes without parameter file (e.g. copied to the store) are identified by the name only"""
+        parameters_file = self.parameters_file(filenames[0])
+        if os.path.isfile(parameters_file):
+            with open(parameters_file) as fid:
+                box_parameters = json.load(fid)
+            if box_parameters != parameters:
+                raise ValueError("Turbulence box, %s, in %s is generated with other parameters, %s, than requested, %s" %
+                                 (self.box_name(filenames[0]), self.folder, box_parameters, parameters))
+
+    def exists(self, ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation=True):
+        """True if the box exists in the store (ValueError if a box with the same name but other parameters exists)"""
+        filenames = self.filenames(ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation)
+        if not all([os.path.isfile(f) for f in filenames]):
+            return False
+        self._check_parameters(filenames, self._parameters(ae23, L, Gamma, seed, no_grid_points, box_dimension,
+                                                           high_frq_compensation))
+        return True
+
+    def create(self, ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation=True, overwrite=False):
+        """Generate box if it does not exist in the store
+
+        The box name only holds the parameters with limited precision (see mann_turbulence.name_format).
+        The exact parameters are saved next to the box and a ValueError is raised if an existing box with the
+        same name is generated with other parameters (unless overwrite is True)
+
+        Returns
+        -------
+        filenames : list
+            Filenames of the u, v and w box
+        """
+        filenames = self.filenames(ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation)
+        parameters = self._parameters(ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation)
+        if all([os.path.isfile(f) for f in filenames]) and not overwrite:
+            self._check_parameters(filenames, parameters)
+            return filenames
+        if not self.generate:
+            raise FileNotFoundError("Turbulence box, %s, does not exist in %s" % (self.box_name(filenames[0]),
+                                                                                  self.folder))
+        key = (ae23, L, Gamma, tuple(no_grid_points), tuple(box_dimension), bool(high_frq_compensation))
+        found, generator = self._generators.get(key)
+        if not found:
+            generator = MannTurbulenceGenerator(ae23, L, Gamma, no_grid_points, box_dimension,
+                                                high_frq_compensation, tmp_folder=self.tmp_folder)
+            self._generators.put(key, generator)
+        os.makedirs(self.folder, exist_ok=True)
+        # write to temporary files and rename, i.e. other processes never see incomplete boxes
+        tmp_filenames = [f + ".%d.tmp" % os.getpid() for f in filenames]
+        uvw = generator.generate(seed, tmp_filenames)
+        del uvw  # close memmaps
+        parameters_file = self.parameters_file(filenames[0])
+        with open(parameters_file + ".%d.tmp" % os.getpid(), 'w') as fid:
+            json.dump(parameters, fid, indent=1)
+        for tmp, f in zip(tmp_filenames + [fid.name], filenames + [parameters_file]):
+            os.replace(tmp, f)
+        return filenames
+
+    def get(self, ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation=True, case=None):
+        """Read-only memory mapped views of the u, v and w box (generated if missing)
+
+        Parameters
+        ----------
+        ae23, L, Gamma, seed : float, float, float, int
+            Mann parameters and seed
+        no_grid_points : (nx, ny, nz)
+            Number of grid points
+        box_dimension : (Lx, Ly, Lz)
+            Box dimensions [m]
+        high_frq_compensation : bool, optional
+            High frequency compensation, default is True
+        case : str, optional
+            If given, the box is registered as used by case
+
+        Returns
+        -------
+        u,v,w : list of np.memmap
+            float32 views of shape (nx, ny*nz) as returned by mann_turbulence.load
+        """
+        filenames = self.create(ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation)
+        if case is not None:
+            self.register(case, filenames)
+        return mann_turbulence.load_uvw(filenames, no_grid_points, mmap=True)
+
+    def set_htc(self, htc, ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation=True,
+                case=None, dont_scale=False, std_scaling=None):
+        """Set mann turbulence of htc file to reference the box in the store (generated if missing)
+
+        The filenames are relative to the model path of the htc file if it is absolute, otherwise absolute
+
+        Parameters
+        ----------
+        htc : HTCFile
+            htc file
+        ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation
+            see get
+        case : str, optional
+            Case that uses the box. If None, the filename of the htc file is used
+        dont_scale, std_scaling
+            see HTCFile.add_mann_turbulence
+
+        Returns
+        -------
+        filenames : list
+            Filenames of the u, v and w box in the store
+        """
+        filenames = self.create(ae23, L, Gamma, seed, no_grid_points, box_dimension, high_frq_compensation)
+        modelpath = getattr(htc, 'modelpath', 'unknown')
+        htc_filenames = []
+        for f in filenames:
+            f = os.path.abspath(f)
+            if os.path.isabs(modelpath):
+                try:
+                    f = "./" + os.path.relpath(f, modelpath)
+                except ValueError:  # different drives
+                    pass
+            htc_filenames.append(f.replace("\\", "/"))
+        htc.add_mann_turbulence(L, ae23, Gamma, seed, high_frq_compensation, htc_filenames,
+                                tuple(no_grid_points), tuple(box_dimension), dont_scale, std_scaling)
+        case = case or getattr(htc, 'filename', None)
+        if case is None:
+            raise ValueError("case must be specified when the htc file has no filename")
+        self.register(case, filenames)
+        return filenames
+
+    def register(self, case, filenames):
+        """Register that case uses the box of filenames (list of u,v,w filenames or filename of one component)"""
+        if not isinstance(filenames, str):
+            filenames = filenames[0]
+        self._boxes_of_case(str(case)).add(self.box_name(filenames))
+        self._changed.add(str(case))
+
+    def unregister(self, case):
+        """Remove case from the usage of all boxes"""
+        self._case_boxes[str(case)] = set()
+        self._changed.add(str(case))
+
+    def _boxes_of_case(self, case):
+        if case not in self._case_boxes:
+            # continue from the saved usage of case
+            self._case_boxes[case] = self._load_case_usage(self._usage_file(case))[1]
+        return self._case_boxes[case]
+
+    def save_usage(self):
+        """Save the usage of the cases registered/unregistered by this store to the store folder
+
+        Only the usage files of these cases are written, i.e. the registrations of other processes are kept"""
+        os.makedirs(self.usage_folder, exist_ok=True)
+        for case in sorted(self._changed):
+            filename = self._usage_file(case)
+            if self._case_boxes[case]:
+                tmp = filename + ".%d.tmp" % os.getpid()
+                with open(tmp, 'w') as fid:
+                    json.dump({'case': case, 'boxes': sorted(self._case_boxes[case])}, fid, indent=1)
+                os.replace(tmp, filename)
+            elif os.path.isfile(filename):
+                os.remove(filename)
+        self._changed.clear()
+
+    def boxes(self):
+        """Names of the boxes in the store"""
+        return sorted([self.box_name(f) for f in glob.glob(os.path.join(self.folder, "mann_*u.turb"))])
+
+    def unused(self):
+        """Names of the boxes in the store that are not used by any case (saved or registered in this store)"""
+        usage = self.usage  # reread from store folder
+        return [name for name in self.boxes() if not usage.get(name)]
+
+    def remove_unused(self):
+        """Remove unused boxes from store
+
+        The usage is reread from the store folder, i.e. boxes used by cases saved by other processes are kept.
+        Boxes that other processes use, but have not saved the usage of yet, are removed
+
+        Returns
+        -------
+        names : list
+            Names of the removed boxes
+        """
+        names = self.unused()
+        for name in names:
+            for f in [os.path.join(self.folder, name + uvw + ".turb") for uvw in 'uvw'] + \
+                    [os.path.join(self.folder, name + ".json")]:
+                if os.path.isfile(f):
+                    os.remove(f)
+        return names